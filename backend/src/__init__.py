@@ -1,3 +1,14 @@
+import importlib
+
 from .state import State
-from .nodes import *
-from .chains import *
+
+# nodes/chains 는 LLM 프로바이더 패키지를 불러오므로 실제로 필요할 때만 import
+_LAZY_MODULES = ("nodes", "chains")
+
+
+def __getattr__(name):
+    for module_name in _LAZY_MODULES:
+        module = importlib.import_module(f".{module_name}", __name__)
+        if hasattr(module, name):
+            return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
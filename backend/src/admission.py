@@ -0,0 +1,219 @@
+import asyncio
+import math
+import time
+from collections import deque
+from os import environ
+from typing import Optional
+
+from .metrics import (
+    ADMISSION_IN_FLIGHT,
+    ADMISSION_QUEUE_DEPTH,
+    ADMISSION_REJECTED,
+    ADMISSION_WAIT,
+    log_event,
+)
+
+# 동시에 LLM 을 호출하는 생성 요청 수 (배치는 max_concurrency 만큼 차지)
+MAX_CONCURRENT = int(environ.get("RUBRIC_MAX_CONCURRENT_REQUESTS", 16))
+# 슬롯을 기다릴 수 있는 요청 수와 최대 대기 시간 - 넘으면 바로 503 + Retry-After
+MAX_QUEUE = int(environ.get("RUBRIC_MAX_QUEUE", 64))
+QUEUE_TIMEOUT = float(environ.get("RUBRIC_QUEUE_TIMEOUT", 10.0))
+# 테넌트(X-School-Id 헤더, 없으면 thread_id)별 토큰 버킷: 초당 요청 수와 버스트 (0이면 제한 없음)
+TENANT_RATE = float(environ.get("RUBRIC_TENANT_RATE", 1.0))
+TENANT_BURST = float(environ.get("RUBRIC_TENANT_BURST", 30))
+MAX_TENANTS = int(environ.get("RUBRIC_MAX_TENANTS", 10000))
+
+
+class AdmissionRejected(Exception):
+    """A request turned away before it reached the LLM provider.
+
+    Parameters
+    ----------
+    status_code : int
+        ``429`` when the tenant is over its rate, ``503`` when the server is
+        saturated.
+    retry_after : int
+        Seconds the client should wait before retrying.
+    reason : str
+        ``"rate_limited"``, ``"queue_full"`` or ``"queue_timeout"``.
+    """
+
+    def __init__(self, status_code: int, retry_after: int, reason: str):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class TokenBucket:
+    """Per-tenant token buckets refilled at ``rate`` tokens per second."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        # tenant -> (남은 토큰, 마지막 갱신 시각)
+        self._buckets: dict[str, tuple[float, float]] = {}
+
+    def take(self, tenant: str, cost: float = 1) -> None:
+        """Take ``cost`` tokens or raise :class:`AdmissionRejected` (429)."""
+        if self.rate <= 0:
+            return
+        now = time.monotonic()
+        cost = min(cost, self.burst)
+        tokens, updated = self._buckets.get(tenant, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens < cost:
+            self._buckets[tenant] = (tokens, now)
+            ADMISSION_REJECTED.inc(reason="rate_limited")
+            raise AdmissionRejected(
+                429, math.ceil((cost - tokens) / self.rate), "rate_limited"
+            )
+        self._buckets[tenant] = (tokens - cost, now)
+        if len(self._buckets) > MAX_TENANTS:
+            self._evict_full(now)
+
+    def _evict_full(self, now: float) -> None:
+        # 가득 찬 버킷은 지워도 다음 요청 때 같은 상태로 다시 만들어짐
+        for tenant, (tokens, updated) in list(self._buckets.items()):
+            if tokens + (now - updated) * self.rate >= self.burst:
+                del self._buckets[tenant]
+
+
+class Permit:
+    """A held concurrency slot. :meth:`release` is idempotent."""
+
+    def __init__(self, controller: "AdmissionController", weight: int):
+        self._controller = controller
+        self._weight = weight
+        self._started = time.monotonic()
+        self._released = False
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self._controller._release(self._weight, time.monotonic() - self._started)
+
+
+class AdmissionController:
+    """Bounded concurrency with a FIFO queue that has a deadline.
+
+    Requests that find every slot taken wait in line for up to
+    ``queue_timeout`` seconds. A full queue or an expired wait is answered
+    immediately with :class:`AdmissionRejected` (503) and a ``Retry-After``
+    estimated from how long slots are currently held, so clients back off
+    instead of piling more requests onto a provider that is already
+    returning 429s. Must be used from a single event loop.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = MAX_CONCURRENT,
+        max_queue: int = MAX_QUEUE,
+        queue_timeout: float = QUEUE_TIMEOUT,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._waiters: deque[tuple[int, asyncio.Future]] = deque()
+        # 슬롯 점유 시간의 지수 이동 평균 (Retry-After 추정용)
+        self._hold_time = 0.0
+
+    def _retry_after(self) -> int:
+        queued = sum(weight for weight, _ in self._waiters) + self.in_flight
+        estimate = self._hold_time * queued / max(1, self.max_concurrent)
+        return max(1, math.ceil(estimate))
+
+    def _update_gauges(self) -> None:
+        ADMISSION_IN_FLIGHT.set(self.in_flight)
+        ADMISSION_QUEUE_DEPTH.set(len(self._waiters))
+
+    async def acquire(self, weight: int = 1) -> Permit:
+        """Wait for ``weight`` slots, or raise :class:`AdmissionRejected` (503)."""
+        weight = max(1, min(weight, self.max_concurrent))
+        if not self._waiters and self.in_flight + weight <= self.max_concurrent:
+            self.in_flight += weight
+            self._update_gauges()
+            ADMISSION_WAIT.observe(0, outcome="admitted")
+            return Permit(self, weight)
+        if len(self._waiters) >= self.max_queue:
+            ADMISSION_REJECTED.inc(reason="queue_full")
+            raise AdmissionRejected(503, self._retry_after(), "queue_full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append((weight, waiter))
+        self._update_gauges()
+        started = time.monotonic()
+        try:
+            await asyncio.wait({waiter}, timeout=self.queue_timeout)
+        except BaseException:
+            # 클라이언트가 끊김 - 줄에서 빼거나, 방금 받은 슬롯을 돌려줌
+            if not waiter.done():
+                self._leave_queue(weight, waiter)
+            elif not waiter.cancelled():
+                self.in_flight -= weight
+                self._wake()
+                self._update_gauges()
+            raise
+        waited = time.monotonic() - started
+        if not waiter.done():
+            self._leave_queue(weight, waiter)
+            ADMISSION_WAIT.observe(waited, outcome="timeout")
+            ADMISSION_REJECTED.inc(reason="queue_timeout")
+            log_event(
+                "admission_timeout",
+                waited_ms=round(waited * 1000, 2),
+                queue_depth=len(self._waiters),
+            )
+            raise AdmissionRejected(503, self._retry_after(), "queue_timeout")
+        ADMISSION_WAIT.observe(waited, outcome="admitted")
+        return Permit(self, weight)
+
+    def _leave_queue(self, weight: int, waiter: asyncio.Future) -> None:
+        waiter.cancel()
+        self._waiters.remove((weight, waiter))
+        # 맨 앞 요청이 빠지면 뒤의 작은 요청이 들어갈 수 있음
+        self._wake()
+        self._update_gauges()
+
+    def _release(self, weight: int, held: float) -> None:
+        self.in_flight -= weight
+        self._hold_time = (
+            held if not self._hold_time else 0.9 * self._hold_time + 0.1 * held
+        )
+        self._wake()
+        self._update_gauges()
+
+    def _wake(self) -> None:
+        # FIFO: 맨 앞 요청이 들어갈 자리가 생길 때까지 뒤 요청도 기다림 (큰 배치가 굶지 않도록)
+        while self._waiters:
+            weight, waiter = self._waiters[0]
+            if self.in_flight + weight > self.max_concurrent:
+                break
+            self._waiters.popleft()
+            self.in_flight += weight
+            waiter.set_result(None)
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "max_concurrent": self.max_concurrent,
+            "queue_depth": len(self._waiters),
+            "max_queue": self.max_queue,
+            "queue_timeout_s": self.queue_timeout,
+            "mean_hold_s": round(self._hold_time, 3),
+        }
+
+
+rate_limiter = TokenBucket(TENANT_RATE, TENANT_BURST)
+admission = AdmissionController()
+
+
+async def admit(tenant: str, cost: int = 1, weight: int = 1) -> Permit:
+    """Charge ``tenant``'s bucket ``cost`` tokens, then wait for ``weight`` slots."""
+    rate_limiter.take(tenant, cost)
+    return await admission.acquire(weight)
+
+
+def tenant_key(school_id: Optional[str], thread_id: str) -> str:
+    return f"school:{school_id}" if school_id else f"thread:{thread_id}"
@@ -0,0 +1,346 @@
+import csv
+import io
+import os
+import tempfile
+from os import environ
+from typing import (
+    IO,
+    AsyncIterable,
+    AsyncIterator,
+    Callable,
+    Container,
+    Iterable,
+    Iterator,
+    Optional,
+)
+
+from .parsing import field_name
+
+# 업로드 본문은 이 크기까지 메모리에, 넘으면 임시 파일에 저장
+SPOOL_BYTES = int(environ.get("RUBRIC_BULK_SPOOL_BYTES", 1024 * 1024))
+MAX_UPLOAD_BYTES = int(environ.get("RUBRIC_BULK_MAX_UPLOAD_BYTES", 50 * 1024 * 1024))
+
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# 결과 열: 압축 모드에서는 total 뒤에 루브릭 기준별 점수 열이 들어감
+LEADING_COLUMNS = ("row", "name", "status", "total")
+TRAILING_COLUMNS = ("evaluation", "feedback", "report", "error")
+
+
+def is_xlsx(name: str) -> bool:
+    return name.lower().endswith((".xlsx", ".xlsm"))
+
+
+def _openpyxl():
+    try:
+        import openpyxl
+    except ImportError as e:
+        raise ImportError(
+            "XLSX 파일을 다루려면 openpyxl 이 필요합니다: pip install openpyxl"
+        ) from e
+    return openpyxl
+
+
+def _xlsx_records(source: str | IO[bytes]) -> Iterator[list[str]]:
+    # read_only: 시트 전체를 메모리에 올리지 않고 행 단위로 읽음
+    workbook = _openpyxl().load_workbook(source, read_only=True, data_only=True)
+    try:
+        for values in workbook.active.iter_rows(values_only=True):
+            yield ["" if value is None else str(value) for value in values]
+    finally:
+        workbook.close()
+
+
+def _csv_records(source: str | IO[bytes], encoding: str) -> Iterator[list[str]]:
+    if isinstance(source, str):
+        with open(source, newline="", encoding=encoding) as f:
+            yield from csv.reader(f)
+    else:
+        yield from csv.reader(io.TextIOWrapper(source, encoding=encoding, newline=""))
+
+
+def roster_records(
+    source: str | IO[bytes], kind: str = "csv", encoding: str = "utf-8-sig"
+) -> Iterator[list[str]]:
+    """Rows of a roster file, read lazily.
+
+    Parameters
+    ----------
+    source : str or binary file
+        Path or open file of the roster.
+    kind : str
+        ``"csv"`` or ``"xlsx"`` (first sheet; needs ``openpyxl``).
+    encoding : str
+        CSV encoding. Spreadsheets saved by Korean Excel are usually
+        ``"cp949"``.
+    """
+    if kind == "xlsx":
+        return _xlsx_records(source)
+    return _csv_records(source, encoding)
+
+
+def read_roster(
+    records: Iterable[list[str]], skip: Container[int] = ()
+) -> Iterator[dict]:
+    """Turn roster rows into submissions for :func:`batch_response`.
+
+    The first row is the header. Columns are matched by the same names as the
+    teacher input (``name``/``이름``, ``student_submission``/``답안`` ...) and
+    other columns are ignored. The header is checked immediately, the rows
+    are read as they are consumed. A submission's ``index`` is its
+    spreadsheet row number (the header is row 1). Rows in ``skip`` and rows
+    without a submission are left out.
+    """
+    records = iter(records)
+    columns: dict[str, int] = {}
+    for position, header in enumerate(next(records, ())):
+        field = field_name(str(header))
+        if field is not None:
+            columns.setdefault(field, position)
+    if "student_submission" not in columns:
+        raise ValueError(
+            "명단에 학생 답안 열(student_submission, 답안, 학생답안)이 없습니다"
+        )
+
+    def cell(record: list[str], field: str) -> str:
+        position = columns.get(field)
+        if position is None or position >= len(record):
+            return ""
+        return record[position].strip()
+
+    def submissions() -> Iterator[dict]:
+        for row, record in enumerate(records, start=2):
+            submission = cell(record, "student_submission")
+            if row in skip or not submission:
+                continue
+            yield {
+                "index": row,
+                "name": cell(record, "name") or None,
+                "student_submission": submission,
+            }
+
+    return submissions()
+
+
+def result_columns(rubric_data: Optional[dict]) -> list[str]:
+    criteria = [
+        criterion["name"] for criterion in (rubric_data or {}).get("criteria", [])
+    ]
+    return [*LEADING_COLUMNS, *criteria, *TRAILING_COLUMNS]
+
+
+def result_row(result: dict) -> dict:
+    """A ``result`` event of :func:`batch_response` as a row of result columns."""
+    row = {
+        "row": result["index"],
+        "name": result.get("name") or "",
+        "status": result["status"],
+        "error": result.get("detail", ""),
+    }
+    if result["status"] == "success":
+        row.update(
+            evaluation=result["evaluation"],
+            feedback=result["feedback"],
+            report=result["report"],
+        )
+        if result.get("evaluation_data"):
+            scores = {
+                criterion["criterion"]: criterion["score"]
+                for criterion in result["evaluation_data"]["criteria"]
+            }
+            row.update(scores, total=sum(scores.values()))
+    return row
+
+
+def completed_rows(path: str) -> set[int]:
+    """Row numbers already written to the result CSV at ``path``."""
+    if not os.path.exists(path):
+        return set()
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        return {
+            int(row["row"])
+            for row in reader
+            # 마지막 열까지 있는 행만 - 강제 종료로 잘린 행은 다시 채점
+            if (row.get("row") or "").isdigit()
+            and row[reader.fieldnames[-1]] is not None
+        }
+
+
+class ResultWriter:
+    """Writes result rows to a CSV file, flushing each one.
+
+    With ``append`` an existing file is continued under its own header, so a
+    resumed run keeps the columns of the first one.
+    """
+
+    def __init__(self, path: str, columns: list[str], append: bool = True):
+        header = None
+        if append and os.path.exists(path) and os.path.getsize(path):
+            with open(path, newline="", encoding="utf-8-sig") as f:
+                header = next(csv.reader(f), None)
+        if header:
+            with open(path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                ends_with_newline = f.read(1) == b"\n"
+            self._file = open(path, "a", newline="", encoding="utf-8")
+            if not ends_with_newline:
+                self._file.write("\r\n")
+        else:
+            # BOM 이 있어야 엑셀에서 한글이 깨지지 않음
+            self._file = open(path, "w", newline="", encoding="utf-8-sig")
+        self._writer = csv.DictWriter(
+            self._file, header or columns, extrasaction="ignore"
+        )
+        if not header:
+            self._writer.writeheader()
+            self._file.flush()
+
+    def write(self, row: dict) -> None:
+        self._writer.writerow(row)
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def export_xlsx(csv_path: str, xlsx_path: str) -> None:
+    """Copy a result CSV to an XLSX workbook one row at a time."""
+    workbook = _openpyxl().Workbook(write_only=True)
+    sheet = workbook.create_sheet("results")
+    with open(csv_path, newline="", encoding="utf-8-sig") as f:
+        for record in csv.reader(f):
+            sheet.append([int(value) if value.isdigit() else value for value in record])
+    workbook.save(xlsx_path)
+
+
+async def run_bulk(
+    roster_path: str,
+    output_path: str,
+    teacher_input: str | dict,
+    max_concurrency: int = 5,
+    use_cache: bool = True,
+    pipeline: str = "linear",
+    compact: bool = True,
+    prefix_cache: bool = True,
+    encoding: str = "utf-8-sig",
+    on_result: Optional[Callable[[dict], None]] = None,
+) -> dict:
+    """Grade every row of a roster file into ``output_path``.
+
+    Results are appended to the output CSV as each student finishes, so
+    memory stays flat and an interrupted run can be started again with the
+    same arguments: rows already in the output are skipped. Failed rows go
+    to ``<output>.errors.csv`` instead and are retried on the next run. An
+    ``.xlsx`` output is written from ``<output>.progress.csv`` at the end.
+
+    Returns
+    -------
+    dict
+        Counts of ``graded``, ``skipped`` (done by an earlier run) and
+        ``errors`` rows, and the ``output`` path.
+    """
+    from .rubric import batch_response
+
+    if is_xlsx(roster_path) or is_xlsx(output_path):
+        _openpyxl()  # 채점 전에 확인 - 끝난 뒤 내보내기에서 실패하지 않도록
+    stem = os.path.splitext(output_path)[0]
+    results_path = f"{stem}.progress.csv" if is_xlsx(output_path) else output_path
+    errors_path = f"{stem}.errors.csv"
+
+    done = completed_rows(results_path)
+    kind = "xlsx" if is_xlsx(roster_path) else "csv"
+    submissions = read_roster(roster_records(roster_path, kind, encoding), skip=done)
+    summary = {"graded": 0, "skipped": len(done), "errors": 0}
+
+    results = errors = None
+    try:
+        # 출력 파일별 thread_id - 재실행 시 체크포인트와 캐시된 단계 결과를 재사용
+        async for event in batch_response(
+            teacher_input,
+            submissions,
+            f"bulk:{os.path.abspath(output_path)}",
+            max_concurrency=max_concurrency,
+            use_cache=use_cache,
+            pipeline=pipeline,
+            compact=compact,
+            prefix_cache=prefix_cache,
+        ):
+            if event["type"] == "rubric":
+                columns = result_columns(event["rubric_data"])
+                results = ResultWriter(results_path, columns)
+                errors = ResultWriter(errors_path, columns, append=False)
+                continue
+            if event["status"] == "success":
+                results.write(result_row(event))
+                summary["graded"] += 1
+            else:
+                errors.write(result_row(event))
+                summary["errors"] += 1
+            if on_result is not None:
+                on_result(event)
+    finally:
+        for writer in (results, errors):
+            if writer is not None:
+                writer.close()
+
+    if errors is not None and not summary["errors"]:
+        os.remove(errors_path)
+    if results_path != output_path and os.path.exists(results_path):
+        export_xlsx(results_path, output_path)
+    return {**summary, "output": output_path}
+
+
+async def spool_upload(chunks: AsyncIterable[bytes]) -> IO[bytes]:
+    """Copy a request body into a temporary file as it arrives.
+
+    The body stays in memory up to ``RUBRIC_BULK_SPOOL_BYTES`` and moves to
+    disk beyond that. Raises :class:`ValueError` above
+    ``RUBRIC_BULK_MAX_UPLOAD_BYTES``.
+    """
+    upload = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES)
+    size = 0
+    try:
+        async for chunk in chunks:
+            size += len(chunk)
+            if size > MAX_UPLOAD_BYTES:
+                raise ValueError(f"업로드 파일이 {MAX_UPLOAD_BYTES} 바이트를 넘습니다")
+            upload.write(chunk)
+    except BaseException:
+        # 크기 초과나 업로드 중 연결 끊김(ClientDisconnect)
+        upload.close()
+        raise
+    upload.seek(0)
+    return upload
+
+
+async def result_csv(events: AsyncIterable[dict]) -> AsyncIterator[str]:
+    """Format :func:`batch_response` events as CSV text, one chunk per row.
+
+    An error raised after the stream started becomes a final row with
+    status ``error``.
+    """
+    buffer = io.StringIO()
+    writer = None
+    try:
+        async for event in events:
+            if event["type"] == "rubric":
+                buffer.write("\ufeff")
+                writer = csv.DictWriter(
+                    buffer,
+                    result_columns(event["rubric_data"]),
+                    extrasaction="ignore",
+                )
+                writer.writeheader()
+            else:
+                writer.writerow(result_row(event))
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    except Exception as e:
+        if writer is None:
+            buffer.write("\ufeff")
+            writer = csv.DictWriter(buffer, result_columns(None))
+            writer.writeheader()
+        writer.writerow({"status": "error", "error": str(e)})
+        yield buffer.getvalue()
@@ -0,0 +1,206 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import unicodedata
+from os import environ
+from typing import Any, Awaitable, Callable, Optional
+
+# 학생 답안은 대소문자, 줄바꿈, 띄어쓰기, 들여쓰기도 채점 대상이므로 앞뒤 공백만 제거
+VERBATIM_FIELDS = frozenset({"student_submission"})
+
+
+def normalize_text(value: Any) -> Any:
+    """Normalize free text so trivially different inputs share a cache key."""
+    if not isinstance(value, str):
+        return value
+    value = unicodedata.normalize("NFKC", value)
+    return " ".join(value.split()).casefold()
+
+
+def make_cache_key(**fields) -> str:
+    """Return a stable SHA-256 key for the given fields.
+
+    Text is normalized with :func:`normalize_text`, except the fields in
+    ``VERBATIM_FIELDS``, which are only stripped.
+    """
+    normalized = {
+        key: (
+            value.strip()
+            if key in VERBATIM_FIELDS and isinstance(value, str)
+            else normalize_text(value)
+        )
+        for key, value in fields.items()
+    }
+    payload = json.dumps(normalized, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SQLiteCache:
+    """Persistent key/value cache with TTL and LRU eviction.
+
+    Parameters
+    ----------
+    path : str
+        SQLite database file. ``":memory:"`` keeps the cache in process.
+    table : str
+        Table name, so several caches can share one database file.
+    ttl : float
+        Seconds an entry stays valid. ``0`` disables expiry.
+    max_entries : int
+        Least recently used entries are evicted beyond this size.
+    """
+
+    def __init__(self, path: str, table: str, ttl: float = 0, max_entries: int = 0):
+        self.path = path
+        self.table = table
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            f"CREATE INDEX IF NOT EXISTS {table}_accessed_at ON {table} (accessed_at)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, created_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self.ttl and now - row[1] > self.ttl:
+                self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self._conn.commit()
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute(
+                f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def set(self, key: str, value: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} "
+                "(key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            if self.max_entries:
+                self._conn.execute(
+                    f"DELETE FROM {self.table} WHERE key IN ("
+                    f"SELECT key FROM {self.table} ORDER BY accessed_at DESC "
+                    "LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            (entries,) = self._conn.execute(
+                f"SELECT COUNT(*) FROM {self.table}"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+CACHE_PATH = environ.get("RUBRIC_CACHE_PATH", "/tmp/rubric_cache.sqlite3")
+
+# temperature=0 으로 생성한 루브릭은 같은 입력이면 재사용해도 무방함
+rubric_cache = SQLiteCache(
+    CACHE_PATH,
+    table="rubrics",
+    ttl=float(environ.get("RUBRIC_CACHE_TTL", 7 * 24 * 60 * 60)),
+    max_entries=int(environ.get("RUBRIC_CACHE_MAX_ENTRIES", 10000)),
+)
+
+
+def rubric_cache_key(teacher_input, model: str) -> str:
+    """Cache key for a rubric: the parsed assignment fields plus the model."""
+    return make_cache_key(
+        topic=teacher_input.topic,
+        objective=teacher_input.objective,
+        grade_level=teacher_input.grade_level,
+        model=model,
+    )
+
+
+# 같은 루브릭/답안에 대한 평가·피드백·리포트 (새로고침, 네트워크 오류 후 재제출 등)
+stage_cache = SQLiteCache(
+    CACHE_PATH,
+    table="stage_outputs",
+    ttl=float(environ.get("RUBRIC_STAGE_CACHE_TTL", 7 * 24 * 60 * 60)),
+    max_entries=int(environ.get("RUBRIC_STAGE_CACHE_MAX_ENTRIES", 50000)),
+)
+
+
+def stage_cache_key(stage: str, model: str, **inputs) -> str:
+    """Cache key for a stage output: the stage, the model and its prompt inputs."""
+    return make_cache_key(stage=stage, model=model, **inputs)
+
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into one.
+
+    While a call for ``key`` is running, later callers wait for its result
+    instead of starting their own. If the running call is cancelled, one of
+    the waiters takes over. Must be used from a single event loop.
+    """
+
+    def __init__(self):
+        self._calls: dict[str, asyncio.Future] = {}
+
+    async def run(self, key: str, fn: Callable[[], Awaitable[Any]]) -> tuple[Any, bool]:
+        """Return ``fn()``'s result and whether it was shared with another caller."""
+        while (future := self._calls.get(key)) is not None:
+            try:
+                return await asyncio.shield(future), True
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # 기다리는 호출이 없을 때 "exception was never retrieved" 경고 방지
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            del self._calls[key]
+
+
+stage_flights = SingleFlight()
@@ -1,28 +1,31 @@
 from pydantic import BaseModel, Field
-from typing import Optional, Literal
+from typing import Literal
 
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from langchain_openai import ChatOpenAI
-from langchain_google_genai import ChatGoogleGenerativeAI
 
+from .routing import get_routed_llm
+from .state import InputParser
 
-class InputParser(BaseModel):
-    grade_level: int = Field(..., description="School grade level")
-    topic: str = Field(
-        ...,
-        description="Detailed tasks (e.g., essay writing, graph interpretation, etc.)",
-    )
-    objective: str = Field(
-        ...,
-        description="Assessment purpose (e.g., essay writing, graph interpretation, etc.)",
+# 구조화 출력 체인의 태그 - 스트리밍 시 JSON 토큰을 화면에 내보내지 않도록 구분
+STRUCTURED_OUTPUT_TAG = "structured_output"
+
+
+def prefix_cached_prompt(system: str, shared: str, request: str) -> ChatPromptTemplate:
+    """Prompt laid out for provider-side prefix caching.
+
+    The system message holds the static instructions followed by the inputs
+    shared by a whole class (rubric, grade level), so it is byte-identical
+    for every student and OpenAI/Gemini can serve it from their prompt cache.
+    Per-student inputs go last, in the human message.
+    """
+    return ChatPromptTemplate.from_messages(
+        [("system", f"{system}\n{shared}"), ("human", request)]
     )
-    name: Optional[str] = Field(..., description="Student name")
-    student_submission: Optional[str] = Field(..., description="Submitted assignment")
 
 
 def create_input_parser():
-    llm = ChatOpenAI(model="gpt-4.1-mini", temperature=0)
+    llm = get_routed_llm("input_parser")
     structured_llm_parser = llm.with_structured_output(InputParser)
 
     system = "You are a helpful assistant that parses the input from the teacher and returns a structured output."
@@ -35,7 +38,52 @@ def create_input_parser():
     return parser_chain
 
 
-def create_rubric_chain(model_name="gpt-4.1-mini", model_type="openai"):
+### Structured (compact) outputs ###
+class RubricLevel(BaseModel):
+    label: str = Field(..., description="Level name, e.g. 상, 중, 하")
+    score: int = Field(..., description="Points awarded at this level")
+    description: str = Field(
+        ..., description="Observable performance expected at this level, in Korean"
+    )
+
+
+class RubricCriterion(BaseModel):
+    name: str = Field(..., description="Criterion name in Korean")
+    levels: list[RubricLevel] = Field(
+        ..., description="Performance levels from highest to lowest score"
+    )
+    evidence_anchors: list[str] = Field(
+        ..., description="Short observation points teachers should look for"
+    )
+
+
+class Rubric(BaseModel):
+    """Rubric as data, so later stages can be given a compact representation."""
+
+    criteria: list[RubricCriterion] = Field(..., description="3 to 6 criteria")
+
+
+class CriterionEvaluation(BaseModel):
+    criterion: str = Field(..., description="Criterion name as given in the rubric")
+    level: str = Field(..., description="Level label reached by the submission")
+    score: int = Field(..., description="Score of that level")
+    evidence: str = Field(
+        ..., description="Short quote or observation from the submission, in Korean"
+    )
+
+
+class Evaluation(BaseModel):
+    """Per-criterion evaluation as data."""
+
+    criteria: list[CriterionEvaluation] = Field(
+        ..., description="One entry per rubric criterion"
+    )
+    comment: str = Field(..., description="One or two sentence overall comment")
+
+
+def create_rubric_chain(
+    model_name="gpt-4.1-mini", model_type="openai", structured=False
+):
     """Create a chain that generates rubrics.
 
     Parameters
@@ -45,18 +93,18 @@ def create_rubric_chain(model_name="gpt-4.1-mini", model_type="openai"):
     model_type : str, optional
         Provider of the model, either ``"openai"`` or ``"gemini"``. Defaults to
         ``"openai"``.
+    structured : bool, optional
+        Return a :class:`Rubric` instead of markdown. Defaults to ``False``.
 
     Returns
     -------
     Runnable
-        LangChain runnable that produces a rubric in markdown format.
+        LangChain runnable that produces a rubric in markdown format, or a
+        :class:`Rubric` when ``structured`` is set.
     """
 
-    # LLM 준비
-    if model_type == "gemini":
-        llm = ChatGoogleGenerativeAI(model=model_name, temperature=0)
-    else:
-        llm = ChatOpenAI(model=model_name, temperature=0)
+    # LLM 준비 (프로세스 전체에서 공유하는 클라이언트)
+    llm = get_routed_llm("rubric", model_name, model_type)
 
     system = """You are an expert in educational assessment and rubric design in Korean.  
     Your role is to design rubrics for evaluating assignments in elementary, middle, and high schools.  
@@ -71,6 +119,25 @@ def create_rubric_chain(model_name="gpt-4.1-mini", model_type="openai"):
     7. Keep the rubric in Korean and make it in a table format for better readability.
     """
 
+    if structured:
+        # 마크다운 표 대신 데이터로 받아 로컬에서 렌더링 (이후 단계에는 압축 표현만 전달)
+        rubric_prompt = ChatPromptTemplate.from_messages(
+            [
+                ("system", system),
+                (
+                    "human",
+                    "Generate a rubric for the following information:\n"
+                    "topic: {topic}\n"
+                    "objective: {objective}\n"
+                    "grade Level: {grade_level}\n"
+                    "Provide criteria, scored levels, and evidence anchors.",
+                ),
+            ]
+        )
+        return rubric_prompt | llm.with_structured_output(Rubric).with_config(
+            tags=[STRUCTURED_OUTPUT_TAG]
+        )
+
     rubric_prompt = ChatPromptTemplate.from_messages(
         [
             ("system", system),
@@ -102,7 +169,7 @@ class RouteQuery(BaseModel):
 
 def create_evaluation_router_chain():
     # Initialize LLM
-    llm = ChatOpenAI(model="gpt-4.1-mini", temperature=0)
+    llm = get_routed_llm("evaluation_router")
     structured_llm_router = llm.with_structured_output(RouteQuery)
 
     # Set System Prompt
@@ -123,7 +190,9 @@ def create_evaluation_router_chain():
     return question_router
 
 
-def create_evaluation_chain(model_name="gpt-4.1-mini", model_type="openai"):
+def create_evaluation_chain(
+    model_name="gpt-4.1-mini", model_type="openai", structured=False, prefix_cache=False
+):
     """Create a chain that generates rubrics.
 
     Parameters
@@ -133,18 +202,21 @@ def create_evaluation_chain(model_name="gpt-4.1-mini", model_type="openai"):
     model_type : str, optional
         Provider of the model, either ``"openai"`` or ``"gemini"``. Defaults to
         ``"openai"``.
+    structured : bool, optional
+        Return an :class:`Evaluation` instead of markdown. Defaults to ``False``.
+    prefix_cache : bool, optional
+        Use :func:`prefix_cached_prompt` so the rubric is part of a stable
+        prefix. Defaults to ``False``.
 
     Returns
     -------
     Runnable
-        LangChain runnable that produces a evaluation in markdown format.
+        LangChain runnable that produces a evaluation in markdown format, or an
+        :class:`Evaluation` when ``structured`` is set.
     """
 
-    # LLM 준비
-    if model_type == "gemini":
-        llm = ChatGoogleGenerativeAI(model=model_name, temperature=0)
-    else:
-        llm = ChatOpenAI(model=model_name, temperature=0)
+    # LLM 준비 (프로세스 전체에서 공유하는 클라이언트)
+    llm = get_routed_llm("evaluation", model_name, model_type)
 
     # PromptTemplate
     system = """You are an expert in educational assessment and rubric design in Korean.
@@ -155,6 +227,46 @@ def create_evaluation_chain(model_name="gpt-4.1-mini", model_type="openai"):
     Keep the evaluation in Korean and make it in a table format for better readability.
     """
 
+    if structured:
+        if prefix_cache:
+            evaluation_prompt = prefix_cached_prompt(
+                system,
+                "rubric: {rubric}\ngrade level: {grade_level}\n",
+                "Evaluate the submission for the following information:\n"
+                "name: {name}\n"
+                "student submission: {student_submission}\n"
+                "For each criterion give the level, its score and short evidence.",
+            )
+        else:
+            evaluation_prompt = ChatPromptTemplate.from_messages(
+                [
+                    ("system", system),
+                    (
+                        "human",
+                        "Evaluate the submission for the following information:\n"
+                        "rubric: {rubric}\n"
+                        "name: {name}\n"
+                        "grade level: {grade_level}\n"
+                        "student submission: {student_submission}\n"
+                        "For each criterion give the level, its score and short evidence.",
+                    ),
+                ]
+            )
+        return evaluation_prompt | llm.with_structured_output(Evaluation).with_config(
+            tags=[STRUCTURED_OUTPUT_TAG]
+        )
+
+    if prefix_cache:
+        rubric_prompt = prefix_cached_prompt(
+            system,
+            "rubric: {rubric}\ngrade level: {grade_level}\n",
+            "Generate a evaluation in markdown format for the following information:\n"
+            "name: {name}\n"
+            "student submission: {student_submission}\n"
+            "Provide criteria, levels, and sample answers.",
+        )
+        return rubric_prompt | llm | StrOutputParser()
+
     rubric_prompt = ChatPromptTemplate.from_messages(
         [
             ("system", system),
@@ -175,7 +287,9 @@ def create_evaluation_chain(model_name="gpt-4.1-mini", model_type="openai"):
     return rubric_generator
 
 
-def create_feedback_chain(model_name="gpt-4.1-mini", model_type="openai"):
+def create_feedback_chain(
+    model_name="gpt-4.1-mini", model_type="openai", prefix_cache=False
+):
     """Create a chain that generates feedback.
 
     Parameters
@@ -185,6 +299,9 @@ def create_feedback_chain(model_name="gpt-4.1-mini", model_type="openai"):
     model_type : str, optional
         Provider of the model, either ``"openai"`` or ``"gemini"``. Defaults to
         ``"openai"``.
+    prefix_cache : bool, optional
+        Use :func:`prefix_cached_prompt` so the rubric is part of a stable
+        prefix. Defaults to ``False``.
 
     Returns
     -------
@@ -192,11 +309,8 @@ def create_feedback_chain(model_name="gpt-4.1-mini", model_type="openai"):
         LangChain runnable that produces a feedback in markdown format.
     """
 
-    # LLM 준비
-    if model_type == "gemini":
-        llm = ChatGoogleGenerativeAI(model=model_name, temperature=0)
-    else:
-        llm = ChatOpenAI(model=model_name, temperature=0)
+    # LLM 준비 (프로세스 전체에서 공유하는 클라이언트)
+    llm = get_routed_llm("feedback", model_name, model_type)
 
     # PromptTemplate
     system = """You are an expert in educational feedback in Korean.
@@ -206,23 +320,33 @@ def create_feedback_chain(model_name="gpt-4.1-mini", model_type="openai"):
     Keep the feedback in Korean and make it in a table format for better readability.
     """
 
-    feedback_prompt = ChatPromptTemplate.from_messages(
-        [
-            ("system", system),
-            (
-                "human",
-                "Generate a feedback in markdown format for the following information:\n"
-                "rubric: {rubric}\n"
-                "evaluation: {evaluation}\n",
-            ),
-        ]
-    )
+    if prefix_cache:
+        feedback_prompt = prefix_cached_prompt(
+            system,
+            "rubric: {rubric}\n",
+            "Generate a feedback in markdown format for the following information:\n"
+            "evaluation: {evaluation}\n",
+        )
+    else:
+        feedback_prompt = ChatPromptTemplate.from_messages(
+            [
+                ("system", system),
+                (
+                    "human",
+                    "Generate a feedback in markdown format for the following information:\n"
+                    "rubric: {rubric}\n"
+                    "evaluation: {evaluation}\n",
+                ),
+            ]
+        )
 
     feedback_generator = feedback_prompt | llm | StrOutputParser()
     return feedback_generator
 
 
-def create_report_chain(model_name="gpt-4.1-mini", model_type="openai"):
+def create_report_chain(
+    model_name="gpt-4.1-mini", model_type="openai", prefix_cache=False
+):
     """Create a chain that generates a report.
 
     Parameters
@@ -232,6 +356,9 @@ def create_report_chain(model_name="gpt-4.1-mini", model_type="openai"):
      model_type : str, optional
          Provider of the model, either ``"openai"`` or ``"gemini"``. Defaults to
          ``"openai"``.
+     prefix_cache : bool, optional
+         Use :func:`prefix_cached_prompt` so the rubric is part of a stable
+         prefix. Defaults to ``False``.
 
      Returns
      -------
@@ -239,11 +366,8 @@ def create_report_chain(model_name="gpt-4.1-mini", model_type="openai"):
          LangChain runnable that produces a report in markdown format.
     """
 
-    # LLM 준비
-    if model_type == "gemini":
-        llm = ChatGoogleGenerativeAI(model=model_name, temperature=0)
-    else:
-        llm = ChatOpenAI(model=model_name, temperature=0)
+    # LLM 준비 (프로세스 전체에서 공유하는 클라이언트)
+    llm = get_routed_llm("report", model_name, model_type)
 
     # PromptTemplate
     system = """You are an expert in educational reporting in Korean.
@@ -263,20 +387,101 @@ def create_report_chain(model_name="gpt-4.1-mini", model_type="openai"):
 
     """
 
-    report_prompt = ChatPromptTemplate.from_messages(
-        [
-            ("system", system),
-            (
-                "human",
-                "Generate a report in markdown format for the following information:\n"
-                "name: {name}\n"
-                "grade level: {grade_level}\n"
-                "rubric: {rubric}\n"
-                "evaluation: {evaluation}\n"
-                "feedback: {feedback}\n",
-            ),
-        ]
-    )
+    if prefix_cache:
+        report_prompt = prefix_cached_prompt(
+            system,
+            "grade level: {grade_level}\nrubric: {rubric}\n",
+            "Generate a report in markdown format for the following information:\n"
+            "name: {name}\n"
+            "evaluation: {evaluation}\n"
+            "feedback: {feedback}\n",
+        )
+    else:
+        report_prompt = ChatPromptTemplate.from_messages(
+            [
+                ("system", system),
+                (
+                    "human",
+                    "Generate a report in markdown format for the following information:\n"
+                    "name: {name}\n"
+                    "grade level: {grade_level}\n"
+                    "rubric: {rubric}\n"
+                    "evaluation: {evaluation}\n"
+                    "feedback: {feedback}\n",
+                ),
+            ]
+        )
 
     report_chain = report_prompt | llm | StrOutputParser()
     return report_chain
+
+
+def create_teacher_report_chain(
+    model_name="gpt-4.1-mini", model_type="openai", prefix_cache=False
+):
+    """Create a chain that generates the teacher-facing part of a report.
+
+    Unlike :func:`create_report_chain` it only needs the rubric and the
+    evaluation, so it can run in parallel with the feedback chain.
+
+    Parameters
+    ----------
+    model_name : str
+        Identifier of the language model to use. Defaults to ``"gpt-4.1-mini"``.
+    model_type : str, optional
+        Provider of the model, either ``"openai"`` or ``"gemini"``. Defaults to
+        ``"openai"``.
+    prefix_cache : bool, optional
+        Use :func:`prefix_cached_prompt` so the rubric is part of a stable
+        prefix. Defaults to ``False``.
+
+    Returns
+    -------
+    Runnable
+        LangChain runnable that produces the teacher report in markdown format.
+    """
+
+    # LLM 준비 (프로세스 전체에서 공유하는 클라이언트)
+    llm = get_routed_llm("teacher_report", model_name, model_type)
+
+    # PromptTemplate
+    system = """You are an expert in educational reporting in Korean.
+        You are given a rubric and an evaluation of a student's submission.
+        Your task is to generate the teacher-facing part of the student's report.
+
+        Rules:
+        1. Use only the provided rubric and evaluation. Do not invent or assume additional information.
+        2. The report must be written in Korean.
+        3. Present the report in a clear table format for readability.
+        - Include one row per rubric criterion, showing: [Criterion Name | Level & Score | Evidence].
+        - Add a final row for [Total Score].
+        4. After the table, provide a concise, objective analysis of performance for the teacher.
+        5. Keep language free from bias or speculation.
+
+    """
+
+    if prefix_cache:
+        report_prompt = prefix_cached_prompt(
+            system,
+            "grade level: {grade_level}\nrubric: {rubric}\n",
+            "Generate a teacher report in markdown format for the following information:\n"
+            "name: {name}\n"
+            "evaluation: {evaluation}\n",
+        )
+    else:
+        report_prompt = ChatPromptTemplate.from_messages(
+            [
+                ("system", system),
+                (
+                    "human",
+                    "Generate a teacher report in markdown format for the following information:\n"
+                    "name: {name}\n"
+                    "grade level: {grade_level}\n"
+                    "rubric: {rubric}\n"
+                    "evaluation: {evaluation}\n",
+                ),
+            ]
+        )
+
+    teacher_report_chain = report_prompt | llm | StrOutputParser()
+    return teacher_report_chain
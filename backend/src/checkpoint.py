@@ -0,0 +1,545 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from os import environ, path
+from typing import Any, AsyncIterator, Iterator, Optional, Sequence
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.memory import InMemorySaver
+
+# memory: 스레드 수/TTL 제한이 있는 인메모리 저장소 (기본값)
+# sqlite: 재시작 후에도 유지되는 파일 기반 저장소
+CHECKPOINTER = environ.get("RUBRIC_CHECKPOINTER", "memory")
+CHECKPOINT_PATH = environ.get(
+    "RUBRIC_CHECKPOINT_PATH", "/tmp/rubric_checkpoints.sqlite3"
+)
+CHECKPOINT_MAX_THREADS = int(environ.get("RUBRIC_CHECKPOINT_MAX_THREADS", 1000))
+CHECKPOINT_TTL = float(environ.get("RUBRIC_CHECKPOINT_TTL", 24 * 60 * 60))
+
+
+class BoundedMemorySaver(InMemorySaver):
+    """In-memory checkpointer that forgets old threads.
+
+    Threads are evicted least-recently-used first once more than
+    ``max_threads`` are stored, and after ``ttl`` seconds without access.
+    ``0`` disables either limit. Only writes create a thread; reading an
+    unknown thread neither stores nor tracks it.
+    """
+
+    def __init__(self, *, max_threads: int = 0, ttl: float = 0, **kwargs):
+        super().__init__(**kwargs)
+        self.max_threads = max_threads
+        self.ttl = ttl
+        self.evicted = 0
+        self._last_access: OrderedDict[str, float] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _touch(self, config: RunnableConfig) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        if thread_id not in self.storage:
+            return
+        with self._lock:
+            self._last_access[thread_id] = time.monotonic()
+            self._last_access.move_to_end(thread_id)
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        expired = []
+        with self._lock:
+            for thread_id, accessed_at in self._last_access.items():
+                if self.ttl and now - accessed_at > self.ttl:
+                    expired.append(thread_id)
+                elif (
+                    self.max_threads
+                    and len(self._last_access) - len(expired) > self.max_threads
+                ):
+                    expired.append(thread_id)
+                else:
+                    break
+        for thread_id in expired:
+            self.delete_thread(thread_id)
+            self.evicted += 1
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        # InMemorySaver 의 defaultdict 는 조회만 해도 빈 스레드를 만듦 - 없는 스레드를
+        # 읽는 요청(404 조회, 새 스레드의 재개 확인)이 실제 스레드를 밀어내지 않도록 함
+        if config["configurable"]["thread_id"] not in self.storage:
+            return None
+        self._touch(config)
+        return super().get_tuple(config)
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        if config and config["configurable"]["thread_id"] not in self.storage:
+            return iter(())
+        return super().list(config, filter=filter, before=before, limit=limit)
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        next_config = super().put(config, checkpoint, metadata, new_versions)
+        self._touch(config)
+        self._evict()
+        return next_config
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        super().put_writes(config, writes, task_id, task_path)
+        self._touch(config)
+
+    def delete_thread(self, thread_id: str) -> None:
+        super().delete_thread(thread_id)
+        with self._lock:
+            self._last_access.pop(thread_id, None)
+
+    def get_next_version(self, current: Optional[int], channel: None) -> int:
+        # InMemorySaver 의 "0000...0001.0.8372..." 문자열 대신 정수 버전 - 체크포인트마다
+        # 모든 채널의 버전이 저장되므로 채널당 약 50바이트씩 줄어듦
+        return 1 if current is None else current + 1
+
+    def stats(self) -> dict:
+        """Thread/checkpoint counts and the size of the serialized state."""
+        checkpoints = 0
+        payload_bytes = 0
+        for namespaces in list(self.storage.values()):
+            for saved in list(namespaces.values()):
+                checkpoints += len(saved)
+                for checkpoint, metadata, _ in list(saved.values()):
+                    payload_bytes += len(checkpoint[1]) + len(metadata[1])
+        for outer in list(self.writes.values()):
+            for _, _, value, _ in list(outer.values()):
+                payload_bytes += len(value[1])
+        for blob in list(self.blobs.values()):
+            payload_bytes += len(blob[1])
+        return {
+            "backend": "memory",
+            "threads": len(self.storage),
+            "checkpoints": checkpoints,
+            "payload_bytes": payload_bytes,
+            "max_threads": self.max_threads,
+            "ttl": self.ttl,
+            "evicted": self.evicted,
+        }
+
+
+class SQLiteSaver(BaseCheckpointSaver[int]):
+    """Checkpointer persisted to a local SQLite file.
+
+    Every checkpoint is stored as one serialized row, so thread history
+    survives process restarts. Channel values are stored separately, once
+    per channel version, so a checkpoint does not re-serialize the sections
+    that did not change in its step. Threads not written for ``ttl`` seconds
+    and the least recently written threads beyond ``max_threads`` are pruned.
+    """
+
+    def __init__(
+        self, db_path: str, *, max_threads: int = 0, ttl: float = 0, serde=None
+    ):
+        super().__init__(serde=serde)
+        self.db_path = db_path
+        self.max_threads = max_threads
+        self.ttl = ttl
+        self.evicted = 0
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.executescript("""
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                thread_id TEXT NOT NULL,
+                checkpoint_ns TEXT NOT NULL DEFAULT '',
+                checkpoint_id TEXT NOT NULL,
+                parent_checkpoint_id TEXT,
+                type TEXT,
+                checkpoint BLOB,
+                metadata_type TEXT,
+                metadata BLOB,
+                PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+            );
+            CREATE TABLE IF NOT EXISTS writes (
+                thread_id TEXT NOT NULL,
+                checkpoint_ns TEXT NOT NULL DEFAULT '',
+                checkpoint_id TEXT NOT NULL,
+                task_id TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                channel TEXT NOT NULL,
+                type TEXT,
+                value BLOB,
+                task_path TEXT NOT NULL DEFAULT '',
+                PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+            );
+            CREATE TABLE IF NOT EXISTS blobs (
+                thread_id TEXT NOT NULL,
+                checkpoint_ns TEXT NOT NULL DEFAULT '',
+                channel TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                type TEXT,
+                value BLOB,
+                PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+            );
+            CREATE TABLE IF NOT EXISTS threads (
+                thread_id TEXT PRIMARY KEY,
+                accessed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS threads_accessed_at ON threads (accessed_at);
+            """)
+        self.conn.commit()
+
+    def _pending_writes(self, thread_id, checkpoint_ns, checkpoint_id) -> list:
+        rows = self.conn.execute(
+            "SELECT task_id, channel, type, value FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? "
+            "ORDER BY task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        return [
+            (task_id, channel, self.serde.loads_typed((type_, value)))
+            for task_id, channel, type_, value in rows
+        ]
+
+    def _channel_values(self, thread_id, checkpoint_ns, channel_versions) -> dict:
+        rows = self.conn.execute(
+            "SELECT channel, version, type, value FROM blobs "
+            "WHERE thread_id = ? AND checkpoint_ns = ?",
+            (thread_id, checkpoint_ns),
+        ).fetchall()
+        return {
+            channel: self.serde.loads_typed((type_, value))
+            for channel, version, type_, value in rows
+            if channel_versions.get(channel) == version and type_ != "empty"
+        }
+
+    def _to_tuple(self, row) -> CheckpointTuple:
+        (
+            thread_id,
+            checkpoint_ns,
+            checkpoint_id,
+            parent_checkpoint_id,
+            type_,
+            checkpoint,
+            metadata_type,
+            metadata,
+        ) = row
+        checkpoint = self.serde.loads_typed((type_, checkpoint))
+        if "channel_values" not in checkpoint:
+            # 값을 체크포인트 행에 함께 저장하던 이전 형식의 행은 그대로 읽음
+            checkpoint["channel_values"] = self._channel_values(
+                thread_id, checkpoint_ns, checkpoint["channel_versions"]
+            )
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint=checkpoint,
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_checkpoint_id,
+                    }
+                }
+                if parent_checkpoint_id
+                else None
+            ),
+            pending_writes=self._pending_writes(
+                thread_id, checkpoint_ns, checkpoint_id
+            ),
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, "
+            "type, checkpoint, metadata_type, metadata FROM checkpoints "
+            "WHERE thread_id = ? AND checkpoint_ns = ?"
+        )
+        params: tuple = (thread_id, checkpoint_ns)
+        if checkpoint_id := get_checkpoint_id(config):
+            query += " AND checkpoint_id = ?"
+            params += (checkpoint_id,)
+        else:
+            query += " ORDER BY checkpoint_id DESC LIMIT 1"
+        with self._lock:
+            row = self.conn.execute(query, params).fetchone()
+            return self._to_tuple(row) if row else None
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, "
+            "type, checkpoint, metadata_type, metadata FROM checkpoints WHERE 1 = 1"
+        )
+        params: tuple = ()
+        if config:
+            query += " AND thread_id = ?"
+            params += (config["configurable"]["thread_id"],)
+            if (
+                checkpoint_ns := config["configurable"].get("checkpoint_ns")
+            ) is not None:
+                query += " AND checkpoint_ns = ?"
+                params += (checkpoint_ns,)
+            if checkpoint_id := get_checkpoint_id(config):
+                query += " AND checkpoint_id = ?"
+                params += (checkpoint_id,)
+        if before and (before_checkpoint_id := get_checkpoint_id(before)):
+            query += " AND checkpoint_id < ?"
+            params += (before_checkpoint_id,)
+        query += " ORDER BY checkpoint_id DESC"
+
+        with self._lock:
+            rows = self.conn.execute(query, params).fetchall()
+            tuples = []
+            for row in rows:
+                if limit is not None and len(tuples) >= limit:
+                    break
+                checkpoint_tuple = self._to_tuple(row)
+                if filter and not all(
+                    checkpoint_tuple.metadata.get(key) == value
+                    for key, value in filter.items()
+                ):
+                    continue
+                tuples.append(checkpoint_tuple)
+        yield from tuples
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint = checkpoint.copy()
+        values = checkpoint.pop("channel_values")
+        # 이번 단계에서 바뀐 채널 값만 저장 - 나머지는 이전 버전의 행을 그대로 참조
+        blob_rows = [
+            (
+                thread_id,
+                checkpoint_ns,
+                channel,
+                version,
+                *(
+                    self.serde.dumps_typed(values[channel])
+                    if channel in values
+                    else ("empty", b"")
+                ),
+            )
+            for channel, version in new_versions.items()
+        ]
+        type_, serialized = self.serde.dumps_typed(checkpoint)
+        metadata_type, serialized_metadata = self.serde.dumps_typed(
+            get_checkpoint_metadata(config, metadata)
+        )
+        with self._lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?, ?)", blob_rows
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    thread_id,
+                    checkpoint_ns,
+                    checkpoint["id"],
+                    config["configurable"].get("checkpoint_id"),
+                    type_,
+                    serialized,
+                    metadata_type,
+                    serialized_metadata,
+                ),
+            )
+            self._touch(thread_id)
+            self._evict()
+            self.conn.commit()
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        # 특수 채널(에러, 인터럽트 등)은 덮어쓰고 일반 쓰기는 최초 값만 유지
+        verb = (
+            "INSERT OR REPLACE"
+            if all(channel in WRITES_IDX_MAP for channel, _ in writes)
+            else "INSERT OR IGNORE"
+        )
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            type_, serialized = self.serde.dumps_typed(value)
+            rows.append(
+                (
+                    thread_id,
+                    checkpoint_ns,
+                    checkpoint_id,
+                    task_id,
+                    WRITES_IDX_MAP.get(channel, idx),
+                    channel,
+                    type_,
+                    serialized,
+                    task_path,
+                )
+            )
+        with self._lock:
+            self.conn.executemany(
+                f"{verb} INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            self._touch(thread_id)
+            self.conn.commit()
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self._delete(thread_id)
+            self.conn.commit()
+
+    def _delete(self, thread_id: str) -> None:
+        for table in ("checkpoints", "writes", "blobs", "threads"):
+            self.conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+
+    def _touch(self, thread_id: str) -> None:
+        self.conn.execute(
+            "INSERT OR REPLACE INTO threads VALUES (?, ?)", (thread_id, time.time())
+        )
+
+    def _evict(self) -> None:
+        expired = []
+        if self.ttl:
+            expired += self.conn.execute(
+                "SELECT thread_id FROM threads WHERE accessed_at < ?",
+                (time.time() - self.ttl,),
+            ).fetchall()
+        if self.max_threads:
+            expired += self.conn.execute(
+                "SELECT thread_id FROM threads ORDER BY accessed_at DESC "
+                "LIMIT -1 OFFSET ?",
+                (self.max_threads,),
+            ).fetchall()
+        for (thread_id,) in set(expired):
+            self._delete(thread_id)
+            self.evicted += 1
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return self.get_tuple(config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        for item in self.list(config, filter=filter, before=before, limit=limit):
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return self.put(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        return self.put_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        return self.delete_thread(thread_id)
+
+    def stats(self) -> dict:
+        """Thread/checkpoint counts and the size of the database."""
+        with self._lock:
+            (threads,) = self.conn.execute("SELECT COUNT(*) FROM threads").fetchone()
+            checkpoints, checkpoint_bytes = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(checkpoint) + "
+                "LENGTH(metadata)), 0) FROM checkpoints"
+            ).fetchone()
+            (write_bytes,) = self.conn.execute(
+                "SELECT COALESCE(SUM(LENGTH(value)), 0) FROM writes"
+            ).fetchone()
+            (blob_bytes,) = self.conn.execute(
+                "SELECT COALESCE(SUM(LENGTH(value)), 0) FROM blobs"
+            ).fetchone()
+        return {
+            "backend": "sqlite",
+            "path": self.db_path,
+            "threads": threads,
+            "checkpoints": checkpoints,
+            "payload_bytes": checkpoint_bytes + write_bytes + blob_bytes,
+            "file_bytes": (
+                path.getsize(self.db_path) if path.exists(self.db_path) else 0
+            ),
+            "max_threads": self.max_threads,
+            "ttl": self.ttl,
+            "evicted": self.evicted,
+        }
+
+
+def create_checkpointer(kind: str = CHECKPOINTER) -> BaseCheckpointSaver:
+    """Build the checkpointer selected by ``RUBRIC_CHECKPOINTER``."""
+    if kind == "sqlite":
+        return SQLiteSaver(
+            CHECKPOINT_PATH, max_threads=CHECKPOINT_MAX_THREADS, ttl=CHECKPOINT_TTL
+        )
+    if kind == "memory":
+        return BoundedMemorySaver(
+            max_threads=CHECKPOINT_MAX_THREADS, ttl=CHECKPOINT_TTL
+        )
+    raise ValueError(f"Unknown checkpointer: {kind!r} (expected 'memory' or 'sqlite')")
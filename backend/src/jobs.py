@@ -0,0 +1,347 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from os import environ
+from typing import Any, Optional
+
+from pydantic_core import to_jsonable_python
+
+from .metrics import log_event
+
+JOBS_PATH = environ.get("RUBRIC_JOBS_PATH", "/tmp/rubric_jobs.sqlite3")
+# API 프로세스 안에서 잡을 처리할 워커 수. Lambda 처럼 응답 후 프로세스가 멈추는
+# 환경에서는 0으로 두고 같은 DB 파일을 보는 `python -m backend.src.jobs` 를 따로 실행
+JOB_WORKERS = int(environ.get("RUBRIC_JOB_WORKERS", 2))
+JOB_POLL_INTERVAL = float(environ.get("RUBRIC_JOB_POLL_INTERVAL", 1.0))
+# 이 시간 동안 진행 기록이 없는 running 잡은 워커가 죽은 것으로 보고 다시 대기열로
+JOB_STALE_AFTER = float(environ.get("RUBRIC_JOB_STALE_AFTER", 600))
+JOB_MAX_ATTEMPTS = int(environ.get("RUBRIC_JOB_MAX_ATTEMPTS", 3))
+# 끝난 잡을 보관하는 시간(초)
+JOB_TTL = float(environ.get("RUBRIC_JOB_TTL", 7 * 24 * 60 * 60))
+
+COLUMNS = (
+    "id",
+    "kind",
+    "tenant",
+    "request",
+    "status",
+    "stage",
+    "result",
+    "error",
+    "attempts",
+    "created_at",
+    "started_at",
+    "updated_at",
+    "finished_at",
+)
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, default=to_jsonable_python)
+
+
+class JobStore:
+    """SQLite-backed job queue shared by the API and any number of workers.
+
+    A job moves ``queued`` → ``running`` → ``succeeded``/``failed``. Workers
+    claim jobs with a single ``UPDATE ... RETURNING`` statement, so several
+    processes can share one database file. ``result`` holds the stage
+    outputs produced so far and is readable while the job is running.
+
+    Parameters
+    ----------
+    path : str
+        SQLite database file. ``":memory:"`` keeps jobs in process.
+    """
+
+    def __init__(self, path: str = JOBS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, kind TEXT NOT NULL, tenant TEXT, "
+            "request TEXT NOT NULL, status TEXT NOT NULL, stage TEXT, "
+            "result TEXT, error TEXT, attempts INTEGER NOT NULL DEFAULT 0, "
+            "created_at REAL NOT NULL, started_at REAL, updated_at REAL NOT NULL, "
+            "finished_at REAL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS jobs_status_created_at"
+            " ON jobs (status, created_at)"
+        )
+        self._conn.commit()
+
+    def _row(self, row) -> dict:
+        job = dict(zip(COLUMNS, row))
+        job["request"] = json.loads(job["request"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def create(self, kind: str, request: dict, tenant: Optional[str] = None) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, tenant, request, status, created_at,"
+                " updated_at) VALUES (?, ?, ?, ?, 'queued', ?, ?)",
+                (job_id, kind, tenant, _dumps(request), now, now),
+            )
+            self._conn.commit()
+        return job_id
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return self._row(row) if row is not None else None
+
+    def claim(self) -> Optional[dict]:
+        """Mark the oldest queued job as running and return it."""
+        now = time.time()
+        with self._lock:
+            self._requeue_stale(now)
+            row = self._conn.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1,"
+                " started_at = ?, updated_at = ? WHERE id = ("
+                " SELECT id FROM jobs WHERE status = 'queued'"
+                " ORDER BY created_at LIMIT 1) AND status = 'queued'"
+                f" RETURNING {', '.join(COLUMNS)}",
+                (now, now),
+            ).fetchone()
+            self._conn.commit()
+        return self._row(row) if row is not None else None
+
+    def _requeue_stale(self, now: float) -> None:
+        # 워커가 죽어 멈춘 잡: 시도 횟수가 남았으면 다시 대기열로, 아니면 실패 처리
+        self._conn.execute(
+            "UPDATE jobs SET status = CASE WHEN attempts < ? THEN 'queued'"
+            " ELSE 'failed' END, error = CASE WHEN attempts < ? THEN error"
+            " ELSE 'worker stopped responding' END, updated_at = ?"
+            " WHERE status = 'running' AND updated_at < ?",
+            (JOB_MAX_ATTEMPTS, JOB_MAX_ATTEMPTS, now, now - JOB_STALE_AFTER),
+        )
+
+    def update(self, job_id: str, result: Any, stage: Optional[str] = None) -> None:
+        """Store the partial result of a running job (also a heartbeat)."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET result = ?, stage = COALESCE(?, stage),"
+                " updated_at = ? WHERE id = ?",
+                (_dumps(result), stage, time.time(), job_id),
+            )
+            self._conn.commit()
+
+    def finish(
+        self, job_id: str, result: Any = None, error: Optional[str] = None
+    ) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = COALESCE(?, result),"
+                " error = ?, stage = NULL, updated_at = ?, finished_at = ?"
+                " WHERE id = ?",
+                (
+                    "failed" if error else "succeeded",
+                    None if result is None else _dumps(result),
+                    error,
+                    now,
+                    now,
+                    job_id,
+                ),
+            )
+            self._conn.commit()
+
+    def requeue(self, job_id: str) -> None:
+        """Give a running job back, e.g. when its worker shuts down."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'queued', attempts = MAX(attempts - 1, 0),"
+                " updated_at = ? WHERE id = ? AND status = 'running'",
+                (time.time(), job_id),
+            )
+            self._conn.commit()
+
+    def purge(self, ttl: float = JOB_TTL) -> int:
+        """Delete jobs that finished more than ``ttl`` seconds ago."""
+        with self._lock:
+            deleted = self._conn.execute(
+                "DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?",
+                (time.time() - ttl,),
+            ).rowcount
+            self._conn.commit()
+        return deleted
+
+    def stats(self) -> dict:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) FROM jobs GROUP BY status"
+            ).fetchall()
+        return {"path": self.path, **dict(rows)}
+
+
+async def run_rubric_job(store: JobStore, job: dict) -> Any:
+    """Run one teacher input through the graph, saving each stage as it ends."""
+    from .payload import project
+    from .rubric import stream_response
+
+    request = job["request"]
+    partial: dict = dict(job["result"] or {})
+    # 잡 id 를 thread_id 로 써서, 다시 잡힌 잡은 체크포인트부터 이어서 실행
+    async for event in stream_response(
+        request["teacher_input"],
+        f"job:{job['id']}",
+        use_cache=request.get("use_cache", True),
+        pipeline=request.get("pipeline", "linear"),
+        resume=True,
+        compact=request.get("compact", False),
+        prefix_cache=request.get("prefix_cache", False),
+        speculative=request.get("speculative", False),
+    ):
+        if event["event"] == "node_start":
+            store.update(job["id"], partial, stage=event["node"])
+        elif event["event"] == "node_end" and isinstance(event["output"], dict):
+            partial.update(event["output"])
+            store.update(job["id"], partial)
+        elif event["event"] == "done":
+            return project(
+                event["generated_results"],
+                request.get("fields"),
+                request.get("format", "markdown"),
+            )
+    return partial
+
+
+async def run_batch_job(store: JobStore, job: dict) -> Any:
+    """Grade a class, saving the rubric and every student result as they finish."""
+    from .rubric import batch_response
+
+    request = job["request"]
+    partial: dict = {"students": [], "total": len(request["submissions"])}
+    async for event in batch_response(
+        request["teacher_input"],
+        request["submissions"],
+        f"job:{job['id']}",
+        max_concurrency=request.get("max_concurrency", 5),
+        use_cache=request.get("use_cache", True),
+        pipeline=request.get("pipeline", "linear"),
+        compact=request.get("compact", False),
+        prefix_cache=request.get("prefix_cache", True),
+    ):
+        if event["type"] == "rubric":
+            partial.update(teacher_input=event["teacher_input"], rubric=event["rubric"])
+            store.update(job["id"], partial, stage="grading")
+        else:
+            partial["students"].append(event)
+            partial["students"].sort(key=lambda result: result["index"])
+            store.update(job["id"], partial)
+    return partial
+
+
+JOB_RUNNERS = {"rubric": run_rubric_job, "batch": run_batch_job}
+
+
+class JobWorkers:
+    """A pool of asyncio tasks that process jobs from a :class:`JobStore`.
+
+    Parameters
+    ----------
+    store : JobStore
+        Queue to take jobs from.
+    concurrency : int
+        Jobs processed at the same time.
+    """
+
+    def __init__(self, store: JobStore, concurrency: int = JOB_WORKERS):
+        self.store = store
+        self.concurrency = concurrency
+        self._tasks: list[asyncio.Task] = []
+        self._wake: Optional[asyncio.Event] = None
+
+    def start(self) -> None:
+        self._wake = asyncio.Event()
+        self._tasks = [
+            asyncio.ensure_future(self._work()) for _ in range(self.concurrency)
+        ]
+
+    def notify(self) -> None:
+        """Wake idle workers after a job was queued in this process."""
+        if self._wake is not None:
+            self._wake.set()
+
+    async def wait(self) -> None:
+        await asyncio.gather(*self._tasks)
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _work(self) -> None:
+        while True:
+            # SQLite 접근은 짧지만 이벤트 루프를 막지 않도록 스레드에서 실행
+            job = await asyncio.to_thread(self.store.claim)
+            if job is None:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), JOB_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(job)
+
+    async def _run(self, job: dict) -> None:
+        started = time.perf_counter()
+        log_event("job_started", job_id=job["id"], kind=job["kind"])
+        try:
+            result = await JOB_RUNNERS[job["kind"]](self.store, job)
+        except asyncio.CancelledError:
+            # 서버 종료 - 다른 워커가 체크포인트부터 이어서 처리하도록 반납
+            self.store.requeue(job["id"])
+            raise
+        except Exception as e:
+            self.store.finish(job["id"], error=str(e))
+            status = "failed"
+        else:
+            self.store.finish(job["id"], result=result)
+            status = "succeeded"
+        log_event(
+            "job_finished",
+            job_id=job["id"],
+            kind=job["kind"],
+            status=status,
+            duration_ms=round((time.perf_counter() - started) * 1000, 2),
+        )
+
+
+_store: Optional[JobStore] = None
+
+
+def get_job_store() -> JobStore:
+    global _store
+    if _store is None:
+        _store = JobStore()
+    return _store
+
+
+async def run_workers(concurrency: int = JOB_WORKERS) -> None:
+    """Process jobs until cancelled (``python -m backend.src.jobs``)."""
+    store = get_job_store()
+    store.purge()
+    workers = JobWorkers(store, max(1, concurrency))
+    workers.start()
+    log_event("job_workers_started", concurrency=workers.concurrency, path=store.path)
+    try:
+        await workers.wait()
+    finally:
+        await workers.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(run_workers())
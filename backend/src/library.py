@@ -0,0 +1,384 @@
+import difflib
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from itertools import accumulate
+from os import environ
+from typing import Optional
+
+import numpy as np
+
+from .cache import CACHE_PATH, normalize_text
+
+# assignment_similarity 가 이 값 이상이면 기존 루브릭을 재사용 (학년과 모델은 정확히
+# 같아야 함). 빈 값이면 끔
+_threshold = environ.get("RUBRIC_LIBRARY_THRESHOLD", "0.9")
+LIBRARY_THRESHOLD: Optional[float] = float(_threshold) if _threshold else None
+# 유사도에서 주제가 차지하는 비중 - 나머지는 목적. 과제를 가르는 것은 주제이고, 목적은
+# 같은 과제라도 표현이 많이 바뀜
+TOPIC_WEIGHT = 0.8
+
+NGRAM = 3
+NUM_PERM = 64
+# LSH 밴드: 16개 밴드 x 4행 - 주제 유사도 약 0.5 이상인 쌍이 후보로 잡힘
+BANDS = 16
+ROWS_PER_BAND = NUM_PERM // BANDS
+# 정렬된 밴드 인덱스에 아직 없는 항목이 이만큼(또는 인덱스의 1/8) 쌓이면 다시 정렬
+# (그 전까지 새 항목은 선형 비교)
+REBUILD_EVERY = 1024
+# 추정 유사도가 높은 후보 몇 개만 저장된 글로 정확히 비교
+CANDIDATES = 8
+
+# 서명은 DB 에 저장되므로 모든 프로세스가 같은 해시 함수를 써야 함 - 시드 고정
+_rng = np.random.default_rng(20250917)
+_MULTIPLIERS = _rng.integers(0, 2**64, NUM_PERM, dtype=np.uint64) | np.uint64(1)
+_OFFSETS = _rng.integers(0, 2**64, NUM_PERM, dtype=np.uint64)
+
+
+def assignment_text(teacher_input) -> str:
+    return normalize_text(f"{teacher_input.topic}\n{teacher_input.objective}")
+
+
+def assignment_signature(topic: str, objective: str) -> np.ndarray:
+    """MinHash signatures of the topic and the objective, side by side.
+
+    Spaces and punctuation are left out, as in :func:`assignment_similarity`,
+    so a respaced topic has the same signature.
+    """
+    return np.concatenate(
+        [minhash("".join(_words(topic))), minhash("".join(_words(objective)))]
+    )
+
+
+def _ngrams(text: str) -> set[str]:
+    return {text[i : i + NGRAM] for i in range(max(1, len(text) - NGRAM + 1))}
+
+
+def _words(text: str) -> list[str]:
+    return re.findall(r"\w+", normalize_text(text))
+
+
+def kept_words(text: str, other: str) -> float:
+    """Fraction of the words of both texts that the other spells the same.
+
+    The texts are aligned character by character, ignoring spaces and
+    punctuation. A word is kept when it lies in an aligned stretch that
+    starts and ends on a word boundary of both texts. Respacing keeps every
+    word ("환경문제" vs "환경 문제"). A word that is swapped or grows
+    ("물" vs "인물") is lost, with the words it was run together with.
+    """
+    words, other_words = _words(text), _words(other)
+    if not words and not other_words:
+        return 1.0
+    bounds, other_bounds = ([0, *accumulate(map(len, w))] for w in (words, other_words))
+    other_set = set(other_bounds)
+    kept = 0
+    matcher = difflib.SequenceMatcher(
+        None, "".join(words), "".join(other_words), autojunk=False
+    )
+    for i, j, size in matcher.get_matching_blocks():
+        # 이 구간에서 두 글 모두 단어 경계인 위치 - 그 사이의 단어는 양쪽이 같음
+        common = [p for p in bounds if i <= p <= i + size and p - i + j in other_set]
+        for lo, hi in zip(common, common[1:]):
+            kept += sum(lo <= s and e <= hi for s, e in zip(bounds, bounds[1:]))
+            lo, hi = lo - i + j, hi - i + j
+            kept += sum(
+                lo <= s and e <= hi for s, e in zip(other_bounds, other_bounds[1:])
+            )
+    return kept / (len(words) + len(other_words))
+
+
+def assignment_similarity(
+    topic: str, objective: str, other_topic: str, other_objective: str
+) -> float:
+    """How likely two assignments are the same one, from 0 to 1.
+
+    ``TOPIC_WEIGHT`` times the :func:`kept_words` of the topics plus the
+    rest times the character similarity of the objectives (ignoring spaces
+    and punctuation). A topic is short and names its subject in a word or
+    two ("분수의 덧셈" vs "소수의 덧셈"), so a changed topic word costs a
+    lot. Objectives are reworded freely ("환경 논제 글쓰기" vs "환경 주제
+    논설문 쓰기"), so they only need to share about half their characters
+    when the topics match.
+    """
+    objectives = ("".join(_words(text)) for text in (objective, other_objective))
+    topic_similarity = kept_words(topic, other_topic)
+    objective_similarity = difflib.SequenceMatcher(
+        None, *objectives, autojunk=False
+    ).ratio()
+    return TOPIC_WEIGHT * topic_similarity + (1 - TOPIC_WEIGHT) * objective_similarity
+
+
+def minhash(text: str) -> np.ndarray:
+    """MinHash signature of the character n-grams of ``text``.
+
+    Each of the ``NUM_PERM`` hash functions is a multiply-shift hash of the
+    n-gram's CRC32. Only the low 16 bits of each minimum are kept, which
+    makes a false slot match 1 in 65536.
+    """
+    grams = _ngrams(text)
+    hashes = np.fromiter(
+        (zlib.crc32(gram.encode("utf-8")) for gram in grams),
+        dtype=np.uint64,
+        count=len(grams),
+    )
+    mixed = (hashes[:, None] * _MULTIPLIERS + _OFFSETS) >> np.uint64(32)
+    return mixed.min(axis=0).astype(np.uint16)
+
+
+def _band_keys(signatures: np.ndarray) -> np.ndarray:
+    # 주제 서명만 밴드로 나눔 - 주제가 비슷해야 후보가 됨
+    # 밴드마다 16비트 값 4개를 64비트 키 하나로 묶음: (n, NUM_PERM) -> (n, BANDS)
+    return np.ascontiguousarray(signatures[:, :NUM_PERM]).view(np.uint64)
+
+
+def _scores(signatures: np.ndarray, signature: np.ndarray) -> np.ndarray:
+    # assignment_similarity 와 같은 비중으로 주제/목적의 추정 유사도를 합침
+    equal = signatures == signature
+    topics = equal[:, :NUM_PERM].mean(axis=1)
+    objectives = equal[:, NUM_PERM:].mean(axis=1)
+    return TOPIC_WEIGHT * topics + (1 - TOPIC_WEIGHT) * objectives
+
+
+class _Partition:
+    """MinHash LSH index over the rubrics of one model and grade level.
+
+    Entries are found by the bands of their topic signature. Band keys are
+    kept sorted per band, so candidates are found with one binary search
+    per band. New entries are compared linearly until enough of them have
+    accumulated to re-sort.
+    """
+
+    def __init__(self):
+        self.ids = np.empty(0, dtype=np.int64)
+        self.signatures = np.empty((0, 2 * NUM_PERM), dtype=np.uint16)
+        self.indexed = 0
+        self._sorted_keys = np.empty((BANDS, 0), dtype=np.uint64)
+        self._order = np.empty((BANDS, 0), dtype=np.int64)
+        self._pending_ids: list[int] = []
+        self._pending: list[np.ndarray] = []
+        self._pending_array: Optional[np.ndarray] = None
+
+    def add(self, entry_id: int, signature: np.ndarray) -> None:
+        self._pending_ids.append(entry_id)
+        self._pending.append(signature)
+        self._pending_array = None
+
+    def maybe_rebuild(self) -> None:
+        if len(self._pending) >= max(REBUILD_EVERY, self.indexed // 8):
+            self.rebuild()
+
+    def rebuild(self) -> None:
+        if self._pending:
+            self.ids = np.concatenate([self.ids, self._pending_ids])
+            self.signatures = np.concatenate([self.signatures, np.stack(self._pending)])
+            self._pending_ids, self._pending = [], []
+            self._pending_array = None
+        keys = _band_keys(self.signatures).T
+        self._order = np.argsort(keys, axis=1, kind="stable")
+        self._sorted_keys = np.take_along_axis(keys, self._order, axis=1)
+        self.indexed = len(self.ids)
+
+    def nearest(self, signature: np.ndarray, limit: int = CANDIDATES) -> list[int]:
+        """Ids of up to ``limit`` candidates, closest first.
+
+        Candidates are ranked by the estimated Jaccard similarities of the
+        topics and of the objectives, weighted like
+        :func:`assignment_similarity`.
+        """
+        query = _band_keys(signature[None, :])[0]
+        # 어느 한 밴드라도 키가 같은 항목이 후보
+        rows = []
+        for band in range(BANDS):
+            keys = self._sorted_keys[band]
+            lo = np.searchsorted(keys, query[band], "left")
+            hi = np.searchsorted(keys, query[band], "right")
+            if hi > lo:
+                rows.append(self._order[band, lo:hi])
+        ids, scores = [], []
+        if rows:
+            candidates = np.unique(np.concatenate(rows))
+            ids.append(self.ids[candidates])
+            scores.append(_scores(self.signatures[candidates], signature))
+        if self._pending:
+            if self._pending_array is None:
+                self._pending_array = np.stack(self._pending)
+            ids.append(np.asarray(self._pending_ids, dtype=np.int64))
+            scores.append(_scores(self._pending_array, signature))
+        if not ids:
+            return []
+        ids, scores = np.concatenate(ids), np.concatenate(scores)
+        top = np.argsort(-scores, kind="stable")[:limit]
+        return ids[top].tolist()
+
+    def __len__(self) -> int:
+        return len(self.ids) + len(self._pending)
+
+
+class RubricLibrary:
+    """Every generated rubric, searchable by assignment similarity.
+
+    Rubrics are stored in SQLite with the assignment fields they were made
+    for, and indexed in memory by the MinHash signatures of the topic and
+    of the objective, one index per model and grade level. :meth:`find`
+    returns the closest stored rubric by :func:`assignment_similarity`, so
+    a reworded assignment for the same grade reuses a rubric instead of
+    generating a new one. A long shared objective cannot make up for a
+    different topic. Rows added by other processes are picked up on the
+    next lookup.
+
+    Parameters
+    ----------
+    path : str
+        SQLite database file. ``":memory:"`` keeps the library in process.
+    table : str
+        Table name, so the library can share the rubric cache's file.
+    """
+
+    def __init__(self, path: str = CACHE_PATH, table: str = "rubric_library"):
+        self.path = path
+        self.table = table
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._partitions: dict[tuple[str, int], _Partition] = {}
+        self._loaded_id = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "id INTEGER PRIMARY KEY, model TEXT NOT NULL, "
+            "grade_level INTEGER NOT NULL, topic TEXT NOT NULL, "
+            "objective TEXT NOT NULL, text TEXT NOT NULL, "
+            "signature BLOB NOT NULL, rubric TEXT NOT NULL, "
+            "created_at REAL NOT NULL, UNIQUE (model, grade_level, text))"
+        )
+        self._conn.commit()
+
+    def _sync(self) -> None:
+        # 주제/목적을 하나로 해시하던 예전 행은 저장된 글에서 서명을 다시 계산
+        size = 2 * NUM_PERM * 2
+        rows = self._conn.execute(
+            f"SELECT id, model, grade_level, signature,"
+            f" CASE WHEN length(signature) = {size} THEN NULL ELSE topic END,"
+            f" CASE WHEN length(signature) = {size} THEN NULL ELSE objective END"
+            f" FROM {self.table} WHERE id > ? ORDER BY id",
+            (self._loaded_id,),
+        ).fetchall()
+        touched = set()
+        for entry_id, model, grade_level, signature, topic, objective in rows:
+            if topic is None:
+                signature = np.frombuffer(signature, dtype=np.uint16)
+            else:
+                signature = assignment_signature(topic, objective)
+            partition = self._partitions.setdefault((model, grade_level), _Partition())
+            partition.add(entry_id, signature)
+            touched.add(partition)
+            self._loaded_id = entry_id
+        for partition in touched:
+            partition.maybe_rebuild()
+
+    def add(self, teacher_input, model: str, rubric: str) -> None:
+        """Store ``rubric`` as generated for ``teacher_input`` by ``model``."""
+        text = assignment_text(teacher_input)
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR IGNORE INTO {self.table} (model, grade_level, topic,"
+                " objective, text, signature, rubric, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    model,
+                    teacher_input.grade_level,
+                    teacher_input.topic,
+                    teacher_input.objective,
+                    text,
+                    assignment_signature(
+                        teacher_input.topic, teacher_input.objective
+                    ).tobytes(),
+                    rubric,
+                    time.time(),
+                ),
+            )
+            self._conn.commit()
+            self._sync()
+
+    def find(
+        self,
+        teacher_input,
+        model: str,
+        threshold: Optional[float] = LIBRARY_THRESHOLD,
+    ) -> Optional[dict]:
+        """The stored rubric closest to ``teacher_input``, if similar enough.
+
+        Parameters
+        ----------
+        threshold : float, optional
+            Minimum :func:`assignment_similarity`. ``None`` disables the
+            lookup.
+
+        Returns
+        -------
+        dict or None
+            ``id``, ``similarity``, ``topic``, ``objective`` and ``rubric``
+            of the match.
+        """
+        if threshold is None:
+            return None
+        signature = assignment_signature(teacher_input.topic, teacher_input.objective)
+        with self._lock:
+            self._sync()
+            partition = self._partitions.get((model, teacher_input.grade_level))
+            ids = partition.nearest(signature) if partition is not None else []
+            # MinHash 는 후보를 찾는 데만 쓰고, 재사용 여부는 저장된 글로 정확히 판단
+            rows = self._conn.execute(
+                f"SELECT id, topic, objective FROM {self.table}"
+                f" WHERE id IN ({', '.join('?' * len(ids))})",
+                ids,
+            ).fetchall()
+            best, best_similarity = None, threshold
+            for entry_id, topic, objective in rows:
+                similarity = assignment_similarity(
+                    teacher_input.topic, teacher_input.objective, topic, objective
+                )
+                if similarity >= best_similarity:
+                    best, best_similarity = (entry_id, topic, objective), similarity
+            if best is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            (rubric,) = self._conn.execute(
+                f"SELECT rubric FROM {self.table} WHERE id = ?", (best[0],)
+            ).fetchone()
+        return {
+            "id": best[0],
+            "similarity": round(best_similarity, 3),
+            "topic": best[1],
+            "objective": best[2],
+            "rubric": rubric,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+            self._conn.commit()
+            self._partitions = {}
+            self._loaded_id = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            (entries,) = self._conn.execute(
+                f"SELECT COUNT(*) FROM {self.table}"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "threshold": LIBRARY_THRESHOLD,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+rubric_library = RubricLibrary()
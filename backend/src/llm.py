@@ -0,0 +1,157 @@
+import threading
+from os import environ
+from typing import TYPE_CHECKING, Callable, Optional
+
+import httpx
+
+if TYPE_CHECKING:
+    from langchain_core.language_models.chat_models import BaseChatModel
+
+# 프로바이더별 keep-alive 연결 풀 설정
+MAX_CONNECTIONS = int(environ.get("RUBRIC_LLM_MAX_CONNECTIONS", 100))
+MAX_KEEPALIVE_CONNECTIONS = int(environ.get("RUBRIC_LLM_MAX_KEEPALIVE", 20))
+KEEPALIVE_EXPIRY = float(environ.get("RUBRIC_LLM_KEEPALIVE_EXPIRY", 60))
+
+LLMFactory = Callable[[str, str, float], "BaseChatModel"]
+
+_lock = threading.Lock()
+_llms: dict[tuple[str, str, float], "BaseChatModel"] = {}
+_http_clients: dict[str, tuple[httpx.Client, httpx.AsyncClient]] = {}
+_counters = {"created": 0, "reused": 0}
+_factory: Optional[LLMFactory] = None
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=MAX_CONNECTIONS,
+        max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=KEEPALIVE_EXPIRY,
+    )
+
+
+def _openai_http_clients() -> tuple[httpx.Client, httpx.AsyncClient]:
+    """One sync and one async httpx client shared by every OpenAI model."""
+    if "openai" not in _http_clients:
+        from openai import DefaultAsyncHttpxClient, DefaultHttpxClient
+
+        _http_clients["openai"] = (
+            DefaultHttpxClient(limits=_limits()),
+            DefaultAsyncHttpxClient(limits=_limits()),
+        )
+    return _http_clients["openai"]
+
+
+def _create_llm(
+    model_type: str, model_name: str, temperature: float
+) -> "BaseChatModel":
+    if model_type == "gemini":
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
+        # Gemini 클라이언트는 자체 전송 계층을 쓰므로 인스턴스 재사용으로 연결을 공유
+        return ChatGoogleGenerativeAI(model=model_name, temperature=temperature)
+
+    from langchain_openai import ChatOpenAI
+
+    http_client, http_async_client = _openai_http_clients()
+    return ChatOpenAI(
+        model=model_name,
+        temperature=temperature,
+        # 스트리밍 응답에서도 토큰 사용량을 받아 노드별 지표에 반영
+        stream_usage=True,
+        http_client=http_client,
+        http_async_client=http_async_client,
+    )
+
+
+def get_llm(
+    model_name: str = "gpt-4.1-mini", model_type: str = "openai", temperature: float = 0
+) -> "BaseChatModel":
+    """Return the shared chat model for ``(model_type, model_name, temperature)``.
+
+    Parameters
+    ----------
+    model_name : str
+        Identifier of the language model to use. Defaults to ``"gpt-4.1-mini"``.
+    model_type : str, optional
+        Provider of the model, either ``"openai"`` or ``"gemini"``. Defaults to
+        ``"openai"``.
+    temperature : float, optional
+        Sampling temperature. Defaults to ``0``.
+
+    Returns
+    -------
+    BaseChatModel
+        A chat model whose HTTP connection pool is shared with every other model
+        of the same provider.
+    """
+    key = (model_type, model_name, temperature)
+    with _lock:
+        llm = _llms.get(key)
+        if llm is not None:
+            _counters["reused"] += 1
+            return llm
+        factory = _factory or _create_llm
+        llm = _llms[key] = factory(model_type, model_name, temperature)
+        _counters["created"] += 1
+        return llm
+
+
+def set_llm_factory(factory: Optional[LLMFactory]) -> None:
+    """Replace how models are built (e.g. with a fake model for benchmarks).
+
+    Clears the registry so subsequent :func:`get_llm` calls use ``factory``.
+    Pass ``None`` to restore the real providers.
+    """
+    global _factory
+    with _lock:
+        _factory = factory
+        _llms.clear()
+
+
+def is_retryable_error(error: BaseException) -> bool:
+    """Whether ``error`` is a transient provider failure worth retrying.
+
+    Covers timeouts, dropped connections, rate limits (429) and server errors
+    (5xx) from both the OpenAI and Google clients.
+    """
+    if isinstance(error, (TimeoutError, ConnectionError, httpx.TransportError)):
+        return True
+    if type(error).__name__ in ("APITimeoutError", "APIConnectionError"):
+        return True
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    if status is None and isinstance(getattr(error, "code", None), int):
+        status = error.code
+    return isinstance(status, int) and (status in (408, 409, 429) or status >= 500)
+
+
+def _pool_connections(client: httpx.AsyncClient | httpx.Client) -> dict:
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    connections = list(getattr(pool, "connections", []))
+    idle = sum(1 for connection in connections if connection.is_idle())
+    return {
+        "connections": len(connections),
+        "idle": idle,
+        "active": len(connections) - idle,
+    }
+
+
+def pool_stats() -> dict:
+    """Registry and connection pool metrics."""
+    with _lock:
+        pools = {
+            provider: {
+                "sync": _pool_connections(http_client),
+                "async": _pool_connections(http_async_client),
+            }
+            for provider, (http_client, http_async_client) in _http_clients.items()
+        }
+        return {
+            "models": [":".join(map(str, key)) for key in _llms],
+            "created": _counters["created"],
+            "reused": _counters["reused"],
+            "max_connections": MAX_CONNECTIONS,
+            "max_keepalive_connections": MAX_KEEPALIVE_CONNECTIONS,
+            "pools": pools,
+        }
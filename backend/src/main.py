@@ -1,12 +1,56 @@
+import json
+import logging
+from contextlib import asynccontextmanager
 from os import environ
-from fastapi import FastAPI, HTTPException
+from typing import Any, Callable, Dict, List, Literal, Optional, Union
+from fastapi import FastAPI, Header, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from .rubric import response
+from fastapi.responses import (
+    JSONResponse,
+    PlainTextResponse,
+    Response,
+    StreamingResponse,
+)
+from pydantic import BaseModel, Field, field_validator, model_validator
+from .rubric import (
+    response,
+    batch_response,
+    stream_response,
+    saved_result,
+    get_checkpointer,
+)
+from .admission import AdmissionRejected, admission, admit, rate_limiter, tenant_key
+from .jobs import JOB_WORKERS, JobWorkers, get_job_store
+from .bulk import (
+    XLSX_CONTENT_TYPE,
+    read_roster,
+    result_csv,
+    roster_records,
+    spool_upload,
+)
+from .cache import rubric_cache, stage_cache
+from .llm import pool_stats
+from .metrics import log_event, render_metrics
+from .payload import compress, encode, parse_fields, project
 from mangum import Mangum
 # Wrap the entire FastAPI app and it turning into a lambda function
 
-app = FastAPI(title="Rubric Agent API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 잡 워커는 요청과 무관하게 서버 수명 동안 실행
+    workers = None
+    if JOB_WORKERS > 0:
+        get_job_store().purge()
+        workers = JobWorkers(get_job_store(), JOB_WORKERS)
+        workers.start()
+    app.state.job_workers = workers
+    yield
+    if workers is not None:
+        await workers.stop()
+
+
+app = FastAPI(title="Rubric Agent API", version="1.0.0", lifespan=lifespan)
 handler = Mangum(app)
 
 # CORS 설정 - 프론트엔드 컨테이너에서 접근 허용
@@ -19,19 +63,83 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # 결과 조회 응답의 ETag 를 브라우저 스크립트에서 읽을 수 있도록
+    expose_headers=["ETag"],
 )
 
 MY_PROJECT = environ.get("MY_PROJECT", "rubric-agent")
 API_KEY = environ.get("yourapikey")
 
 if not API_KEY:
-    print("⚠️ Warning: API_KEY is not set")
+    log_event("api_key_missing", logging.WARNING)
     # Lambda에서는 환경 변수를 직접 설정해야 함
 
 
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected(request: Request, exc: AdmissionRejected):
+    # 429: 테넌트 요청 한도 초과, 503: 서버 포화 - 둘 다 Retry-After 후 재시도
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": exc.reason, "retry_after": exc.retry_after},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
 class RubricRequest(BaseModel):
-    teacher_input: str
+    # "key: value" 줄 형식/자유 서술 문자열 또는 InputParser 필드를 담은 JSON 객체
+    teacher_input: Union[str, Dict[str, Any]]
+    thread_id: str
+    use_cache: bool = True
+    # "fast"는 교사용 리포트를 피드백과 병렬로 생성
+    pipeline: Literal["linear", "fast"] = "linear"
+    # 같은 thread_id 의 실패한 요청을 재시도할 때 완료된 단계부터 이어서 실행
+    resume: bool = False
+    # 루브릭/평가를 구조화된 데이터로 생성하고 이후 단계에는 압축 표현만 전달
+    compact: bool = False
+    # 지시문+루브릭을 고정 접두사로 두어 프로바이더 프롬프트 캐시를 활용
+    prefix_cache: bool = False
+    # 라우팅 LLM 호출 없이 답안 유무로 분기하고, 루브릭 표가 완성되면 평가를 미리 시작
+    speculative: bool = False
+    # generated_results 에 담을 State 필드 (예: ["report"]). 생략하면 전체
+    fields: Optional[List[str]] = None
+    # "json": 루브릭/평가를 마크다운 표 대신 구조화된 데이터로 반환 (compact 모드로 생성)
+    format: Literal["markdown", "json"] = "markdown"
+
+    @field_validator("fields")
+    @classmethod
+    def known_fields(cls, fields: Optional[List[str]]) -> Optional[List[str]]:
+        names = parse_fields(fields)
+        return list(names) if names else None
+
+    @model_validator(mode="after")
+    def structured_format(self):
+        # 구조화된 데이터는 compact 모드에서만 만들어짐
+        if self.format == "json":
+            self.compact = True
+        return self
+
+
+class StudentSubmission(BaseModel):
+    name: Optional[str] = None
+    student_submission: str
+
+
+class BatchRubricRequest(BaseModel):
+    teacher_input: Union[str, Dict[str, Any]]
+    submissions: List[StudentSubmission]
     thread_id: str
+    max_concurrency: int = Field(default=5, ge=1, le=20)
+    use_cache: bool = True
+    pipeline: Literal["linear", "fast"] = "linear"
+    compact: bool = False
+    # 학급 전체가 같은 루브릭을 공유하므로 배치에서는 기본으로 사용
+    prefix_cache: bool = True
+
+
+class JobRequest(RubricRequest):
+    # submissions 가 있으면 학급 일괄 채점 잡, 없으면 단일 루브릭/평가 잡
+    submissions: Optional[List[StudentSubmission]] = None
+    max_concurrency: int = Field(default=5, ge=1, le=20)
 
 
 @app.get("/api/health")
@@ -39,15 +147,337 @@ def read_root():
     return {"health": "ok", "project": MY_PROJECT}
 
 
+@app.get("/api/cache/stats")
+def cache_stats():
+    # 루브릭 라이브러리(numpy)는 첫 그래프 실행 시 로드되므로 지연 import
+    from .library import rubric_library
+
+    return {
+        "rubric": rubric_cache.stats(),
+        "library": rubric_library.stats(),
+        "stages": stage_cache.stats(),
+    }
+
+
+@app.get("/api/checkpoints/stats")
+def checkpoint_stats():
+    return get_checkpointer().stats()
+
+
+@app.get("/api/llm/pool")
+def llm_pool():
+    return pool_stats()
+
+
+@app.get("/api/admission/stats")
+def admission_stats():
+    return admission.stats()
+
+
+@app.get("/api/llm/routes")
+def llm_routes():
+    """RUBRIC_LLM_TARGETS 라우팅 대상별 오류율과 쿨다운 상태"""
+    # 라우터는 첫 체인 생성 시 로드되므로 여기서도 지연 import
+    from .routing import route_stats
+
+    return route_stats()
+
+
+@app.get("/api/metrics", response_class=PlainTextResponse)
+def metrics():
+    """노드별 지연 시간, 토큰, 비용, 캐시 적중 지표 (Prometheus 텍스트 형식)"""
+    return PlainTextResponse(
+        render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+def json_response(
+    content: dict, accept_encoding: Optional[str], headers: Optional[dict] = None
+) -> Response:
+    """JSON 응답을 클라이언트가 받는 인코딩(br/gzip)으로 압축해 반환합니다.
+
+    스트리밍 응답은 압축하지 않음 - 압축기가 이벤트를 모아 두면 생성되는 즉시 보이지 않음
+    """
+    body, coding = compress(encode(content), accept_encoding)
+    headers = {**(headers or {}), "Vary": "Accept-Encoding"}
+    if coding:
+        headers["Content-Encoding"] = coding
+    return Response(body, media_type="application/json", headers=headers)
+
+
+class ReleasingStreamingResponse(StreamingResponse):
+    """응답이 어떻게 끝나든(정상 종료, 연결 끊김, 취소) 본문을 닫고 ``release`` 를 호출하는 StreamingResponse.
+
+    본문 제너레이터의 finally 는 제너레이터가 시작된 경우에만 실행됨 - 첫 청크 전에
+    클라이언트가 끊으면 Starlette 가 본문 태스크를 취소해 finally 없이 끝나므로
+    입장 슬롯 반납은 응답 자체에서 처리
+    """
+
+    def __init__(self, content: Any, release: Callable[[], None], **kwargs):
+        super().__init__(content, **kwargs)
+        self.release = release
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            try:
+                # 중간에 멈춘 본문의 finally(추측 평가 취소 등)를 release 전에 실행
+                await self.body_iterator.aclose()
+            finally:
+                self.release()
+
+
 @app.post("/api/rubric")
-async def rubric(request: RubricRequest):
+async def rubric(
+    request: RubricRequest,
+    x_school_id: Optional[str] = Header(default=None),
+    accept_encoding: Optional[str] = Header(default=None),
+):
     """교사 입력을 받아 루브릭을 생성합니다."""
+    permit = await admit(tenant_key(x_school_id, request.thread_id))
     try:
         # rubric.py의 generate_rubric 함수 호출
-        generated_results = await response(request.teacher_input, request.thread_id)
-        return {"status": "success", "generated_results": generated_results}
+        generated_results = await response(
+            request.teacher_input,
+            request.thread_id,
+            use_cache=request.use_cache,
+            pipeline=request.pipeline,
+            resume=request.resume,
+            compact=request.compact,
+            prefix_cache=request.prefix_cache,
+            speculative=request.speculative,
+        )
+        generated_results = project(generated_results, request.fields, request.format)
+        return json_response(
+            {"status": "success", "generated_results": generated_results},
+            accept_encoding,
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        permit.release()
+
+
+@app.post("/api/rubric/stream")
+async def rubric_stream(
+    request: RubricRequest, x_school_id: Optional[str] = Header(default=None)
+):
+    """루브릭/평가/피드백/리포트를 생성되는 즉시 Server-Sent Events로 전송합니다."""
+    # 스트림 시작 전에 받아야 거절 시 429/503 상태 코드로 응답할 수 있음
+    permit = await admit(tenant_key(x_school_id, request.thread_id))
+
+    def sse(event: str, data: dict) -> str:
+        payload = json.dumps(jsonable_encoder(data), ensure_ascii=False)
+        return f"event: {event}\ndata: {payload}\n\n"
+
+    async def generate():
+        try:
+            async for event in stream_response(
+                request.teacher_input,
+                request.thread_id,
+                use_cache=request.use_cache,
+                pipeline=request.pipeline,
+                resume=request.resume,
+                compact=request.compact,
+                prefix_cache=request.prefix_cache,
+                speculative=request.speculative,
+            ):
+                if event["event"] == "done":
+                    event["generated_results"] = project(
+                        event["generated_results"], request.fields, request.format
+                    )
+                yield sse(event["event"], event)
+        except Exception as e:
+            yield sse("error", {"event": "error", "detail": str(e)})
+
+    return ReleasingStreamingResponse(
+        generate(),
+        permit.release,
+        media_type="text/event-stream",
+        # nginx 프록시가 이벤트를 모아서 보내지 않도록 버퍼링 해제
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header names ``etag`` (weak tags compare equal)."""
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+@app.get("/api/rubric/{thread_id}")
+async def rubric_result(
+    thread_id: str,
+    pipeline: Literal["linear", "fast"] = "linear",
+    fields: Optional[str] = None,
+    format: Literal["markdown", "json"] = "markdown",
+    if_none_match: Optional[str] = Header(default=None),
+    accept_encoding: Optional[str] = Header(default=None),
+):
+    """thread_id 의 저장된 결과를 다시 생성하지 않고 반환합니다.
+
+    ETag 는 마지막 체크포인트 id 이므로, 결과가 바뀌지 않았으면 If-None-Match 요청에
+    본문 없이 304 로 응답합니다. fields 는 쉼표로 구분한 State 필드 이름입니다
+    (예: ?fields=rubric,report). fields/format 이 다르면 URL 이 달라 캐시도 따로 저장됨
+    """
+    try:
+        fields = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    saved = await saved_result(thread_id, pipeline)
+    if saved is None:
+        raise HTTPException(status_code=404, detail="result not found")
+    # no-cache: 브라우저가 저장은 하되 매번 ETag 로 재검증
+    headers = {
+        "ETag": f'"{saved["checkpoint_id"]}"',
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
+    }
+    if etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    saved["generated_results"] = project(saved["generated_results"], fields, format)
+    return json_response({"status": "success", **saved}, accept_encoding, headers)
+
+
+@app.post("/api/rubric/batch")
+async def rubric_batch(
+    request: BatchRubricRequest, x_school_id: Optional[str] = Header(default=None)
+):
+    """루브릭을 한 번 생성한 뒤 학급 전체 답안을 평가하고, 학생별 결과를 NDJSON으로 스트리밍합니다."""
+    # 학생 수만큼 요청 한도를 쓰고, 동시에 채점하는 학생 수만큼 슬롯을 차지
+    permit = await admit(
+        tenant_key(x_school_id, request.thread_id),
+        cost=len(request.submissions),
+        weight=request.max_concurrency,
+    )
+
+    async def generate():
+        try:
+            async for event in batch_response(
+                request.teacher_input,
+                [submission.model_dump() for submission in request.submissions],
+                request.thread_id,
+                max_concurrency=request.max_concurrency,
+                use_cache=request.use_cache,
+                pipeline=request.pipeline,
+                compact=request.compact,
+                prefix_cache=request.prefix_cache,
+            ):
+                yield json.dumps(event, ensure_ascii=False) + "\n"
+        except Exception as e:
+            # 스트림이 이미 시작된 뒤라 HTTP 상태 코드를 바꿀 수 없으므로 에러 이벤트로 전달
+            error = {"type": "error", "detail": str(e)}
+            yield json.dumps(error, ensure_ascii=False) + "\n"
+
+    return ReleasingStreamingResponse(
+        generate(), permit.release, media_type="application/x-ndjson"
+    )
+
+
+@app.post("/api/rubric/bulk")
+async def rubric_bulk(
+    request: Request,
+    thread_id: str,
+    teacher_input: str,
+    max_concurrency: int = Query(default=5, ge=1, le=20),
+    use_cache: bool = True,
+    pipeline: Literal["linear", "fast"] = "linear",
+    compact: bool = True,
+    prefix_cache: bool = True,
+    encoding: str = "utf-8-sig",
+    x_school_id: Optional[str] = Header(default=None),
+):
+    """요청 본문의 CSV/XLSX 학생 명단을 행 단위로 채점하고, 끝난 학생부터 결과 행을 CSV로 스트리밍합니다."""
+    # 명단 행 수는 끝까지 읽기 전에는 모르므로 버스트 전체를 차감
+    permit = await admit(
+        tenant_key(x_school_id, thread_id),
+        cost=rate_limiter.burst,
+        weight=max_concurrency,
+    )
+    # 스트리밍을 시작하기 전에 끝나는 모든 경우(업로드 중 연결 끊김 포함) 슬롯을 반납
+    try:
+        try:
+            # 본문은 받는 대로 임시 파일에 쓰고(큰 파일은 디스크), 채점하면서 한 행씩 읽음
+            upload = await spool_upload(request.stream())
+        except ValueError as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        content_type = request.headers.get("content-type", "")
+        kind = "xlsx" if content_type.startswith(XLSX_CONTENT_TYPE) else "csv"
+        try:
+            submissions = read_roster(roster_records(upload, kind, encoding))
+        except Exception as e:
+            upload.close()
+            # ImportError: 서버에 openpyxl 이 없어 XLSX 를 읽을 수 없음
+            # 그 밖에는 잘못된 명단 (빈 파일, 열 없음, 인코딩, 손상된 XLSX 등)
+            status_code = 415 if isinstance(e, ImportError) else 400
+            raise HTTPException(status_code=status_code, detail=str(e))
+    except BaseException:
+        permit.release()
+        raise
+
+    def release():
+        upload.close()
+        permit.release()
+
+    return ReleasingStreamingResponse(
+        result_csv(
+            batch_response(
+                teacher_input,
+                submissions,
+                thread_id,
+                max_concurrency=max_concurrency,
+                use_cache=use_cache,
+                pipeline=pipeline,
+                compact=compact,
+                prefix_cache=prefix_cache,
+            )
+        ),
+        release,
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": 'attachment; filename="results.csv"'},
+    )
+
+
+@app.post("/api/jobs", status_code=202)
+async def create_job(
+    request: JobRequest, x_school_id: Optional[str] = Header(default=None)
+):
+    """생성 요청을 잡으로 등록하고 바로 job_id 를 반환합니다. 결과는 GET /api/jobs/{job_id} 로 조회합니다."""
+    kind = "batch" if request.submissions else "rubric"
+    tenant = tenant_key(x_school_id, request.thread_id)
+    rate_limiter.take(tenant, len(request.submissions or ()) or 1)
+    job_id = get_job_store().create(kind, request.model_dump(), tenant)
+    if app.state.job_workers is not None:
+        app.state.job_workers.notify()
+    return {"job_id": job_id, "status": "queued", "status_url": f"/api/jobs/{job_id}"}
+
+
+@app.get("/api/jobs/stats")
+def job_stats():
+    return get_job_store().stats()
+
+
+@app.get("/api/jobs/{job_id}")
+def get_job(job_id: str):
+    """잡 상태와 지금까지 완료된 단계의 결과를 반환합니다."""
+    job = get_job_store().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="job not found")
+    return {
+        "job_id": job["id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "stage": job["stage"],
+        "result": job["result"],
+        "error": job["error"],
+        "attempts": job["attempts"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+    }
 
 
 # 정적 파일 서빙 제거 - 프론트엔드는 별도 컨테이너에서 처리
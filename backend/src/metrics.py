@@ -0,0 +1,363 @@
+import json
+import logging
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from os import environ
+from typing import Optional
+
+# 노드 실행 시간 히스토그램 버킷(초) - 로컬 노드(ms)부터 LLM 호출(수십 초)까지
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# 모델별 100만 토큰당 가격(USD, 입력/출력/캐시된 입력). RUBRIC_MODEL_PRICES(JSON)로 덮어쓰기 가능
+MODEL_PRICES = {
+    "gpt-4.1": (2.00, 8.00, 0.50),
+    "gpt-4.1-mini": (0.40, 1.60, 0.10),
+    "gpt-4.1-nano": (0.10, 0.40, 0.025),
+    "gpt-4o": (2.50, 10.00, 1.25),
+    "gpt-4o-mini": (0.15, 0.60, 0.075),
+    "gemini-2.5-pro": (1.25, 10.00, 0.31),
+    "gemini-2.5-flash": (0.30, 2.50, 0.075),
+    "gemini-2.0-flash": (0.10, 0.40, 0.025),
+}
+MODEL_PRICES.update(
+    {
+        model: tuple(prices)
+        for model, prices in json.loads(
+            environ.get("RUBRIC_MODEL_PRICES", "{}")
+        ).items()
+    }
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+class Counter:
+    """Monotonic counter with labels, rendered in Prometheus text format."""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} counter",
+        ]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Gauge:
+    """Value that goes up and down, rendered in Prometheus text format."""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, **labels) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = value
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} gauge",
+        ]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    """Cumulative histogram with labels, rendered in Prometheus text format."""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...],
+        buckets: tuple[float, ...] = DURATION_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # 라벨 조합별 [버킷별 개수..., 합계, 전체 개수]
+        self._values: dict[tuple[str, ...], list[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            series = self._values.setdefault(key, [0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        names = self.labelnames + ("le",)
+        with self._lock:
+            for key, series in sorted(self._values.items()):
+                for bound, count in zip(self.buckets, series):
+                    labels = _labels(names, key + (f"{bound:g}",))
+                    lines.append(f"{self.name}_bucket{labels} {count}")
+                labels = _labels(names, key + ("+Inf",))
+                lines.append(f"{self.name}_bucket{labels} {series[-1]}")
+                labels = _labels(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {series[-2]}")
+                lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+
+NODE_DURATION = Histogram(
+    "rubric_node_duration_seconds",
+    "Wall time of one graph node call, including retries. status is ok, error"
+    " or cancelled.",
+    ("node", "status"),
+)
+NODE_RETRIES = Counter(
+    "rubric_node_retries_total",
+    "Retries of a graph node after a transient provider error.",
+    ("node",),
+)
+LLM_TOKENS = Counter(
+    "rubric_llm_tokens_total",
+    "Tokens sent to and received from the LLM provider. kind=cached counts the"
+    " prompt tokens served from the provider's prompt cache.",
+    ("node", "model", "kind"),
+)
+LLM_COST = Counter(
+    "rubric_llm_cost_usd_total",
+    "Estimated LLM cost in US dollars from MODEL_PRICES.",
+    ("node", "model"),
+)
+CACHE_LOOKUPS = Counter(
+    "rubric_cache_lookups_total",
+    "Cache lookups made by graph nodes. result=coalesced counts misses that"
+    " shared the output of an identical call already in flight, result=similar"
+    " misses answered by the rubric of a similar assignment.",
+    ("node", "result"),
+)
+LLM_ROUTES = Counter(
+    "rubric_llm_route_total",
+    "Routed LLM calls per target. outcome is ok, error, hedge (a second target"
+    " was asked after this one ran past its p95), failover (moved on after an"
+    " error) or cancelled (lost a hedge race).",
+    ("stage", "target", "outcome"),
+)
+
+ADMISSION_IN_FLIGHT = Gauge(
+    "rubric_admission_in_flight",
+    "Concurrency slots held by admitted generation requests.",
+)
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "rubric_admission_queue_depth",
+    "Generation requests waiting for a concurrency slot.",
+)
+ADMISSION_WAIT = Histogram(
+    "rubric_admission_wait_seconds",
+    "Time a generation request waited in the admission queue.",
+    ("outcome",),
+)
+ADMISSION_REJECTED = Counter(
+    "rubric_admission_rejected_total",
+    "Requests turned away: rate_limited (429), queue_full or queue_timeout (503).",
+    ("reason",),
+)
+
+REGISTRY: list = [
+    NODE_DURATION,
+    NODE_RETRIES,
+    LLM_TOKENS,
+    LLM_COST,
+    CACHE_LOOKUPS,
+    LLM_ROUTES,
+    ADMISSION_IN_FLIGHT,
+    ADMISSION_QUEUE_DEPTH,
+    ADMISSION_WAIT,
+    ADMISSION_REJECTED,
+]
+
+
+def render_metrics() -> str:
+    """All registered metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with the ``fields`` passed to :func:`log_event`."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "event": record.getMessage(),
+        }
+        payload.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+logger = logging.getLogger("rubric_agent")
+if not logger.handlers:
+    _handler = logging.StreamHandler(sys.stdout)
+    _handler.setFormatter(JsonFormatter())
+    logger.addHandler(_handler)
+    logger.setLevel(environ.get("RUBRIC_LOG_LEVEL", "INFO").upper())
+    logger.propagate = False
+
+
+def log_event(event: str, level: int = logging.INFO, **fields) -> None:
+    """Emit a structured log line ``{"event": event, **fields}``."""
+    logger.log(level, event, extra={"fields": fields})
+
+
+def cost_usd(
+    model: Optional[str],
+    prompt_tokens: int,
+    completion_tokens: int,
+    cached_tokens: int = 0,
+) -> float:
+    # 응답의 모델명은 "gpt-4.1-mini-2025-04-14"처럼 날짜가 붙으므로 가장 긴 접두사로 조회
+    matches = [name for name in MODEL_PRICES if (model or "").startswith(name)]
+    if not matches:
+        return 0.0
+    prices = MODEL_PRICES[max(matches, key=len)]
+    # 프롬프트 캐시에서 읽은 입력 토큰은 할인된 가격 (가격이 없으면 일반 입력 가격)
+    cached_price = prices[2] if len(prices) > 2 else prices[0]
+    return (
+        (prompt_tokens - cached_tokens) * prices[0]
+        + cached_tokens * cached_price
+        + completion_tokens * prices[1]
+    ) / 1_000_000
+
+
+@dataclass
+class NodeRun:
+    """Measurements collected while one graph node runs."""
+
+    node: str
+    thread_id: Optional[str] = None
+    model: Optional[str] = None
+    llm_calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+    cache_hit: Optional[bool] = None
+    attempts: int = 1
+
+    def add_usage(self, model: Optional[str], usage: dict) -> None:
+        prompt_tokens = usage.get("input_tokens", 0)
+        completion_tokens = usage.get("output_tokens", 0)
+        # OpenAI/Gemini 모두 프롬프트 캐시 적중분을 input_token_details.cache_read 로 보고
+        cached_tokens = (usage.get("input_token_details") or {}).get("cache_read") or 0
+        self.model = model or self.model
+        self.llm_calls += 1
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        self.cached_tokens += cached_tokens
+        model_label = model or "unknown"
+        LLM_TOKENS.inc(prompt_tokens, node=self.node, model=model_label, kind="prompt")
+        LLM_TOKENS.inc(
+            completion_tokens, node=self.node, model=model_label, kind="completion"
+        )
+        LLM_TOKENS.inc(cached_tokens, node=self.node, model=model_label, kind="cached")
+        LLM_COST.inc(
+            cost_usd(model, prompt_tokens, completion_tokens, cached_tokens),
+            node=self.node,
+            model=model_label,
+        )
+
+    def finish(self, started: float, status: str) -> None:
+        duration = time.perf_counter() - started
+        NODE_DURATION.observe(duration, node=self.node, status=status)
+        # thread_id 는 라벨로 쓰면 시계열이 무한히 늘어나므로 로그에만 남김
+        log_event(
+            "node_finished",
+            logging.ERROR if status == "error" else logging.INFO,
+            node=self.node,
+            thread_id=self.thread_id,
+            status=status,
+            duration_ms=round(duration * 1000, 2),
+            model=self.model,
+            llm_calls=self.llm_calls,
+            prompt_tokens=self.prompt_tokens,
+            completion_tokens=self.completion_tokens,
+            cached_tokens=self.cached_tokens,
+            cost_usd=round(
+                cost_usd(
+                    self.model,
+                    self.prompt_tokens,
+                    self.completion_tokens,
+                    self.cached_tokens,
+                ),
+                6,
+            ),
+            cache_hit=self.cache_hit,
+            attempts=self.attempts,
+        )
+
+
+current_run: ContextVar[Optional[NodeRun]] = ContextVar("rubric_node_run", default=None)
+
+
+def record_cache_lookup(
+    hit: bool, coalesced: bool = False, similar: bool = False
+) -> None:
+    """Count a cache lookup and attach the result to the running node.
+
+    ``coalesced`` marks a miss answered by an identical call already in
+    flight and ``similar`` one answered from the rubric library; both count
+    as a hit for the node.
+    """
+    run = current_run.get()
+    node = run.node if run is not None else "unknown"
+    if coalesced:
+        result = "coalesced"
+    elif similar:
+        result = "similar"
+    else:
+        result = "hit" if hit else "miss"
+    CACHE_LOOKUPS.inc(node=node, result=result)
+    if run is not None:
+        run.cache_hit = hit or coalesced or similar
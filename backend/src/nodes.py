@@ -1,14 +1,117 @@
+import asyncio
+import json
+import logging
+import random
+import time
+from contextvars import ContextVar
+from dataclasses import replace
+from os import environ
+from typing import Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
 from langchain_core.documents import Document
+from langchain_core.runnables import RunnableConfig
+from langchain_core.runnables.config import var_child_runnable_config
+from langchain_core.tracers.context import register_configure_hook
 from .state import State
+from .metrics import NODE_RETRIES, NodeRun, current_run, log_event, record_cache_lookup
+from .parsing import parse_structured_input
+from .cache import (
+    rubric_cache,
+    rubric_cache_key,
+    stage_cache,
+    stage_cache_key,
+    stage_flights,
+)
+from .library import rubric_library
+from .rendering import (
+    compact_evaluation,
+    compact_rubric,
+    criteria_table,
+    criteria_table_end,
+    render_evaluation,
+    render_rubric,
+)
+from .llm import is_retryable_error
+from .routing import model_key
 from abc import ABC, abstractmethod
 from .chains import (
+    Evaluation,
+    Rubric,
     create_input_parser,
     create_rubric_chain,
     create_evaluation_chain,
     create_feedback_chain,
     create_report_chain,
     create_evaluation_router_chain,
+    create_teacher_report_chain,
+)
+
+# 타임아웃/429/5xx 등 일시적 오류에 대한 노드 단위 재시도 설정
+NODE_MAX_RETRIES = int(environ.get("RUBRIC_NODE_MAX_RETRIES", 2))
+NODE_RETRY_BACKOFF = float(environ.get("RUBRIC_NODE_RETRY_BACKOFF", 1.0))
+
+
+class NodeUsageHandler(BaseCallbackHandler):
+    """Adds the token usage of every LLM call inside a node to its :class:`NodeRun`."""
+
+    run_inline = True
+
+    def __init__(self, run: NodeRun):
+        self.run = run
+
+    def on_llm_end(self, response, **kwargs):
+        model = (response.llm_output or {}).get("model_name")
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                usage = getattr(message, "usage_metadata", None)
+                if usage:
+                    model = message.response_metadata.get("model_name", model)
+                    self.run.add_usage(model, usage)
+
+
+# 노드 안에서 실행되는 모든 체인/LLM 호출에 NodeUsageHandler 를 자동으로 연결
+_usage_handler: ContextVar[Optional[NodeUsageHandler]] = ContextVar(
+    "rubric_usage_handler", default=None
 )
+register_configure_hook(_usage_handler, inheritable=True)
+
+# 추측 실행 중인 평가 (speculative 모드): thread_id -> 작업.
+# 그래프의 EvaluationNode 가 이어받고, 라우터가 END 로 보내면 취소
+_speculations: dict[str, asyncio.Task] = {}
+# 추측 실행된 평가의 LLM 이벤트 태그 - 스트리밍에서 평가 토큰으로 구분
+SPECULATION_TAG = "speculative_evaluation"
+
+
+def cancel_speculation(thread_id: Optional[str]) -> None:
+    task = _speculations.pop(thread_id, None)
+    if task is not None:
+        task.cancel()
+
+
+def input_route(teacher_input) -> str:
+    """Route by whether the parsed input has a student submission."""
+    if teacher_input.student_submission:
+        return "evaluation_generator"
+    return "END"
+
+
+def prompt_context(state: State) -> tuple[str, str]:
+    """Rubric and evaluation as passed to the feedback and report prompts.
+
+    In compact mode these are one line per criterion instead of the full
+    markdown tables, so later stages do not re-send the rendered output.
+    """
+    if not state.compact or state.rubric_data is None:
+        return state.rubric, state.evaluation
+    rubric = Rubric.model_validate(state.rubric_data)
+    evaluation = state.evaluation
+    if state.evaluation_data is not None:
+        evaluation = compact_evaluation(
+            Evaluation.model_validate(state.evaluation_data), rubric
+        )
+    return compact_rubric(rubric), evaluation
 
 
 class BaseNode(ABC):
@@ -17,19 +120,87 @@ class BaseNode(ABC):
         self.verbose = False
 
         self.verbose = kwargs.get("verbose", False)
+        self.max_retries = kwargs.get("max_retries", NODE_MAX_RETRIES)
+        self.retry_backoff = kwargs.get("retry_backoff", NODE_RETRY_BACKOFF)
 
     @abstractmethod
-    def execute(self, state: State) -> State:
+    async def execute(self, state: State) -> State:
         pass
 
+    async def memoize(self, state: State, inputs: dict, generate) -> State:
+        """Return this node's stored output for ``inputs``, or ``generate()`` it.
+
+        Outputs are cached by the node, ``self.model_key`` and prompt
+        inputs, so a resubmitted submission is not graded again. Identical
+        calls running at the same time share one generation.
+        """
+        if not state.use_cache:
+            return await generate()
+
+        key = stage_cache_key(self.name, self.model_key, **inputs)
+        cached = stage_cache.get(key)
+        if cached is not None:
+            record_cache_lookup(True)
+            return json.loads(cached)
+
+        async def generate_and_store():
+            output = await generate()
+            stage_cache.set(key, json.dumps(output, ensure_ascii=False))
+            return output
+
+        output, shared = await stage_flights.run(key, generate_and_store)
+        record_cache_lookup(False, coalesced=shared)
+        return output
+
     def logging(self, method_name, **kwargs):
-        if self.verbose:
-            print(f"[{self.name}] {method_name}")
-            for key, value in kwargs.items():
-                print(f"{key}: {value}")
+        # verbose 노드는 INFO, 그 외에는 DEBUG 레벨 구조화 로그
+        level = logging.INFO if self.verbose else logging.DEBUG
+        log_event(method_name, level, node=self.name, **kwargs)
+
+    async def __call__(self, state: State, config: Optional[RunnableConfig] = None):
+        thread_id = ((config or {}).get("configurable") or {}).get("thread_id")
+        run = NodeRun(self.name, thread_id)
+        run_token = current_run.set(run)
+        handler_token = _usage_handler.set(NodeUsageHandler(run))
+        started = time.perf_counter()
+        status = "error"
+        try:
+            result = await self._execute_with_retries(state, run)
+            status = "ok"
+            return result
+        except asyncio.CancelledError:
+            # 추측 실행 취소, 클라이언트 연결 끊김 등 - 오류로 세지 않음
+            status = "cancelled"
+            raise
+        finally:
+            _usage_handler.reset(handler_token)
+            current_run.reset(run_token)
+            run.finish(started, status)
 
-    def __call__(self, state: State):
-        return self.execute(state)
+    async def _execute_with_retries(self, state: State, run: NodeRun):
+        attempt = 0
+        while True:
+            try:
+                return await self.execute(state)
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable_error(e):
+                    raise
+                # 지수 백오프 + 지터
+                delay = self.retry_backoff * 2**attempt * (1 + random.random() / 4)
+                attempt += 1
+                run.attempts += 1
+                NODE_RETRIES.inc(node=self.name)
+                log_event(
+                    "node_retry",
+                    logging.WARNING,
+                    node=self.name,
+                    thread_id=run.thread_id,
+                    attempt=attempt,
+                    max_retries=self.max_retries,
+                    delay_s=round(delay, 2),
+                    error=repr(e),
+                )
+                await asyncio.sleep(delay)
 
 
 class InputParserNode(BaseNode):
@@ -38,34 +209,176 @@ class InputParserNode(BaseNode):
         self.name = "InputParserNode"
         self.parser_chain = create_input_parser()
 
-    def execute(self, state: State) -> State:
-        teacher_input = state.teacher_input
-        parsed_input = self.parser_chain.invoke({"teacher_input": teacher_input})
-        return {"teacher_input": parsed_input}
+    async def execute(self, state: State) -> State:
+        teacher_input = state.raw_input
+
+        # 구조화된 입력(JSON 또는 "key: value" 줄)은 LLM 호출 없이 바로 파싱
+        parsed_input = parse_structured_input(teacher_input)
+        if parsed_input is not None:
+            return {"teacher_input": parsed_input, "structured_input": True}
+
+        if isinstance(teacher_input, dict):
+            teacher_input = json.dumps(teacher_input, ensure_ascii=False)
+        parsed_input = await self.parser_chain.ainvoke({"teacher_input": teacher_input})
+        return {"teacher_input": parsed_input, "structured_input": False}
 
 
 class RubricNode(BaseNode):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.name = "RubricNode"
-        self.rubric_chain = create_rubric_chain()
+        self.model_name = kwargs.get("model_name", "gpt-4.1-mini")
+        self.model_type = kwargs.get("model_type", "openai")
+        # 라우팅 중이면 실제로 답하는 타깃 목록 - 캐시/라이브러리 키에 사용
+        self.model_key = model_key("rubric", self.model_name, self.model_type)
+        # speculative 모드에서 루브릭 표가 완성되는 즉시 평가를 시작할 노드
+        self.evaluator = kwargs.get("evaluator")
+        self.rubric_chain = create_rubric_chain(
+            model_name=self.model_name, model_type=self.model_type
+        )
+        self.structured_rubric_chain = create_rubric_chain(
+            model_name=self.model_name, model_type=self.model_type, structured=True
+        )
 
-    def execute(self, state: State) -> State:
+    async def execute(self, state: State) -> State:
         topic = state.teacher_input.topic
         objective = state.teacher_input.objective
         grade_Level = state.teacher_input.grade_level
 
-        print("==== [Generating Rubric] ====")
-        print(f"Topic: {topic}")
-        print(f"Objective: {objective}")
-        print(f"Grade Level: {grade_Level}")
-
-        generated_rubric = self.rubric_chain.invoke(
-            {"topic": topic, "objective": objective, "grade_level": grade_Level}
+        self.logging(
+            "generating_rubric",
+            topic=topic,
+            objective=objective,
+            grade_level=grade_Level,
         )
 
+        if state.compact:
+            return await self.generate_structured(state)
+
+        model = self.model_key
+        cache_key = rubric_cache_key(state.teacher_input, model)
+        if state.use_cache:
+            cached_rubric = rubric_cache.get(cache_key)
+            if cached_rubric is not None:
+                record_cache_lookup(True)
+                return {"rubric": cached_rubric}
+            similar = rubric_library.find(state.teacher_input, model)
+            if similar is not None:
+                record_cache_lookup(False, similar=True)
+                rubric = similar.pop("rubric")
+                self.logging("reused_similar_rubric", **similar)
+                return {"rubric": rubric, "similar_rubric": similar}
+
+        async def generate():
+            inputs = {
+                "topic": topic,
+                "objective": objective,
+                "grade_level": grade_Level,
+            }
+            if self.speculates(state):
+                generated = await self.generate_speculating(state, inputs)
+            else:
+                generated = await self.rubric_chain.ainvoke(inputs)
+            rubric_cache.set(cache_key, generated)
+            rubric_library.add(state.teacher_input, model, generated)
+            return generated
+
+        if not state.use_cache:
+            return {"rubric": await generate()}
+
+        # 같은 과제로 동시에 들어온 요청은 루브릭 생성 한 번을 공유
+        generated_rubric, shared = await stage_flights.run(cache_key, generate)
+        record_cache_lookup(False, coalesced=shared)
         return {"rubric": generated_rubric}
 
+    def speculates(self, state: State) -> bool:
+        run = current_run.get()
+        return (
+            state.speculative
+            and self.evaluator is not None
+            and run is not None
+            and run.thread_id is not None
+            and input_route(state.teacher_input) == "evaluation_generator"
+        )
+
+    async def generate_speculating(self, state: State, inputs: dict) -> str:
+        """Stream the rubric and start the evaluation once its table is complete.
+
+        The evaluation runs against the criteria table alone, in a task that
+        the graph's EvaluationNode picks up for the same thread. It is
+        cancelled if the rubric fails.
+        """
+        thread_id = current_run.get().thread_id
+        cancel_speculation(thread_id)
+        rubric = ""
+        try:
+            async for chunk in self.rubric_chain.astream(inputs):
+                rubric += chunk
+                if thread_id in _speculations:
+                    continue
+                # 완성된 줄까지만 보고 표가 끝났는지 판단
+                end = criteria_table_end(rubric[: rubric.rfind("\n") + 1])
+                if end is not None:
+                    self.logging("speculating_evaluation", table_chars=end)
+                    speculative = replace(state, rubric=rubric[:end], speculative=False)
+                    _speculations[thread_id] = asyncio.create_task(
+                        self.speculate(speculative, thread_id)
+                    )
+        except BaseException:
+            cancel_speculation(thread_id)
+            raise
+        return rubric
+
+    async def speculate(self, state: State, thread_id: str) -> State:
+        parent = var_child_runnable_config.get()
+        if parent is not None:
+            # 이 작업 안의 LLM 호출에만 태그를 붙임 (컨텍스트는 작업마다 복사됨)
+            tags = [*parent.get("tags", []), SPECULATION_TAG]
+            var_child_runnable_config.set({**parent, "tags": tags})
+        return await self.evaluator(state, {"configurable": {"thread_id": thread_id}})
+
+    async def generate_structured(self, state: State) -> State:
+        # 구조화된 루브릭은 마크다운과 다른 형식이므로 캐시 키를 분리
+        model = f"{self.model_key}:structured"
+        cache_key = rubric_cache_key(state.teacher_input, model)
+        rubric = similar = None
+        if state.use_cache:
+            cached_rubric = rubric_cache.get(cache_key)
+            if cached_rubric is not None:
+                record_cache_lookup(True)
+                rubric = Rubric.model_validate_json(cached_rubric)
+            else:
+                similar = rubric_library.find(state.teacher_input, model)
+            if similar is not None:
+                # 비슷한 과제의 루브릭을 재사용 - 출처는 similar_rubric 으로 남김
+                record_cache_lookup(False, similar=True)
+                rubric = Rubric.model_validate_json(similar.pop("rubric"))
+                self.logging("reused_similar_rubric", **similar)
+
+        async def generate():
+            generated = await self.structured_rubric_chain.ainvoke(
+                {
+                    "topic": state.teacher_input.topic,
+                    "objective": state.teacher_input.objective,
+                    "grade_level": state.teacher_input.grade_level,
+                }
+            )
+            rubric_json = generated.model_dump_json()
+            rubric_cache.set(cache_key, rubric_json)
+            rubric_library.add(state.teacher_input, model, rubric_json)
+            return generated
+
+        if rubric is None and not state.use_cache:
+            rubric = await generate()
+        elif rubric is None:
+            rubric, shared = await stage_flights.run(cache_key, generate)
+            record_cache_lookup(False, coalesced=shared)
+
+        result = {"rubric": render_rubric(rubric), "rubric_data": rubric.model_dump()}
+        if similar is not None:
+            result["similar_rubric"] = similar
+        return result
+
 
 class EvaluationRouterNode(BaseNode):
     def __init__(self, **kwargs):
@@ -73,9 +386,18 @@ class EvaluationRouterNode(BaseNode):
         self.name = "EvaluationRouterNode"
         self.evaluation_router_chain = create_evaluation_router_chain()
 
-    def execute(self, state: State) -> str:
+    async def execute(self, state: State) -> str:
         teacher_input = state.teacher_input
-        route_result = self.evaluation_router_chain.invoke(
+
+        # 구조화된 입력이거나 speculative 모드면 학생 답안 유무만으로 분기
+        # (LLM 라우터는 자유 서술 입력에만 사용)
+        if state.structured_input or state.speculative:
+            route = input_route(teacher_input)
+            if route == "END":
+                cancel_speculation(current_run.get().thread_id)
+            return route
+
+        route_result = await self.evaluation_router_chain.ainvoke(
             {"teacher_input": teacher_input}
         )
         if route_result.binary_score == "yes":
@@ -88,16 +410,79 @@ class EvaluationNode(BaseNode):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.name = "EvaluationNode"
-        self.evaluation_chain = create_evaluation_chain()
+        self.model_name = kwargs.get("model_name", "gpt-4.1-mini")
+        self.model_type = kwargs.get("model_type", "openai")
+        self.model_key = model_key("evaluation", self.model_name, self.model_type)
+        model = {"model_name": self.model_name, "model_type": self.model_type}
+        self.evaluation_chain = create_evaluation_chain(**model)
+        self.structured_evaluation_chain = create_evaluation_chain(
+            **model, structured=True
+        )
+        self.prefix_evaluation_chain = create_evaluation_chain(
+            **model, prefix_cache=True
+        )
+        self.prefix_structured_evaluation_chain = create_evaluation_chain(
+            **model, structured=True, prefix_cache=True
+        )
 
-    def execute(self, state: State) -> State:
+    async def execute(self, state: State) -> State:
+        if state.speculative:
+            # RubricNode 가 루브릭 표로 미리 시작한 평가를 이어받음
+            speculation = _speculations.pop(current_run.get().thread_id, None)
+            if speculation is not None:
+                self.logging("joining_speculation", done=speculation.done())
+                return await speculation
+            # 추측 실행이 없었으면(재시도, 캐시된 루브릭 등) 같은 입력으로 직접 평가
+            state = replace(
+                state, rubric=criteria_table(state.rubric), speculative=False
+            )
+        self.logging("evaluating_submission", name=state.teacher_input.name)
+        compact = state.compact and state.rubric_data is not None
+        return await self.memoize(
+            state,
+            {
+                "rubric": state.rubric,
+                "name": state.teacher_input.name,
+                "grade_level": state.teacher_input.grade_level,
+                "student_submission": state.teacher_input.student_submission,
+                "compact": compact,
+                "prefix_cache": state.prefix_cache,
+            },
+            lambda: self.generate(state),
+        )
+
+    async def generate(self, state: State) -> State:
         rubric = state.rubric
         name = state.teacher_input.name
         grade_level = state.teacher_input.grade_level
         student_submission = state.teacher_input.student_submission
 
-        print("==== [Evaluating Submission] ====")
-        generated_evaluation = self.evaluation_chain.invoke(
+        if state.compact and state.rubric_data is not None:
+            rubric_data = Rubric.model_validate(state.rubric_data)
+            chain = (
+                self.prefix_structured_evaluation_chain
+                if state.prefix_cache
+                else self.structured_evaluation_chain
+            )
+            evaluation = await chain.ainvoke(
+                {
+                    "rubric": compact_rubric(rubric_data),
+                    "name": name,
+                    "grade_level": grade_level,
+                    "student_submission": student_submission,
+                }
+            )
+            return {
+                "evaluation": render_evaluation(evaluation, rubric_data),
+                "evaluation_data": evaluation.model_dump(),
+            }
+
+        chain = (
+            self.prefix_evaluation_chain
+            if state.prefix_cache
+            else self.evaluation_chain
+        )
+        generated_evaluation = await chain.ainvoke(
             {
                 "rubric": rubric,
                 "name": name,
@@ -113,40 +498,108 @@ class FeedbackNode(BaseNode):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.name = "FeedbackNode"
-        self.feedback_chain = create_feedback_chain()
+        self.model_name = kwargs.get("model_name", "gpt-4.1-mini")
+        self.model_type = kwargs.get("model_type", "openai")
+        self.model_key = model_key("feedback", self.model_name, self.model_type)
+        model = {"model_name": self.model_name, "model_type": self.model_type}
+        self.feedback_chain = create_feedback_chain(**model)
+        self.prefix_feedback_chain = create_feedback_chain(**model, prefix_cache=True)
 
-    def execute(self, state: State) -> State:
-        rubric = state.rubric
-        evaluation = state.evaluation
+    async def execute(self, state: State) -> State:
+        rubric, evaluation = prompt_context(state)
 
-        print("==== [Generating Feedback] ====")
-        generated_feedback = self.feedback_chain.invoke(
-            {"rubric": rubric, "evaluation": evaluation}
+        self.logging("generating_feedback")
+        chain = (
+            self.prefix_feedback_chain if state.prefix_cache else self.feedback_chain
         )
-        return {"feedback": generated_feedback}
+        inputs = {"rubric": rubric, "evaluation": evaluation}
+
+        async def generate():
+            return {"feedback": await chain.ainvoke(inputs)}
+
+        return await self.memoize(state, inputs, generate)
 
 
 class ReportNode(BaseNode):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.name = "ReportNode"
-        self.report_chain = create_report_chain()
+        self.model_name = kwargs.get("model_name", "gpt-4.1-mini")
+        self.model_type = kwargs.get("model_type", "openai")
+        self.model_key = model_key("report", self.model_name, self.model_type)
+        model = {"model_name": self.model_name, "model_type": self.model_type}
+        self.report_chain = create_report_chain(**model)
+        self.prefix_report_chain = create_report_chain(**model, prefix_cache=True)
 
-    def execute(self, state: State) -> State:
+    async def execute(self, state: State) -> State:
         name = state.teacher_input.name
         grade_level = state.teacher_input.grade_level
-        rubric = state.rubric
-        evaluation = state.evaluation
+        rubric, evaluation = prompt_context(state)
         feedback = state.feedback
 
-        print("==== [Generating Report] ====")
-        generated_report = self.report_chain.invoke(
-            {
-                "name": name,
-                "grade_level": grade_level,
-                "rubric": rubric,
-                "evaluation": evaluation,
-                "feedback": feedback,
-            }
+        self.logging("generating_report", name=name)
+        chain = self.prefix_report_chain if state.prefix_cache else self.report_chain
+        inputs = {
+            "name": name,
+            "grade_level": grade_level,
+            "rubric": rubric,
+            "evaluation": evaluation,
+            "feedback": feedback,
+        }
+
+        async def generate():
+            return {"report": await chain.ainvoke(inputs)}
+
+        return await self.memoize(state, inputs, generate)
+
+
+class TeacherReportNode(BaseNode):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.name = "TeacherReportNode"
+        self.model_name = kwargs.get("model_name", "gpt-4.1-mini")
+        self.model_type = kwargs.get("model_type", "openai")
+        self.model_key = model_key("teacher_report", self.model_name, self.model_type)
+        model = {"model_name": self.model_name, "model_type": self.model_type}
+        self.teacher_report_chain = create_teacher_report_chain(**model)
+        self.prefix_teacher_report_chain = create_teacher_report_chain(
+            **model, prefix_cache=True
+        )
+
+    async def execute(self, state: State) -> State:
+        self.logging("generating_teacher_report")
+        rubric, evaluation = prompt_context(state)
+        chain = (
+            self.prefix_teacher_report_chain
+            if state.prefix_cache
+            else self.teacher_report_chain
+        )
+        inputs = {
+            "name": state.teacher_input.name,
+            "grade_level": state.teacher_input.grade_level,
+            "rubric": rubric,
+            "evaluation": evaluation,
+        }
+
+        async def generate():
+            return {"teacher_report": await chain.ainvoke(inputs)}
+
+        return await self.memoize(state, inputs, generate)
+
+
+class ReportMergeNode(BaseNode):
+    """Assemble the final report from the teacher report and the feedback.
+
+    Runs locally without an LLM call once both parallel branches finished.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.name = "ReportMergeNode"
+
+    async def execute(self, state: State) -> State:
+        report = (
+            f"{state.teacher_report.strip()}\n\n"
+            f"## 학생용 피드백\n\n{state.feedback.strip()}\n"
         )
-        return {"report": generated_report}
+        return {"report": report}
@@ -0,0 +1,119 @@
+import json
+import re
+from typing import Any, Optional
+
+from pydantic import ValidationError
+
+from .state import InputParser
+
+# 교사 입력의 "key: value" 줄에서 허용하는 키 이름
+FIELD_ALIASES = {
+    "topic": "topic",
+    "주제": "topic",
+    "objective": "objective",
+    "목적": "objective",
+    "평가목적": "objective",
+    "gradelevel": "grade_level",
+    "grade": "grade_level",
+    "학년": "grade_level",
+    "name": "name",
+    "이름": "name",
+    "학생이름": "name",
+    "studentsubmission": "student_submission",
+    "submission": "student_submission",
+    "학생답안": "student_submission",
+    "답안": "student_submission",
+}
+
+REQUIRED_FIELDS = ("topic", "objective", "grade_level")
+
+KEY_VALUE_LINE = re.compile(r"^\s*([^:：]{1,30})\s*[:：]\s?(.*)$")
+
+
+def field_name(key: str) -> Optional[str]:
+    """The InputParser field a ``key: value`` key or roster column refers to."""
+    return FIELD_ALIASES.get(re.sub(r"[\s_\-]", "", key).lower())
+
+
+def parse_grade_level(value: Any) -> Optional[int]:
+    """Convert grade strings such as ``"초등학교 6학년"`` or ``"중2"`` to an int.
+
+    Middle and high school grades continue the elementary numbering
+    (중학교 1학년 -> 7, 고등학교 1학년 -> 10).
+    """
+    if isinstance(value, int):
+        return value
+    match = re.search(r"\d+", str(value))
+    if match is None:
+        return None
+    grade = int(match.group())
+    if re.search(r"중학|중\s*\d", str(value)) and grade <= 3:
+        grade += 6
+    elif re.search(r"고등|고\s*\d", str(value)) and grade <= 3:
+        grade += 9
+    return grade
+
+
+def _from_fields(fields: dict) -> Optional[InputParser]:
+    if any(not fields.get(field) for field in REQUIRED_FIELDS):
+        return None
+    grade_level = parse_grade_level(fields["grade_level"])
+    if grade_level is None:
+        return None
+    try:
+        return InputParser(
+            grade_level=grade_level,
+            topic=str(fields["topic"]).strip(),
+            objective=str(fields["objective"]).strip(),
+            name=(str(fields.get("name") or "").strip() or None),
+            student_submission=(
+                str(fields.get("student_submission") or "").strip() or None
+            ),
+        )
+    except ValidationError:
+        return None
+
+
+def _parse_key_value_lines(text: str) -> Optional[dict]:
+    fields = {}
+    current = None
+    for line in text.splitlines():
+        match = KEY_VALUE_LINE.match(line)
+        field = field_name(match.group(1)) if match else None
+        if field is not None:
+            current = field
+            fields[field] = match.group(2).strip()
+        elif current is not None:
+            # 학생 답안처럼 여러 줄에 걸친 값은 직전 키에 이어 붙임
+            fields[current] = f"{fields[current]}\n{line}".strip()
+        elif line.strip():
+            return None
+    return fields
+
+
+def parse_structured_input(teacher_input: Any) -> Optional[InputParser]:
+    """Parse teacher input without calling an LLM.
+
+    Accepts an :class:`InputParser`, a dict (or JSON string) with its fields,
+    or the ``key: value`` line format sent by the frontend. Returns ``None``
+    when the input is free-form text that needs the LLM parser.
+    """
+    if isinstance(teacher_input, InputParser):
+        return teacher_input
+    if isinstance(teacher_input, str):
+        text = teacher_input.strip()
+        if text.startswith("{"):
+            try:
+                teacher_input = json.loads(text)
+            except json.JSONDecodeError:
+                return None
+        else:
+            teacher_input = _parse_key_value_lines(text)
+    if not isinstance(teacher_input, dict):
+        return None
+    fields = {}
+    for key, value in teacher_input.items():
+        field = field_name(str(key))
+        if field is not None:
+            fields[field] = value
+    return _from_fields(fields)
@@ -0,0 +1,121 @@
+import dataclasses
+import gzip
+import json
+from os import environ
+from typing import Iterable, Optional
+
+from pydantic_core import to_jsonable_python
+
+from .state import State
+
+try:
+    import brotli
+except ImportError:  # 선택 의존성: pip install rubric-agent[compression]
+    brotli = None
+
+# State 필드 중 응답에 담을 수 있는 이름
+RESULT_FIELDS = tuple(field.name for field in dataclasses.fields(State))
+
+# format="json" 일 때 마크다운 대신 보낼 구조화 데이터 (compact 모드에서만 채워짐)
+STRUCTURED_FIELDS = {"rubric": "rubric_data", "evaluation": "evaluation_data"}
+
+# 이보다 작은 본문은 압축하지 않음 - 헤더와 압축 비용이 더 큼
+COMPRESS_MIN_BYTES = int(environ.get("RUBRIC_COMPRESS_MIN_BYTES", 1024))
+GZIP_LEVEL = int(environ.get("RUBRIC_GZIP_LEVEL", 6))
+BROTLI_QUALITY = int(environ.get("RUBRIC_BROTLI_QUALITY", 5))
+
+
+def parse_fields(fields: Optional[Iterable[str] | str]) -> Optional[tuple[str, ...]]:
+    """Validate a field projection given as a list or a comma-separated string.
+
+    Returns ``None`` (every field) for an empty projection. Raises
+    ``ValueError`` naming the unknown fields.
+    """
+    if fields is None:
+        return None
+    if isinstance(fields, str):
+        fields = fields.split(",")
+    names = tuple(dict.fromkeys(name.strip() for name in fields if name.strip()))
+    unknown = [name for name in names if name not in RESULT_FIELDS]
+    if unknown:
+        raise ValueError(
+            f"unknown fields {unknown}; expected some of {list(RESULT_FIELDS)}"
+        )
+    return names or None
+
+
+def project(
+    values: dict,
+    fields: Optional[Iterable[str]] = None,
+    format: str = "markdown",
+) -> dict:
+    """The part of a graph state a client asked for.
+
+    Parameters
+    ----------
+    values : dict
+        State channel values, as returned by the graph.
+    fields : iterable of str, optional
+        Fields to keep, in order. ``None`` keeps every field.
+    format : str
+        ``"markdown"`` returns the sections as generated. ``"json"``
+        replaces ``rubric`` and ``evaluation`` with their structured data
+        (``rubric_data`` / ``evaluation_data``) where the run produced it,
+        instead of markdown tables; the data fields are then not repeated.
+        Sections without data stay markdown.
+    """
+    values = dict(values)
+    if format == "json":
+        for field, data_field in STRUCTURED_FIELDS.items():
+            if values.get(data_field) is not None:
+                values[field] = values[data_field]
+            if fields is None:
+                values.pop(data_field, None)
+    if fields is not None:
+        values = {field: values[field] for field in fields if field in values}
+    # 고른 필드만 변환 - 보내지 않을 teacher_input 등은 건드리지 않음
+    return to_jsonable_python(values)
+
+
+def encode(payload: dict) -> bytes:
+    """Serialize like ``JSONResponse``: UTF-8, no ASCII escapes, no spaces."""
+    return json.dumps(
+        payload, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def accepted_encodings(accept_encoding: Optional[str]) -> set[str]:
+    """Codings an Accept-Encoding header allows (``q=0`` excluded)."""
+    accepted = set()
+    for item in (accept_encoding or "").split(","):
+        coding, _, params = item.strip().partition(";")
+        q = params.strip().removeprefix("q=")
+        try:
+            if params and float(q) == 0:
+                continue
+        except ValueError:
+            continue
+        if coding:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def compress(
+    body: bytes, accept_encoding: Optional[str]
+) -> tuple[bytes, Optional[str]]:
+    """Compress ``body`` with the best coding the client accepts.
+
+    Returns
+    -------
+    tuple
+        The body to send and its ``Content-Encoding`` (``None`` if sent as is).
+        Brotli is used only when the ``brotli`` package is installed.
+    """
+    if len(body) < COMPRESS_MIN_BYTES:
+        return body, None
+    accepted = accepted_encodings(accept_encoding)
+    if brotli is not None and ("br" in accepted or "*" in accepted):
+        return brotli.compress(body, quality=BROTLI_QUALITY), "br"
+    if "gzip" in accepted or "*" in accepted:
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0), "gzip"
+    return body, None
@@ -0,0 +1,121 @@
+from typing import Optional
+
+from .chains import Evaluation, Rubric
+
+
+def _cell(text: str) -> str:
+    return " ".join(str(text).split()).replace("|", "\\|")
+
+
+def render_rubric(rubric: Rubric) -> str:
+    """Render a :class:`Rubric` as the markdown table shown to teachers."""
+    header_levels = max(rubric.criteria, key=lambda c: len(c.levels)).levels
+    width = len(header_levels)
+    header = ["평가 기준"]
+    header += [f"{level.label} ({level.score}점)" for level in header_levels]
+    header.append("관찰 포인트")
+
+    lines = [
+        "| " + " | ".join(header) + " |",
+        "|" + "---|" * len(header),
+    ]
+    for criterion in rubric.criteria:
+        cells = [f"**{_cell(criterion.name)}**"]
+        cells += [_cell(level.description) for level in criterion.levels]
+        cells += [""] * (width - len(criterion.levels))
+        cells.append(
+            "<br>".join(_cell(anchor) for anchor in criterion.evidence_anchors)
+        )
+        lines.append("| " + " | ".join(cells) + " |")
+    return "\n".join(lines) + "\n"
+
+
+def criteria_table_end(markdown: str) -> Optional[int]:
+    """Offset just past the first table of ``markdown``.
+
+    ``None`` until a line after the table has started, so a rubric that is
+    still streaming can be cut as soon as its criteria table is complete.
+    """
+    offset = 0
+    in_table = False
+    for line in markdown.splitlines(keepends=True):
+        if line.lstrip().startswith("|"):
+            in_table = True
+        elif in_table:
+            return offset
+        offset += len(line)
+    return None
+
+
+def criteria_table(rubric: str) -> str:
+    """The markdown ``rubric`` up to the end of its criteria table."""
+    end = criteria_table_end(rubric)
+    return rubric if end is None else rubric[:end]
+
+
+def max_scores(rubric: Rubric) -> dict[str, int]:
+    return {
+        criterion.name: max((level.score for level in criterion.levels), default=0)
+        for criterion in rubric.criteria
+    }
+
+
+def render_evaluation(evaluation: Evaluation, rubric: Optional[Rubric] = None) -> str:
+    """Render an :class:`Evaluation` as a markdown table with the total score."""
+    maximum = max_scores(rubric) if rubric is not None else {}
+    lines = [
+        "| 평가 기준 | 수준 | 점수 | 근거 |",
+        "|---|---|---|---|",
+    ]
+    for item in evaluation.criteria:
+        score = str(item.score)
+        if item.criterion in maximum:
+            score = f"{item.score}/{maximum[item.criterion]}"
+        lines.append(
+            f"| {_cell(item.criterion)} | {_cell(item.level)} | {score} |"
+            f" {_cell(item.evidence)} |"
+        )
+    total = sum(item.score for item in evaluation.criteria)
+    if maximum:
+        total = f"{total}/{sum(maximum.values())}"
+    lines.append(f"| **총점** | | **{total}** | |")
+    return "\n".join(lines) + f"\n\n{evaluation.comment.strip()}\n"
+
+
+def compact_rubric(rubric: Rubric) -> str:
+    """One line per criterion, for prompts of later stages.
+
+    ``주장의 명확성: 상=3 주장이 분명함; 중=2 ...; 하=1 ... [관찰: ...]``
+    """
+    lines = []
+    for criterion in rubric.criteria:
+        levels = "; ".join(
+            f"{level.label}={level.score} {_cell(level.description)}"
+            for level in criterion.levels
+        )
+        line = f"{_cell(criterion.name)}: {levels}"
+        if criterion.evidence_anchors:
+            line += f" [관찰: {', '.join(map(_cell, criterion.evidence_anchors))}]"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def compact_evaluation(evaluation: Evaluation, rubric: Optional[Rubric] = None) -> str:
+    """One line per criterion plus the total, for prompts of later stages.
+
+    ``주장의 명확성: 상 3/3 - 근거``
+    """
+    maximum = max_scores(rubric) if rubric is not None else {}
+    lines = []
+    for item in evaluation.criteria:
+        score = str(item.score)
+        if item.criterion in maximum:
+            score = f"{item.score}/{maximum[item.criterion]}"
+        lines.append(
+            f"{_cell(item.criterion)}: {_cell(item.level)} {score} - {_cell(item.evidence)}"
+        )
+    total = sum(item.score for item in evaluation.criteria)
+    if maximum:
+        total = f"{total}/{sum(maximum.values())}"
+    lines.append(f"총점: {total}. {_cell(evaluation.comment)}")
+    return "\n".join(lines)
@@ -0,0 +1,371 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from os import environ
+from typing import Any, AsyncIterator, Optional
+
+from langchain_core.runnables import Runnable, RunnableConfig
+from langchain_core.runnables.config import merge_configs
+
+from .llm import get_llm, is_retryable_error
+from .metrics import LLM_ROUTES
+
+# 헤지 요청 태그 - 스트리밍 시 두 타깃의 토큰이 섞이지 않도록 헤지 쪽 토큰은 내보내지 않음
+HEDGE_TAG = "llm_hedge"
+
+# "openai:gpt-4.1-mini,gemini:gemini-2.5-flash" 처럼 우선순위 순서로 나열.
+# RUBRIC_LLM_TARGETS_<STAGE> (예: RUBRIC_LLM_TARGETS_EVALUATION)로 단계별 지정 가능
+TARGETS = environ.get("RUBRIC_LLM_TARGETS", "")
+# 지연 시간/오류율 계산 구간: 최근 WINDOW 번, WINDOW_SECONDS 초 이내의 호출.
+# 오래된 표본이 빠지면서 순위가 밀린 타깃도 다시 시도됨
+WINDOW = int(environ.get("RUBRIC_ROUTER_WINDOW", 100))
+WINDOW_SECONDS = float(environ.get("RUBRIC_ROUTER_WINDOW_SECONDS", 300))
+# 이 분위수의 지연 시간을 넘기면 다음 타깃으로 헤지 요청을 보냄 (0이면 헤지 안 함)
+HEDGE_QUANTILE = float(environ.get("RUBRIC_ROUTER_HEDGE_QUANTILE", 0.95))
+HEDGE_MIN_DELAY = float(environ.get("RUBRIC_ROUTER_HEDGE_MIN_DELAY", 1.0))
+# 표본이 HEDGE_MIN_SAMPLES 개 미만일 때 쓰는 헤지 대기 시간
+HEDGE_DEFAULT_DELAY = float(environ.get("RUBRIC_ROUTER_HEDGE_DEFAULT_DELAY", 15.0))
+HEDGE_MIN_SAMPLES = int(environ.get("RUBRIC_ROUTER_HEDGE_MIN_SAMPLES", 20))
+# 오류율이 이 값을 넘거나 429/5xx 직후 쿨다운 중인 타깃은 순위 맨 뒤로
+MAX_ERROR_RATE = float(environ.get("RUBRIC_ROUTER_MAX_ERROR_RATE", 0.5))
+COOLDOWN = float(environ.get("RUBRIC_ROUTER_COOLDOWN", 30.0))
+# p95 가 더 빠른 정상 타깃의 이 배수를 넘으면 순위를 낮춤
+SLOW_FACTOR = float(environ.get("RUBRIC_ROUTER_SLOW_FACTOR", 3.0))
+
+
+@dataclass(frozen=True)
+class Target:
+    provider: str
+    model: str
+
+    def __str__(self) -> str:
+        return f"{self.provider}:{self.model}"
+
+
+def parse_targets(spec: str) -> list[Target]:
+    targets = []
+    for item in spec.split(","):
+        item = item.strip()
+        if item:
+            provider, _, model = item.partition(":")
+            targets.append(Target(provider.strip(), model.strip()))
+    return targets
+
+
+def targets_for(stage: str) -> list[Target]:
+    """Ranked targets configured for ``stage``, or ``[]`` when routing is off."""
+    return parse_targets(environ.get(f"RUBRIC_LLM_TARGETS_{stage.upper()}", TARGETS))
+
+
+class RollingWindow:
+    """The last ``WINDOW`` samples that are at most ``WINDOW_SECONDS`` old."""
+
+    def __init__(self):
+        self._samples: deque[tuple[float, float]] = deque(maxlen=WINDOW)
+        self._lock = threading.Lock()
+
+    def add(self, value: float) -> None:
+        with self._lock:
+            self._samples.append((time.monotonic(), value))
+
+    def values(self) -> list[float]:
+        horizon = time.monotonic() - WINDOW_SECONDS
+        with self._lock:
+            while self._samples and self._samples[0][0] < horizon:
+                self._samples.popleft()
+            return [value for _, value in self._samples]
+
+    def quantile(self, q: float) -> Optional[float]:
+        """The ``q`` quantile, or ``None`` below ``HEDGE_MIN_SAMPLES`` samples."""
+        values = sorted(self.values())
+        if len(values) < HEDGE_MIN_SAMPLES:
+            return None
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+
+class TargetHealth:
+    """Rolling error rate and 429/5xx cooldown of one target, shared by all stages."""
+
+    def __init__(self):
+        self.results = RollingWindow()
+        self.cooldown_until = 0.0
+
+    def record(self, error: Optional[BaseException] = None) -> None:
+        self.results.add(0.0 if error is None else 1.0)
+        if error is not None and is_retryable_error(error):
+            self.cooldown_until = time.monotonic() + _retry_after(error)
+
+    def error_rate(self) -> tuple[float, int]:
+        """Fraction of failed calls in the window and the number of calls."""
+        results = self.results.values()
+        return (sum(results) / len(results) if results else 0.0), len(results)
+
+    def available(self) -> bool:
+        if time.monotonic() < self.cooldown_until:
+            return False
+        error_rate, calls = self.error_rate()
+        return calls < 5 or error_rate < MAX_ERROR_RATE
+
+
+def _retry_after(error: BaseException) -> float:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after", COOLDOWN))
+    except (TypeError, ValueError):
+        return COOLDOWN
+
+
+_health_lock = threading.Lock()
+_health: dict[Target, TargetHealth] = {}
+
+
+def health(target: Target) -> TargetHealth:
+    with _health_lock:
+        if target not in _health:
+            _health[target] = TargetHealth()
+        return _health[target]
+
+
+class RoutedRunnable(Runnable):
+    """Send each call to the best of several (provider, model) targets.
+
+    Targets are tried in configured order, except that targets in cooldown
+    after a 429/5xx, with a high error rate or much slower than another
+    healthy target move to the back. A call still running after the current
+    target's rolling p95 is hedged: the next target gets the same request and
+    the first answer wins. Retryable errors fail over to the next target.
+    Streaming calls hedge and fail over on the first chunk only.
+
+    Parameters
+    ----------
+    stage : str
+        Name of the chain, used for per-stage latency windows and metrics.
+    routes : list of (Target, Runnable)
+        The runnable to call for each target, in priority order.
+    """
+
+    def __init__(self, stage: str, routes: list[tuple[Target, Runnable]]):
+        self.stage = stage
+        self.routes = routes
+        self.latencies = {target: RollingWindow() for target, _ in routes}
+
+    def with_structured_output(self, schema, **kwargs) -> "RoutedRunnable":
+        return RoutedRunnable(
+            self.stage,
+            [
+                (target, runnable.with_structured_output(schema, **kwargs))
+                for target, runnable in self.routes
+            ],
+        )
+
+    def ranked(self) -> list[tuple[Target, Runnable]]:
+        fastest = min(
+            (
+                p95
+                for target, _ in self.routes
+                if health(target).available()
+                and (p95 := self.latencies[target].quantile(0.95)) is not None
+            ),
+            default=None,
+        )
+        preferred, demoted = [], []
+        for target, runnable in self.routes:
+            p95 = self.latencies[target].quantile(0.95)
+            slow = (
+                fastest is not None and p95 is not None and p95 > fastest * SLOW_FACTOR
+            )
+            if health(target).available() and not slow:
+                preferred.append((target, runnable))
+            else:
+                demoted.append((target, runnable))
+        return preferred + demoted
+
+    def hedge_delay(self, target: Target) -> Optional[float]:
+        if not HEDGE_QUANTILE:
+            return None
+        delay = self.latencies[target].quantile(HEDGE_QUANTILE)
+        if delay is None:
+            return HEDGE_DEFAULT_DELAY
+        return max(HEDGE_MIN_DELAY, delay)
+
+    def _record(self, target: Target, started: float, outcome: str, error=None):
+        LLM_ROUTES.inc(stage=self.stage, target=str(target), outcome=outcome)
+        if outcome in ("ok", "cancelled"):
+            # 헤지에 진 요청의 경과 시간도 (하한값으로) 기록해야 느려진 타깃이 드러남
+            self.latencies[target].add(time.perf_counter() - started)
+        if outcome in ("ok", "error"):
+            health(target).record(error)
+
+    def invoke(
+        self, input: Any, config: Optional[RunnableConfig] = None, **kwargs
+    ) -> Any:
+        error = None
+        for target, runnable in self.ranked():
+            started = time.perf_counter()
+            try:
+                result = runnable.invoke(input, config, **kwargs)
+            except Exception as e:
+                self._record(target, started, "error", e)
+                if not is_retryable_error(e):
+                    raise
+                LLM_ROUTES.inc(stage=self.stage, target=str(target), outcome="failover")
+                error = e
+                continue
+            self._record(target, started, "ok")
+            return result
+        raise error
+
+    async def _race(self, start, discard=None) -> Any:
+        """Await ``start(runnable)`` on the ranked targets, hedging and failing over.
+
+        ``start`` also receives whether the call is a hedge, i.e. another
+        target is still working on the same request. ``discard`` is awaited
+        with the result of a finished call that lost the race, e.g. to close
+        its stream.
+        """
+        candidates = iter(self.ranked())
+        running: dict[asyncio.Task, tuple[Target, float]] = {}
+        last_error: Optional[BaseException] = None
+        hedged = False
+
+        def launch() -> bool:
+            for target, runnable in candidates:
+                task = asyncio.ensure_future(start(runnable, bool(running)))
+                running[task] = (target, time.perf_counter())
+                return True
+            return False
+
+        launch()
+        try:
+            while running:
+                timeout = None
+                if not hedged and len(running) == 1:
+                    timeout = self.hedge_delay(next(iter(running.values()))[0])
+                done, _ = await asyncio.wait(
+                    running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    # 현재 타깃이 p95 를 넘김 - 다음 타깃에 같은 요청을 보내 먼저 온 응답 사용
+                    hedged = True
+                    slow, _ = next(iter(running.values()))
+                    if launch():
+                        LLM_ROUTES.inc(
+                            stage=self.stage, target=str(slow), outcome="hedge"
+                        )
+                    continue
+                for task in done:
+                    target, started = running.pop(task)
+                    error = task.exception()
+                    if error is None:
+                        self._record(target, started, "ok")
+                        return task.result()
+                    self._record(target, started, "error", error)
+                    if not is_retryable_error(error):
+                        raise error
+                    last_error = error
+                    LLM_ROUTES.inc(
+                        stage=self.stage, target=str(target), outcome="failover"
+                    )
+                if not running:
+                    launch()
+            raise last_error
+        finally:
+            for task, (target, started) in running.items():
+                self._record(target, started, "cancelled")
+                if not task.done():
+                    task.cancel()
+                elif discard is not None and task.exception() is None:
+                    await discard(task.result())
+
+    async def ainvoke(
+        self, input: Any, config: Optional[RunnableConfig] = None, **kwargs
+    ) -> Any:
+        def start(runnable: Runnable, hedge: bool):
+            if hedge:
+                return runnable.ainvoke(
+                    input, merge_configs(config, {"tags": [HEDGE_TAG]}), **kwargs
+                )
+            return runnable.ainvoke(input, config, **kwargs)
+
+        return await self._race(start)
+
+    async def astream(
+        self, input: Any, config: Optional[RunnableConfig] = None, **kwargs
+    ) -> AsyncIterator[Any]:
+        async def first_chunk(runnable: Runnable, hedge: bool):
+            if hedge:
+                stream = runnable.astream(
+                    input, merge_configs(config, {"tags": [HEDGE_TAG]}), **kwargs
+                )
+            else:
+                stream = runnable.astream(input, config, **kwargs)
+            try:
+                return stream, await stream.__anext__()
+            except BaseException:
+                await stream.aclose()
+                raise
+
+        async def close(result):
+            await result[0].aclose()
+
+        # 첫 청크까지 헤지/장애 조치 - 이후에는 선택된 타깃의 스트림을 그대로 전달
+        stream, chunk = await self._race(first_chunk, close)
+        try:
+            yield chunk
+            async for chunk in stream:
+                yield chunk
+        finally:
+            await stream.aclose()
+
+
+def model_key(
+    stage: str, model_name: str = "gpt-4.1-mini", model_type: str = "openai"
+) -> str:
+    """The targets that answer ``stage``, as part of a cache key.
+
+    ``"openai:gpt-4.1-mini"`` without routing. With ``RUBRIC_LLM_TARGETS``
+    every configured target in order, since any of them may answer, so
+    outputs cached for one target set are not served for another.
+    """
+    targets = targets_for(stage) or [Target(model_type, model_name)]
+    return ",".join(map(str, targets))
+
+
+def get_routed_llm(
+    stage: str,
+    model_name: str = "gpt-4.1-mini",
+    model_type: str = "openai",
+    temperature: float = 0,
+):
+    """The chat model for ``stage``, routed when several targets are configured.
+
+    Without ``RUBRIC_LLM_TARGETS`` this is ``get_llm(model_name, model_type)``.
+    """
+    targets = targets_for(stage) or [Target(model_type, model_name)]
+    if len(targets) == 1:
+        return get_llm(targets[0].model, targets[0].provider, temperature)
+    return RoutedRunnable(
+        stage,
+        [
+            (target, get_llm(target.model, target.provider, temperature))
+            for target in targets
+        ],
+    )
+
+
+def route_stats() -> dict:
+    """Health of every target seen so far."""
+    with _health_lock:
+        items = list(_health.items())
+    stats = {}
+    for target, state in items:
+        error_rate, calls = state.error_rate()
+        stats[str(target)] = {
+            "available": state.available(),
+            "calls": calls,
+            "error_rate": round(error_rate, 3),
+            "cooldown_s": round(max(0.0, state.cooldown_until - time.monotonic()), 1),
+        }
+    return stats
@@ -1,51 +1,481 @@
+import asyncio
+import threading
+from typing import TYPE_CHECKING, AsyncIterable, AsyncIterator, Iterable, Optional
+
 from .state import State
-from .nodes import *
-from .chains import *
 
-from langgraph.graph import END, StateGraph, START
-from langgraph.checkpoint.memory import MemorySaver
-from langchain_core.runnables import RunnableConfig
+if TYPE_CHECKING:
+    from langchain_core.runnables import RunnableConfig
+    from langgraph.graph import StateGraph
+
+# linear: 평가 → 피드백 → 리포트 순차 실행
+# fast: 교사용 리포트를 피드백과 병렬로 생성한 뒤 로컬에서 합침
+PIPELINES = ("linear", "fast")
+
+# 노드(와 LLM 클라이언트)와 그래프는 첫 요청 시점에 생성 - Lambda 콜드 스타트 단축
+_lock = threading.RLock()
+_nodes: dict = {}
+_apps: dict = {}
+_grading_apps: dict = {}
+_checkpointer = None
+
+
+def get_checkpointer():
+    """The checkpointer selected by ``RUBRIC_CHECKPOINTER`` (memory or sqlite)."""
+    global _checkpointer
+    with _lock:
+        if _checkpointer is None:
+            from .checkpoint import create_checkpointer
+
+            _checkpointer = create_checkpointer()
+        return _checkpointer
+
+
+def make_config(thread_id: str) -> "RunnableConfig":
+    return {"recursion_limit": 10, "configurable": {"thread_id": thread_id}}
 
-workflow = StateGraph(State)
 
-workflow.add_node("input_parser", InputParserNode())
-workflow.add_node("rubric_generator", RubricNode())
-workflow.add_node("evaluation_generator", EvaluationNode())
-workflow.add_node("feedback_generator", FeedbackNode())
-workflow.add_node("report_generator", ReportNode())
+def get_nodes() -> dict:
+    """Instantiate the graph nodes on first use and return them by name."""
+    with _lock:
+        if not _nodes:
+            from .nodes import (
+                InputParserNode,
+                RubricNode,
+                EvaluationRouterNode,
+                EvaluationNode,
+                FeedbackNode,
+                ReportNode,
+                TeacherReportNode,
+                ReportMergeNode,
+            )
 
-workflow.add_edge(START, "input_parser")
-workflow.add_edge("input_parser", "rubric_generator")
+            evaluation_generator = EvaluationNode()
+            _nodes.update(
+                input_parser=InputParserNode(),
+                rubric_generator=RubricNode(evaluator=evaluation_generator),
+                evaluation_router=EvaluationRouterNode(),
+                evaluation_generator=evaluation_generator,
+                feedback_generator=FeedbackNode(),
+                report_generator=ReportNode(),
+                teacher_report_generator=TeacherReportNode(),
+                report_merger=ReportMergeNode(),
+            )
+        return _nodes
 
-workflow.add_conditional_edges(
-    source="rubric_generator",
-    path=EvaluationRouterNode(),
-    path_map={"evaluation_generator": "evaluation_generator", "END": END},
-)
 
-workflow.add_edge("evaluation_generator", "feedback_generator")
-workflow.add_edge("feedback_generator", "report_generator")
+def add_grading_steps(workflow: "StateGraph", pipeline: str) -> None:
+    """Add the evaluation_generator → ... → END part of the graph."""
+    from langgraph.graph import END
 
-workflow.add_edge("report_generator", END)
+    nodes = get_nodes()
+    workflow.add_node("evaluation_generator", nodes["evaluation_generator"])
+    workflow.add_node("feedback_generator", nodes["feedback_generator"])
 
+    if pipeline == "fast":
+        workflow.add_node("teacher_report_generator", nodes["teacher_report_generator"])
+        workflow.add_node("report_merger", nodes["report_merger"])
 
-memory_saver = MemorySaver()
-app = workflow.compile(checkpointer=memory_saver)
+        workflow.add_edge("evaluation_generator", "feedback_generator")
+        workflow.add_edge("evaluation_generator", "teacher_report_generator")
+        workflow.add_edge(
+            ["feedback_generator", "teacher_report_generator"], "report_merger"
+        )
+        workflow.add_edge("report_merger", END)
+    else:
+        workflow.add_node("report_generator", nodes["report_generator"])
 
+        workflow.add_edge("evaluation_generator", "feedback_generator")
+        workflow.add_edge("feedback_generator", "report_generator")
+        workflow.add_edge("report_generator", END)
 
-async def response(teacher_input: str, thread_id: str) -> State:
 
-    config = RunnableConfig(
-        recursion_limit=10,
-        configurable={"thread_id": thread_id},
+def build_workflow(pipeline: str = "linear") -> "StateGraph":
+    from langgraph.graph import END, StateGraph, START
+
+    nodes = get_nodes()
+    workflow = StateGraph(State)
+
+    workflow.add_node("input_parser", nodes["input_parser"])
+    workflow.add_node("rubric_generator", nodes["rubric_generator"])
+
+    workflow.add_edge(START, "input_parser")
+    workflow.add_edge("input_parser", "rubric_generator")
+
+    workflow.add_conditional_edges(
+        source="rubric_generator",
+        path=nodes["evaluation_router"],
+        path_map={"evaluation_generator": "evaluation_generator", "END": END},
     )
 
-    inputs = {"teacher_input": teacher_input}
+    add_grading_steps(workflow, pipeline)
+    return workflow
+
+
+def build_grading_workflow(pipeline: str = "linear") -> "StateGraph":
+    """배치 채점용 그래프: 루브릭은 한 번만 만들고 학생별로 평가 단계만 실행"""
+    from langgraph.graph import StateGraph, START
+
+    workflow = StateGraph(State)
+    workflow.add_edge(START, "evaluation_generator")
+    add_grading_steps(workflow, pipeline)
+    return workflow
+
+
+def get_app(pipeline: str = "linear"):
+    """Compile the full graph for ``pipeline`` on first use."""
+    with _lock:
+        if pipeline not in _apps:
+            _apps[pipeline] = build_workflow(pipeline).compile(
+                checkpointer=get_checkpointer()
+            )
+        return _apps[pipeline]
+
+
+def get_grading_app(pipeline: str = "linear"):
+    """Compile the batch grading graph for ``pipeline`` on first use."""
+    with _lock:
+        if pipeline not in _grading_apps:
+            _grading_apps[pipeline] = build_grading_workflow(pipeline).compile(
+                checkpointer=get_checkpointer()
+            )
+        return _grading_apps[pipeline]
+
+
+def __getattr__(name):
+    # 기존 코드 호환: rubric.app 은 첫 접근 시 컴파일
+    if name == "app":
+        return get_app()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+async def resume_point(graph, config: "RunnableConfig") -> str:
+    """Where an idempotent retry of the request on ``config``'s thread starts.
+
+    ``"resume"`` when the previous run stopped before finishing (continue
+    from the last checkpoint), ``"done"`` when it already completed and
+    ``"start"`` when the thread has no checkpoint yet.
+    """
+    snapshot = await graph.aget_state(config)
+    if snapshot.next:
+        return "resume"
+    if snapshot.values:
+        return "done"
+    return "start"
+
+
+def checkpoint_id(snapshot) -> str:
+    return snapshot.config["configurable"]["checkpoint_id"]
+
+
+async def saved_result(thread_id: str, pipeline: str = "linear") -> Optional[dict]:
+    """The latest saved state of ``thread_id``, without running anything.
+
+    Returns
+    -------
+    dict or None
+        ``checkpoint_id`` (changes whenever the state does), ``complete``
+        (the run reached the end of the graph) and ``generated_results``.
+        ``None`` when the thread has no checkpoint.
+    """
+    snapshot = await get_app(pipeline).aget_state(make_config(thread_id))
+    if not snapshot.values:
+        return None
+    return {
+        "checkpoint_id": checkpoint_id(snapshot),
+        "complete": not snapshot.next,
+        "generated_results": snapshot.values,
+    }
+
 
-    results = app.invoke(inputs, config=config)
+async def response(
+    teacher_input: str | dict,
+    thread_id: str,
+    use_cache: bool = True,
+    pipeline: str = "linear",
+    resume: bool = False,
+    compact: bool = False,
+    prefix_cache: bool = False,
+    speculative: bool = False,
+) -> State:
+
+    config = make_config(thread_id)
+    graph = get_app(pipeline)
+
+    inputs = {
+        "raw_input": teacher_input,
+        "use_cache": use_cache,
+        "compact": compact,
+        "prefix_cache": prefix_cache,
+        "speculative": speculative,
+    }
+
+    if resume:
+        # 실패한 요청을 재시도할 때 이미 완료된 단계(루브릭/평가 등)는 다시 생성하지 않음
+        point = await resume_point(graph, config)
+        if point == "done":
+            return (await graph.aget_state(config)).values
+        if point == "resume":
+            inputs = None
+
+    from .nodes import cancel_speculation
+
+    try:
+        results = await graph.ainvoke(inputs, config=config)
+    finally:
+        # 실행이 중간에 끝나면(취소/오류) 미리 시작된 평가가 LLM 을 계속 호출하지 않도록
+        cancel_speculation(thread_id)
 
     return results
 
 
+# 토큰 단위로 스트리밍할 노드와 결과 State 필드
+STREAMED_SECTIONS = {
+    "rubric_generator": "rubric",
+    "evaluation_generator": "evaluation",
+    "feedback_generator": "feedback",
+    "report_generator": "report",
+    "teacher_report_generator": "report",
+}
+
+
+async def stream_response(
+    teacher_input: str | dict,
+    thread_id: str,
+    use_cache: bool = True,
+    pipeline: str = "linear",
+    resume: bool = False,
+    compact: bool = False,
+    prefix_cache: bool = False,
+    speculative: bool = False,
+) -> AsyncIterator[dict]:
+    """Run the graph and yield progress events as they happen.
+
+    Yields ``node_start``/``node_end`` events for every graph node, ``token``
+    events carrying text deltas from the rubric, evaluation, feedback and
+    report chains, and a final ``done`` event with the full state and its
+    ``checkpoint_id`` (the ETag of ``GET /api/rubric/{thread_id}``).
+
+    With ``speculative`` the evaluation starts while the rubric is still
+    streaming; its ``node_start`` is sent with its first token, so the
+    rubric and evaluation tokens interleave.
+    """
+    config = make_config(thread_id)
+    graph = get_app(pipeline)
+
+    inputs = {
+        "raw_input": teacher_input,
+        "use_cache": use_cache,
+        "compact": compact,
+        "prefix_cache": prefix_cache,
+        "speculative": speculative,
+    }
+
+    point = await resume_point(graph, config) if resume else "start"
+    if point == "done":
+        snapshot = await graph.aget_state(config)
+        yield {
+            "event": "done",
+            "checkpoint_id": checkpoint_id(snapshot),
+            "generated_results": snapshot.values,
+        }
+        return
+    if point == "resume":
+        inputs = None
+
+    # 그래프 컴파일 시 이미 로드된 모듈
+    from .chains import STRUCTURED_OUTPUT_TAG
+    from .nodes import SPECULATION_TAG, cancel_speculation
+    from .routing import HEDGE_TAG
+
+    try:
+        started = set()
+        async for event in graph.astream_events(inputs, config=config, version="v2"):
+            node = event.get("metadata", {}).get("langgraph_node")
+            kind = event["event"]
+            if SPECULATION_TAG in event.get("tags", []):
+                # 루브릭 노드 안에서 미리 시작된 평가
+                node = "evaluation_generator"
+
+            if kind in ("on_chain_start", "on_chain_end") and event["name"] == node:
+                if kind == "on_chain_start":
+                    if node not in started:
+                        started.add(node)
+                        yield {"event": "node_start", "node": node}
+                else:
+                    yield {
+                        "event": "node_end",
+                        "node": node,
+                        "output": event["data"].get("output"),
+                    }
+            elif (
+                kind == "on_chat_model_stream"
+                and node in STREAMED_SECTIONS
+                and STRUCTURED_OUTPUT_TAG not in event.get("tags", [])
+                and HEDGE_TAG not in event.get("tags", [])
+            ):
+                delta = event["data"]["chunk"].content
+                if delta:
+                    if node not in started:
+                        started.add(node)
+                        yield {"event": "node_start", "node": node}
+                    yield {
+                        "event": "token",
+                        "node": node,
+                        "section": STREAMED_SECTIONS[node],
+                        "delta": delta,
+                    }
+    finally:
+        # 클라이언트가 스트림을 닫거나 오류로 끝나면 미리 시작된 평가도 취소
+        cancel_speculation(thread_id)
+
+    snapshot = await graph.aget_state(config)
+    yield {
+        "event": "done",
+        "checkpoint_id": checkpoint_id(snapshot),
+        "generated_results": snapshot.values,
+    }
+
+
+async def batch_response(
+    teacher_input: str | dict,
+    submissions: Iterable[dict] | AsyncIterable[dict],
+    thread_id: str,
+    max_concurrency: int = 5,
+    use_cache: bool = True,
+    pipeline: str = "linear",
+    compact: bool = False,
+    prefix_cache: bool = True,
+) -> AsyncIterator[dict]:
+    """Grade a whole class against one shared rubric.
+
+    The teacher input is parsed and the rubric generated once; each submission
+    then runs through the grading graph with at most ``max_concurrency``
+    students in flight. Yields a ``rubric`` event first, followed by one
+    ``result`` event per student in completion order.
+
+    ``submissions`` is consumed lazily, so a generator reading a roster file
+    keeps memory flat however many rows it has. A submission's ``index``
+    (its position by default) is echoed in its result and names its thread.
+
+    With ``prefix_cache`` the prompts start with a byte-stable prefix of
+    instructions and rubric, and the other students wait until the first
+    student's evaluation has been sent, so the provider has that prefix
+    cached before the fan-out.
+    """
+    from .nodes import cancel_speculation
+
+    state = State(raw_input=teacher_input, use_cache=use_cache, compact=compact)
+    nodes = get_nodes()
+    state.teacher_input = (await nodes["input_parser"](state))["teacher_input"]
+    generated = await nodes["rubric_generator"](state)
+    state.rubric = generated["rubric"]
+    state.rubric_data = generated.get("rubric_data")
+
+    yield {
+        "type": "rubric",
+        "teacher_input": state.teacher_input.model_dump(),
+        "rubric": state.rubric,
+        "rubric_data": state.rubric_data,
+        "similar_rubric": generated.get("similar_rubric"),
+    }
+
+    prefix_warm = asyncio.Event()
+    if not prefix_cache:
+        prefix_warm.set()
+
+    async def run_grading(inputs: dict, config: "RunnableConfig") -> dict:
+        graph = get_grading_app(pipeline)
+        if prefix_warm.is_set():
+            return await graph.ainvoke(inputs, config=config)
+        # 첫 학생: 평가 단계가 끝나면(루브릭 접두사가 캐시된 뒤) 나머지 학생을 시작
+        try:
+            async for update in graph.astream(
+                inputs, config=config, stream_mode="updates"
+            ):
+                if "evaluation_generator" in update:
+                    prefix_warm.set()
+        finally:
+            prefix_warm.set()
+        return (await graph.aget_state(config)).values
+
+    async def grade(index: int, submission: dict, first: bool) -> dict:
+        student_input = state.teacher_input.model_copy(
+            update={
+                "name": submission.get("name"),
+                "student_submission": submission["student_submission"],
+            }
+        )
+        config = make_config(f"{thread_id}:{index}")
+        if not first:
+            await prefix_warm.wait()
+        try:
+            results = await run_grading(
+                {
+                    "teacher_input": student_input,
+                    "rubric": state.rubric,
+                    "rubric_data": state.rubric_data,
+                    "use_cache": use_cache,
+                    "compact": compact,
+                    "prefix_cache": prefix_cache,
+                },
+                config,
+            )
+        except Exception as e:
+            return {
+                "type": "result",
+                "index": index,
+                "name": student_input.name,
+                "status": "error",
+                "detail": str(e),
+            }
+        finally:
+            # 학생별 스레드는 결과를 낸 뒤 다시 읽지 않음 - 명단이 길어도 메모리 유지
+            cancel_speculation(config["configurable"]["thread_id"])
+            await get_checkpointer().adelete_thread(config["configurable"]["thread_id"])
+        return {
+            "type": "result",
+            "index": index,
+            "name": student_input.name,
+            "status": "success",
+            "evaluation": results["evaluation"],
+            "evaluation_data": results.get("evaluation_data"),
+            "feedback": results["feedback"],
+            "report": results["report"],
+        }
+
+    async def iterate():
+        if isinstance(submissions, AsyncIterable):
+            async for submission in submissions:
+                yield submission
+        else:
+            for submission in submissions:
+                yield submission
+
+    # 다음 답안은 진행 중인 학생이 max_concurrency 보다 적을 때만 읽음
+    pending: set[asyncio.Future] = set()
+    try:
+        position = 0
+        async for submission in iterate():
+            if len(pending) >= max_concurrency:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for finished in done:
+                    yield finished.result()
+            index = submission.get("index", position)
+            pending.add(asyncio.ensure_future(grade(index, submission, position == 0)))
+            position += 1
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for finished in done:
+                yield finished.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
 # async def generate_rubric(teacher_input: str, thread_id: str):
 #     return await response(teacher_input, thread_id)
@@ -1,18 +1,59 @@
+from dataclasses import dataclass
+from typing import Optional, Union
+
 from pydantic import BaseModel, Field
-from typing import Annotated, Any
 
 
-class State(BaseModel):
+class InputParser(BaseModel):
+    grade_level: int = Field(..., description="School grade level")
+    topic: str = Field(
+        ...,
+        description="Detailed tasks (e.g., essay writing, graph interpretation, etc.)",
+    )
+    objective: str = Field(
+        ...,
+        description="Assessment purpose (e.g., essay writing, graph interpretation, etc.)",
+    )
+    name: Optional[str] = Field(..., description="Student name")
+    student_submission: Optional[str] = Field(..., description="Submitted assignment")
+
+
+@dataclass(slots=True)
+class State:
     """
     Graph State Schema
 
+    LangGraph builds a ``State`` from the channel values for every node it
+    runs. A slotted dataclass makes that a plain attribute assignment: the
+    markdown sections are not validated or copied on each transition.
     """
-    teacher_input: Annotated[Any, Field(description="The input from the teacher")] = ""
-    rubric: Annotated[str, Field(description="The rubric for the assignment")] = ""
-    evaluation: Annotated[
-        str, Field(description="The evaluation of the assignment")
-    ] = ""
-    feedback: Annotated[str, Field(description="The feedback for the assignment")] = ""
-    report: Annotated[
-        str, Field(description="The final report including the evaluation and feedback")
-    ] = ""
+    # The input as sent by the teacher: "key: value" lines, free text or a JSON object
+    raw_input: Union[str, dict] = ""
+    # The teacher input parsed by InputParserNode (batch grading sets it directly)
+    teacher_input: Optional[InputParser] = None
+    # The rubric for the assignment
+    rubric: str = ""
+    # The evaluation of the assignment
+    evaluation: str = ""
+    # The feedback for the assignment
+    feedback: str = ""
+    # The teacher-facing report (fast pipeline only)
+    teacher_report: str = ""
+    # The final report including the evaluation and feedback
+    report: str = ""
+    # Whether the teacher input was parsed without the LLM
+    structured_input: bool = False
+    # Reuse cached rubrics and stage outputs for identical inputs
+    use_cache: bool = True
+    # Generate the rubric and evaluation as data and pass a compact form to later stages
+    compact: bool = False
+    # Put the rubric in a stable prompt prefix so the provider can cache it
+    prefix_cache: bool = False
+    # Route from the parsed input and start the evaluation once the criteria table is streamed
+    speculative: bool = False
+    # The rubric as Rubric fields (compact mode)
+    rubric_data: Optional[dict] = None
+    # The evaluation as Evaluation fields (compact mode)
+    evaluation_data: Optional[dict] = None
+    # The library entry (id, similarity, topic, objective) whose rubric was reused
+    similar_rubric: Optional[dict] = None
@@ -0,0 +1,9 @@
+"""Offline benchmarks for the rubric agent backend.
+
+Run from the repository root, e.g. ``python -m benchmarks.bench_concurrency``.
+"""
+
+import os
+
+# 노드별 구조화 로그가 벤치마크 결과를 가리지 않도록 경고 이상만 출력
+os.environ.setdefault("RUBRIC_LOG_LEVEL", "WARNING")
@@ -0,0 +1,88 @@
+"""Memory and throughput of bulk roster grading as the roster grows.
+
+Writes rosters of increasing size to a temporary directory and grades each
+one with :func:`backend.src.bulk.run_bulk` against the fake LLM. Rows are
+read as students are scheduled, results are appended to the output file as
+they finish and each student's checkpoint thread is dropped once written,
+so peak memory should not grow with the number of rows. Sizes run in
+increasing order in one process, so the max RSS column only rises if a
+larger roster needs more memory than every smaller one did.
+
+Usage::
+
+    python -m benchmarks.bench_bulk --rows 250 1000 4000
+"""
+
+import argparse
+import asyncio
+import csv
+import os
+import resource
+import tempfile
+import time
+
+from benchmarks import fake_llm
+
+ASSIGNMENT = "topic: 지구 문제에 우리는 어떻게 대처하는가?(환경문제)\nobjective: 환경 논제 글쓰기\ngrade_level: 6"
+
+
+def write_roster(path: str, rows: int) -> None:
+    with open(path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.writer(f)
+        writer.writerow(["이름", "학생 답안"])
+        for i in range(rows):
+            writer.writerow(
+                [
+                    f"학생{i}",
+                    f"{i}번 학생의 글: "
+                    + "환경을 지키기 위해 분리수거와 에너지 절약을 실천해야 합니다. "
+                    * 5,
+                ]
+            )
+
+
+def max_rss_mb() -> float:
+    # 리눅스에서 ru_maxrss 단위는 KB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def main(args):
+    fake_llm.install(latency=args.latency, seed=args.seed)
+    from backend.src.bulk import run_bulk
+    from backend.src.rubric import get_checkpointer
+
+    print(
+        f"max_concurrency {args.max_concurrency}, LLM latency {args.latency * 1000:.0f} ms"
+    )
+    print(
+        f"\n{'rows':>6} {'wall s':>7} {'rows/s':>7} {'max RSS MB':>11}"
+        f" {'checkpoint threads':>19}"
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        for rows in args.rows:
+            roster = os.path.join(directory, f"roster-{rows}.csv")
+            output = os.path.join(directory, f"results-{rows}.csv")
+            write_roster(roster, rows)
+            start = time.perf_counter()
+            summary = await run_bulk(
+                roster,
+                output,
+                ASSIGNMENT,
+                max_concurrency=args.max_concurrency,
+                use_cache=False,
+            )
+            elapsed = time.perf_counter() - start
+            assert summary["graded"] == rows, summary
+            print(
+                f"{rows:>6} {elapsed:>7.1f} {rows / elapsed:>7.0f} {max_rss_mb():>11.0f}"
+                f" {get_checkpointer().stats()['threads']:>19}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[250, 1000, 4000])
+    parser.add_argument("--max-concurrency", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,96 @@
+"""Prompt tokens and latency per stage with and without compact mode.
+
+In the default mode the evaluation, feedback and report prompts each include
+the full markdown rubric (and the later ones the full evaluation). Compact
+mode generates the rubric and evaluation as data, renders the markdown
+locally and gives later stages one line per criterion instead. The fake LLM
+answers with a realistically sized rubric and charges prompt processing time
+(``--prefill-tokens-per-second``), so shorter prompts also answer sooner.
+
+Usage::
+
+    python -m benchmarks.bench_compact --requests 20
+"""
+
+import argparse
+import asyncio
+import statistics
+
+from benchmarks import fake_llm
+from benchmarks.bench_e2e import NodeTimer, _timer_var
+
+MODES = {"markdown": False, "compact": True}
+
+
+async def run_mode(response, compact: bool, args) -> NodeTimer:
+    timer = NodeTimer()
+    token = _timer_var.set(timer)
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one(i: int):
+        async with semaphore:
+            await response(
+                fake_llm.SAMPLE_TEACHER_INPUT,
+                f"bench-compact-{compact}-{i}",
+                use_cache=False,
+                compact=compact,
+            )
+
+    try:
+        await asyncio.gather(*(one(i) for i in range(args.requests)))
+    finally:
+        _timer_var.reset(token)
+    return timer
+
+
+async def main(args):
+    fake_llm.install(
+        latency=args.latency,
+        response=fake_llm.DETAILED_MARKDOWN,
+        tokens_per_second=args.tokens_per_second,
+        prefill_tokens_per_second=args.prefill_tokens_per_second,
+        seed=args.seed,
+    )
+    from backend.src.rubric import response
+
+    print(
+        f"LLM latency: {args.latency * 1000:.0f} ms, {args.tokens_per_second:.0f}"
+        f" tokens/s, prefill {args.prefill_tokens_per_second:.0f} tokens/s,"
+        f" {args.requests} requests per mode"
+    )
+    results = {}
+    for mode, compact in MODES.items():
+        timer = await run_mode(response, compact, args)
+        results[mode] = timer
+        print(f"\n[{mode}]")
+        print(f"  {'node':<22} {'prompt tok':>11} {'output tok':>11} {'wall ms':>9}")
+        for node, walls in timer.node_wall.items():
+            prompt, completion, _ = timer.node_tokens[node]
+            print(
+                f"  {node:<22} {prompt / len(walls):>11.0f}"
+                f" {completion / len(walls):>11.0f}"
+                f" {statistics.mean(walls) * 1000:>9.1f}"
+            )
+
+    print("\ncompact vs markdown")
+    for node in ("evaluation_generator", "feedback_generator", "report_generator"):
+        before, after = results["markdown"], results["compact"]
+        tokens_before = before.node_tokens[node][0] / len(before.node_wall[node])
+        tokens_after = after.node_tokens[node][0] / len(after.node_wall[node])
+        wall_before = statistics.mean(before.node_wall[node])
+        wall_after = statistics.mean(after.node_wall[node])
+        print(
+            f"  {node:<22} prompt tokens {1 - tokens_after / tokens_before:>6.0%}"
+            f" fewer, latency {1 - wall_after / wall_before:>6.0%} lower"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--tokens-per-second", type=float, default=500)
+    parser.add_argument("--prefill-tokens-per-second", type=float, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,56 @@
+"""Throughput of ``rubric.response`` as the number of in-flight requests grows.
+
+Every LLM call is replaced by a fake model with a fixed latency, so the
+numbers measure how well the graph overlaps I/O-bound requests on one event
+loop. With a non-blocking graph, requests per second should grow roughly
+linearly with concurrency until the event loop itself saturates.
+
+Usage::
+
+    python -m benchmarks.bench_concurrency --latency 0.05 --requests 64
+"""
+
+import argparse
+import asyncio
+import time
+
+from benchmarks import fake_llm
+
+
+async def run_level(response, concurrency: int, total: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with semaphore:
+            await response(
+                fake_llm.SAMPLE_TEACHER_INPUT,
+                f"bench-{concurrency}-{i}",
+                use_cache=False,
+            )
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    return total / (time.perf_counter() - start)
+
+
+async def main(args):
+    fake_llm.install(latency=args.latency)
+    from backend.src.rubric import response
+
+    print(
+        f"LLM latency: {args.latency * 1000:.0f} ms, requests per level: {args.requests}"
+    )
+    print(f"{'in-flight':>10} {'req/s':>10} {'speedup':>10}")
+    baseline = None
+    for concurrency in args.levels:
+        rps = await run_level(response, concurrency, args.requests)
+        baseline = baseline or rps
+        print(f"{concurrency:>10} {rps:>10.1f} {rps / baseline:>9.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    asyncio.run(main(parser.parse_args()))
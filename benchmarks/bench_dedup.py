@@ -0,0 +1,86 @@
+"""LLM work for resubmitted and double-submitted evaluations, with and without memoization.
+
+Simulates ``--students`` students whose teacher submits every evaluation
+``--copies`` times at once (double clicks, retries after a network error),
+then resubmits the whole class after a page refresh. With ``use_cache`` the
+evaluation, feedback and report outputs are memoized and identical
+concurrent requests share one generation, so only the first copy of each
+submission reaches the LLM.
+
+Usage::
+
+    python -m benchmarks.bench_dedup --students 10 --copies 3
+"""
+
+import argparse
+import asyncio
+import time
+
+from benchmarks import fake_llm
+from benchmarks.bench_e2e import NodeTimer, _timer_var
+
+
+def teacher_input(student: int) -> str:
+    return (
+        "topic: 지구 문제에 우리는 어떻게 대처하는가?(환경문제)\n"
+        "objective: 환경 논제 글쓰기\n"
+        "grade_level: 초등학교 6학년\n"
+        f"name: 학생{student}\n"
+        f"student_submission: {student}번 학생의 글: "
+        + "환경을 지키기 위해 분리수거와 에너지 절약을 실천해야 합니다. " * 3
+    )
+
+
+async def submit_class(response, use_cache: bool, args, round_: str) -> float:
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(
+            response(
+                teacher_input(student),
+                f"bench-dedup-{use_cache}-{round_}-{student}-{copy}",
+                use_cache=use_cache,
+            )
+            for student in range(args.students)
+            for copy in range(args.copies)
+        )
+    )
+    return time.perf_counter() - start
+
+
+async def main(args):
+    fake_llm.install(
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        seed=args.seed,
+    )
+    from backend.src.cache import rubric_cache, stage_cache
+    from backend.src.rubric import response
+
+    requests = args.students * args.copies
+    print(
+        f"{args.students} students x {args.copies} concurrent copies, then the"
+        f" class resubmitted ({requests} requests per round)"
+    )
+    print(f"\n{'use_cache':<10} {'round':<12} {'wall s':>7} {'LLM tokens':>11}")
+    for use_cache in (False, True):
+        rubric_cache.clear()
+        stage_cache.clear()
+        for round_ in ("first", "resubmitted"):
+            timer = NodeTimer()
+            token = _timer_var.set(timer)
+            try:
+                elapsed = await submit_class(response, use_cache, args, round_)
+            finally:
+                _timer_var.reset(token)
+            tokens = sum(p + c for p, c, _ in timer.node_tokens.values())
+            print(f"{str(use_cache):<10} {round_:<12} {elapsed:>7.2f} {tokens:>11}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=10)
+    parser.add_argument("--copies", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--tokens-per-second", type=float, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(main(parser.parse_args()))
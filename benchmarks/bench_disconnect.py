@@ -0,0 +1,133 @@
+"""Admission slots left held by streaming requests whose client went away.
+
+Calls the FastAPI app at the ASGI level (no sockets) for each streaming
+endpoint: the client sends its request, then disconnects while the response
+headers are still being sent, before the first chunk of the body. Starlette
+then cancels the body without ever starting it, so anything released only
+in the body's ``finally`` stays held. Reports ``in_flight`` from the
+admission controller after each endpoint; the exit status is 1 if any slot
+was not given back.
+
+Usage::
+
+    python -m benchmarks.bench_disconnect --requests 20
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from urllib.parse import urlencode
+
+from benchmarks import fake_llm
+
+
+def endpoints() -> dict[str, tuple[str, str, bytes, bytes]]:
+    """name -> (path, content type, query string, body)."""
+    teacher_input = fake_llm.SAMPLE_TEACHER_INPUT
+    return {
+        "stream": (
+            "/api/rubric/stream",
+            "application/json",
+            b"",
+            json.dumps({"teacher_input": teacher_input, "thread_id": "{i}"}).encode(),
+        ),
+        "batch": (
+            "/api/rubric/batch",
+            "application/json",
+            b"",
+            json.dumps(
+                {
+                    "teacher_input": teacher_input,
+                    "thread_id": "{i}",
+                    "submissions": [{"student_submission": "hello"}],
+                }
+            ).encode(),
+        ),
+        "bulk": (
+            "/api/rubric/bulk",
+            "text/csv",
+            urlencode({"thread_id": "{i}", "teacher_input": teacher_input}).encode(),
+            b"name,student_submission\na,hello\nb,world\n",
+        ),
+    }
+
+
+async def disconnect_early(app, path, content_type, query, body) -> list[str]:
+    """One request whose client disconnects before the body starts."""
+    messages = [
+        {"type": "http.request", "body": body, "more_body": False},
+        {"type": "http.disconnect"},
+    ]
+    sent = []
+
+    async def receive():
+        if len(messages) == 1:
+            # 본문을 다 보낸 직후, 응답 헤더가 전송되는 동안 연결을 끊음
+            await asyncio.sleep(0.01)
+        if messages:
+            return messages.pop(0)
+        await asyncio.Event().wait()
+
+    async def send(message):
+        sent.append(message["type"])
+        await asyncio.sleep(0.05)
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query,
+        "root_path": "",
+        "headers": [(b"content-type", content_type.encode())],
+        "client": ("bench", 1),
+        "server": ("bench", 80),
+    }
+    await app(scope, receive, send)
+    return sent
+
+
+async def main(args) -> int:
+    fake_llm.install(latency=args.latency, seed=args.seed)
+    from backend.src.admission import admission
+    from backend.src.main import app
+
+    print(
+        f"{args.requests} requests per endpoint, client disconnects before"
+        f" the first chunk; LLM latency {args.latency * 1000:.0f} ms"
+    )
+    print(f"\n{'endpoint':<8} {'started':>8} {'ms/request':>11} {'in_flight':>10}")
+    failed = False
+    for name, (path, content_type, query, body) in endpoints().items():
+        started = 0
+        start = time.perf_counter()
+        for i in range(args.requests):
+            thread_id = f"bench-disconnect-{name}-{i}".encode()
+            sent = await disconnect_early(
+                app,
+                path,
+                content_type,
+                query.replace(b"%7Bi%7D", thread_id),
+                body.replace(b"{i}", thread_id),
+            )
+            started += "http.response.start" in sent
+        elapsed = (time.perf_counter() - start) / args.requests * 1000
+        in_flight = admission.stats()["in_flight"]
+        print(f"{name:<8} {started:>8} {elapsed:>11.1f} {in_flight:>10}")
+        if in_flight:
+            print(f"FAIL: {name} left {in_flight} admission slots held")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    sys.exit(asyncio.run(main(parser.parse_args())))
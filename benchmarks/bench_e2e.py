@@ -0,0 +1,259 @@
+"""End-to-end latency percentiles and per-node overhead with a fake LLM.
+
+Drives the full LangGraph pipeline either directly through
+``rubric.response`` or through the FastAPI app in-process (``httpx`` with an
+ASGI transport, no sockets), with a fake chat model whose time to first token
+and token rate follow log-normal distributions. Reports p50/p95/p99 latency
+and throughput per target, plus a per-node breakdown: wall time, time spent
+inside LLM calls and the difference, which is our own overhead. "outside
+nodes" is the part of each request not covered by any node (graph scheduling,
+checkpointing and, for ``http``, request parsing and serialization).
+
+Everything runs offline, so use ``--max-p95-ms`` / ``--max-overhead-ms`` in
+CI to fail on regressions.
+
+Usage::
+
+    python -m benchmarks.bench_e2e --requests 200 --concurrency 16
+    python -m benchmarks.bench_e2e --latency 0.3 --latency-sigma 0.5 \\
+        --tokens-per-second 80 --targets http --pipeline fast
+"""
+
+import argparse
+import asyncio
+import contextlib
+import statistics
+import sys
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Any, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.tracers.context import register_configure_hook
+
+from benchmarks import fake_llm
+
+TARGETS = ("direct", "http")
+
+
+class NodeTimer(BaseCallbackHandler):
+    """Collects per-node wall time, LLM time and token usage."""
+
+    run_inline = True
+
+    def __init__(self):
+        self.node_wall = defaultdict(list)
+        self.node_llm = defaultdict(float)
+        # 노드별 [프롬프트, 출력, 캐시된 프롬프트] 토큰
+        self.node_tokens = defaultdict(lambda: [0, 0, 0])
+        self.intervals = defaultdict(list)
+        self._nodes: dict[UUID, tuple[str, str, float]] = {}
+        self._llms: dict[UUID, tuple[str, float]] = {}
+
+    def on_chain_start(
+        self, serialized, inputs, *, run_id, metadata=None, name=None, **kwargs
+    ):
+        metadata = metadata or {}
+        node = metadata.get("langgraph_node")
+        if node is not None and node == name:
+            thread_id = metadata.get("thread_id", "")
+            self._nodes[run_id] = (node, thread_id, time.perf_counter())
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        started = self._nodes.pop(run_id, None)
+        if started is not None:
+            node, thread_id, start = started
+            end = time.perf_counter()
+            self.node_wall[node].append(end - start)
+            self.intervals[thread_id].append((start, end))
+
+    on_chain_error = on_chain_end
+
+    def on_chat_model_start(
+        self, serialized, messages, *, run_id, metadata=None, **kwargs
+    ):
+        node = (metadata or {}).get("langgraph_node")
+        if node is not None:
+            self._llms[run_id] = (node, time.perf_counter())
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        started = self._llms.pop(run_id, None)
+        if started is not None:
+            node, start = started
+            self.node_llm[node] += time.perf_counter() - start
+            for generations in getattr(response, "generations", []):
+                for generation in generations:
+                    usage = getattr(generation.message, "usage_metadata", None) or {}
+                    self.node_tokens[node][0] += usage.get("input_tokens", 0)
+                    self.node_tokens[node][1] += usage.get("output_tokens", 0)
+                    details = usage.get("input_token_details") or {}
+                    self.node_tokens[node][2] += details.get("cache_read", 0)
+
+    on_llm_error = on_llm_end
+
+    def covered(self, thread_id: str) -> float:
+        """Seconds of the request spent inside at least one node."""
+        total, last_end = 0.0, float("-inf")
+        for start, end in sorted(self.intervals[thread_id]):
+            if end > last_end:
+                total += end - max(start, last_end)
+                last_end = end
+        return total
+
+
+_timer_var: ContextVar[Optional[NodeTimer]] = ContextVar("bench_timer", default=None)
+register_configure_hook(_timer_var, inheritable=True)
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def drive(call, target: str, total: int, concurrency: int) -> tuple:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: dict[str, float] = {}
+
+    async def one(i: int):
+        thread_id = f"bench-{target}-{i}"
+        async with semaphore:
+            start = time.perf_counter()
+            await call(thread_id)
+            latencies[thread_id] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    return latencies, time.perf_counter() - start
+
+
+def direct_caller(args):
+    from backend.src.rubric import response
+
+    async def call(thread_id: str):
+        await response(
+            fake_llm.SAMPLE_TEACHER_INPUT,
+            thread_id,
+            use_cache=False,
+            pipeline=args.pipeline,
+        )
+
+    return call, contextlib.nullcontext()
+
+
+def http_caller(args):
+    import httpx
+
+    from backend.src.main import app
+
+    client = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None
+    )
+
+    async def call(thread_id: str):
+        result = await client.post(
+            "/api/rubric",
+            json={
+                "teacher_input": fake_llm.SAMPLE_TEACHER_INPUT,
+                "thread_id": thread_id,
+                "use_cache": False,
+                "pipeline": args.pipeline,
+            },
+        )
+        result.raise_for_status()
+
+    return call, client
+
+
+async def run_target(args, target: str) -> dict[str, Any]:
+    call, client = (direct_caller if target == "direct" else http_caller)(args)
+    async with client:
+        # 워밍업: 그래프 구성과 체크포인터 초기화를 측정에서 제외
+        await drive(call, f"{target}-warmup", min(args.concurrency, 4), 4)
+        timer = NodeTimer()
+        token = _timer_var.set(timer)
+        try:
+            latencies, elapsed = await drive(
+                call, target, args.requests, args.concurrency
+            )
+        finally:
+            _timer_var.reset(token)
+    outside = [
+        latency - timer.covered(thread_id) for thread_id, latency in latencies.items()
+    ]
+    return {
+        "latencies": list(latencies.values()),
+        "elapsed": elapsed,
+        "outside": outside,
+        "timer": timer,
+    }
+
+
+def report(target: str, result: dict[str, Any], requests: int) -> None:
+    latencies = [latency * 1000 for latency in result["latencies"]]
+    print(f"\n[{target}] {requests} requests, {requests / result['elapsed']:.1f} req/s")
+    print(
+        f"  p50 {percentile(latencies, 50):.1f} ms  p95 {percentile(latencies, 95):.1f}"
+        f" ms  p99 {percentile(latencies, 99):.1f} ms  mean"
+        f" {statistics.mean(latencies):.1f} ms"
+    )
+    timer = result["timer"]
+    print(f"  {'node':<26} {'calls':>6} {'wall ms':>9} {'llm ms':>9} {'own ms':>9}")
+    for node, walls in timer.node_wall.items():
+        wall = statistics.mean(walls) * 1000
+        llm = timer.node_llm[node] / len(walls) * 1000
+        print(
+            f"  {node:<26} {len(walls):>6} {wall:>9.2f} {llm:>9.2f} {wall - llm:>9.2f}"
+        )
+    outside = statistics.mean(result["outside"]) * 1000
+    print(f"  {'outside nodes':<26} {requests:>6} {outside:>9.2f}")
+
+
+async def main(args) -> int:
+    fake_llm.install(
+        latency=args.latency,
+        latency_sigma=args.latency_sigma,
+        tokens_per_second=args.tokens_per_second,
+        tokens_per_second_sigma=args.tokens_per_second_sigma,
+        seed=args.seed,
+    )
+    print(
+        f"LLM latency: {args.latency * 1000:.0f} ms (sigma {args.latency_sigma}),"
+        f" {args.tokens_per_second or 'instant'} tokens/s,"
+        f" pipeline: {args.pipeline}, concurrency: {args.concurrency}"
+    )
+
+    failed = False
+    for target in args.targets:
+        result = await run_target(args, target)
+        report(target, result, args.requests)
+
+        p95 = percentile(result["latencies"], 95) * 1000
+        overhead = statistics.mean(result["outside"]) * 1000
+        if args.max_p95_ms and p95 > args.max_p95_ms:
+            print(f"FAIL: {target} p95 exceeds {args.max_p95_ms} ms")
+            failed = True
+        if args.max_overhead_ms and overhead > args.max_overhead_ms:
+            print(
+                f"FAIL: {target} overhead outside nodes exceeds {args.max_overhead_ms} ms"
+            )
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--pipeline", choices=("linear", "fast"), default="linear")
+    parser.add_argument("--targets", nargs="+", choices=TARGETS, default=TARGETS)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--latency-sigma", type=float, default=0.3)
+    parser.add_argument("--tokens-per-second", type=float, default=0)
+    parser.add_argument("--tokens-per-second-sigma", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-p95-ms", type=float, default=0)
+    parser.add_argument("--max-overhead-ms", type=float, default=0)
+    sys.exit(asyncio.run(main(parser.parse_args())))
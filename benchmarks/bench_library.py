@@ -0,0 +1,232 @@
+"""Lookup latency and recall of the rubric library as it grows.
+
+Fills a :class:`backend.src.library.RubricLibrary` with synthetic
+assignments, all for the same model and grade level so every lookup
+searches one partition of the full size, then measures:
+
+- how long a fresh process takes to load the index from SQLite,
+- lookup latency for reworded copies of stored assignments (which should
+  be found) and for unrelated assignments (which should not),
+- recall, and false matches both for unrelated assignments and for
+  different assignments that share most of their text with a stored one
+  (one subject of the topic swapped, same objective; a match whose topic
+  is the swapped topic word for word is another stored copy of that
+  assignment, not a false match),
+
+and prints the topic and overall similarity of a few hand-written pairs
+to show where ``--threshold`` (by default ``RUBRIC_LIBRARY_THRESHOLD``)
+falls. The exit status is 1 if a hand-written pair is misjudged or a
+different assignment reuses a stored rubric.
+
+Usage::
+
+    python -m benchmarks.bench_library --entries 1000 10000 100000
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from backend.src.library import (
+    LIBRARY_THRESHOLD,
+    RubricLibrary,
+    assignment_similarity,
+    kept_words,
+)
+from backend.src.state import InputParser
+
+MODEL = "openai:gpt-4.1-mini:structured"
+GRADE_LEVEL = 6
+
+# (원래 과제, 비교할 과제, 같은 과제인지) - 주제와 목적을 한 줄씩
+EXAMPLES = [
+    (
+        "지구 문제에 우리는 어떻게 대처하는가?(환경문제)\n환경 논제 글쓰기",
+        "지구 문제에 우리는 어떻게 대처하는가?(환경문제)\n환경 논제에 대한 글쓰기",
+        True,
+    ),
+    (
+        "지구 문제에 우리는 어떻게 대처하는가?(환경문제)\n환경 논제 글쓰기",
+        "지구 문제에 우리는 어떻게 대처하는가? (환경 문제)\n환경 주제 논설문 쓰기",
+        True,
+    ),
+    (
+        "독서 감상문 쓰기\n작품 이해와 표현",
+        "독서 감상문 쓰기\n작품 이해와 표현력",
+        True,
+    ),
+    (
+        "분수의 덧셈과 뺄셈\n개념 이해 평가",
+        "분수의 곱셈과 나눗셈\n개념 이해 평가",
+        False,
+    ),
+    # 목적이 길고 같으면 주제 한 단어 차이가 전체 유사도에 묻힘
+    (
+        "분수의 덧셈과 뺄셈 문제 해결하기\n분모가 다른 분수의 계산 원리를 이해하고 실생활 문제에 적용하여 풀이 과정을 설명할 수 있는지 평가",
+        "분수의 곱셈과 나눗셈 문제 해결하기\n분모가 다른 분수의 계산 원리를 이해하고 실생활 문제에 적용하여 풀이 과정을 설명할 수 있는지 평가",
+        False,
+    ),
+    (
+        "분수의 덧셈과 뺄셈 문제 해결하기\n분모가 다른 분수의 계산 원리를 이해하고 실생활 문제에 적용하여 풀이 과정을 설명할 수 있는지 평가",
+        "소수의 덧셈과 뺄셈 문제 해결하기\n분모가 다른 분수의 계산 원리를 이해하고 실생활 문제에 적용하여 풀이 과정을 설명할 수 있는지 평가",
+        False,
+    ),
+    (
+        "지구 문제에 우리는 어떻게 대처하는가?(환경문제)\n환경 논제 글쓰기",
+        "그래프 해석하기\n자료 분석 능력 평가",
+        False,
+    ),
+]
+
+SUBJECTS = "환경 문제 분수 소수 그래프 자료 독서 감상문 논설문 설명문 역사 인물 과학 실험 관찰 기록 지역 사회 문화 예술 음악 미술 건강 안전 경제 시장 기후 에너지 생태계 물 순환 날씨 지도 인권 민주주의 선거 통계 확률 도형 넓이 부피 속력 비율 시 소설 연극 토론 발표 면담 보고서 광고 뉴스 매체".split()
+TASKS = "글쓰기 해석하기 분석하기 비교하기 요약하기 설명하기 주장하기 조사하기 발표하기 토론하기 탐구하기 정리하기 감상하기 평가하기 계산하기 설계하기".split()
+GOALS = "논리적 사고 표현력 이해도 문제 해결 의사소통 비판적 사고 창의성 자료 활용 개념 이해 근거 제시 구조화 능력 협력 태도 탐구 능력".split()
+
+
+def synthetic_assignment(rng: random.Random) -> InputParser:
+    topic = " ".join(rng.sample(SUBJECTS, rng.randint(2, 4)))
+    topic = f"{topic}에 대해 {rng.choice(TASKS)} ({rng.randint(1, 99)}차시)"
+    objective = " ".join(rng.sample(GOALS, rng.randint(2, 4))) + " 평가"
+    return assignment(topic, objective)
+
+
+def assignment(topic: str, objective: str) -> InputParser:
+    return InputParser(
+        grade_level=GRADE_LEVEL,
+        topic=topic,
+        objective=objective,
+        name=None,
+        student_submission=None,
+    )
+
+
+def different(teacher_input: InputParser, rng: random.Random) -> InputParser:
+    # 다른 과제: 주제의 과목 하나만 바꾸고 목적은 그대로
+    words = teacher_input.topic.split()
+    subjects = [i for i, word in enumerate(words) if word in SUBJECTS]
+    index = rng.choice(subjects) if subjects else 0
+    words[index] = rng.choice([s for s in SUBJECTS if s not in words])
+    return teacher_input.model_copy(update={"topic": " ".join(words)})
+
+
+def reworded(teacher_input: InputParser, rng: random.Random) -> InputParser:
+    # 선생님이 같은 과제를 다시 입력한 경우: 주제는 띄어쓰기와 문장부호가 다르고
+    # 목적에는 말이 하나 더 들어감
+    words = teacher_input.topic.replace(" (", " - ").replace(")", "").split()
+    index = rng.randrange(len(words) - 1)
+    words[index : index + 2] = [words[index] + words[index + 1]]
+    goals = teacher_input.objective.split()
+    goals.insert(rng.randint(1, len(goals) - 1), rng.choice(["및", "과", "에 대한"]))
+    return teacher_input.model_copy(
+        update={"topic": " ".join(words), "objective": " ".join(goals)}
+    )
+
+
+def similarities(a: str, b: str) -> tuple[float, float]:
+    """(topic, overall) similarity of two "topic\\nobjective" texts."""
+    (topic, objective), (other_topic, other_objective) = a.split("\n"), b.split("\n")
+    return (
+        kept_words(topic, other_topic),
+        assignment_similarity(topic, objective, other_topic, other_objective),
+    )
+
+
+def percentile_ms(samples: list[float], q: float) -> float:
+    return float(np.percentile(samples, q)) * 1000
+
+
+def run(entries: int, queries: int, seed: int, directory: str, threshold: float) -> int:
+    rng = random.Random(seed)
+    path = os.path.join(directory, f"library-{entries}.sqlite")
+    library = RubricLibrary(path)
+    stored = []
+    start = time.perf_counter()
+    for i in range(entries):
+        teacher_input = synthetic_assignment(rng)
+        library.add(teacher_input, MODEL, f"rubric {i}")
+        stored.append(teacher_input)
+    insert_rate = entries / (time.perf_counter() - start)
+
+    # 새 프로세스처럼 빈 인덱스에서 시작: 첫 조회가 SQLite 에서 전부 읽어 옴
+    fresh = RubricLibrary(path)
+    start = time.perf_counter()
+    fresh.find(stored[0], MODEL, threshold)
+    load_s = time.perf_counter() - start
+
+    def lookups(inputs: list[InputParser]) -> tuple[list[float], int]:
+        latencies, found = [], 0
+        for teacher_input in inputs:
+            start = time.perf_counter()
+            match = fresh.find(teacher_input, MODEL, threshold)
+            latencies.append(time.perf_counter() - start)
+            found += match is not None
+        return latencies, found
+
+    near, recalled = lookups([reworded(t, rng) for t in rng.sample(stored, queries)])
+    # 저장된 적 없는 과목 조합 - 다른 과제이므로 찾으면 안 됨
+    other = [
+        assignment(f"{rng.choice(TASKS)} 연습 {i}회", "수행 과제 점검")
+        for i in range(queries)
+    ]
+    far, false_matches = lookups(other)
+    wrong_reuses = 0
+    for teacher_input in rng.sample(stored, queries):
+        teacher_input = different(teacher_input, rng)
+        match = fresh.find(teacher_input, MODEL, threshold)
+        # 바꾼 주제가 우연히 다른 저장 항목의 주제와 같으면 그 항목은 같은 과제
+        wrong_reuses += (
+            match is not None and kept_words(match["topic"], teacher_input.topic) < 1
+        )
+    print(
+        f"{entries:>7} {insert_rate:>9.0f} {load_s:>7.2f}"
+        f" {percentile_ms(near, 50):>7.2f} {percentile_ms(near, 99):>7.2f}"
+        f" {percentile_ms(far, 50):>7.2f} {percentile_ms(far, 99):>7.2f}"
+        f" {recalled / queries:>7.1%} {false_matches:>6} {wrong_reuses:>6}"
+    )
+    return false_matches + wrong_reuses
+
+
+def main(args) -> int:
+    print(f"Topic / overall similarity (threshold {args.threshold})")
+    wrong, missed = 0, 0
+    for original, variant, same in EXAMPLES:
+        topic, overall = similarities(original, variant)
+        reused = overall >= args.threshold
+        wrong += reused and not same
+        missed += same and not reused
+        label = ("same" if same else "different") + (
+            ", reused" if reused else ", not reused"
+        )
+        print(
+            f"  {topic:.2f} / {overall:.2f}  {label:<21}"
+            f" {original.replace(chr(10), ' / ')[:40]}"
+            f"  ->  {variant.replace(chr(10), ' / ')[:40]}"
+        )
+    # 놓친 재사용은 루브릭을 새로 만들 뿐이지만, 잘못된 재사용은 다른 과제의 루브릭을 줌
+    print(f"  {wrong} wrong reuses, {missed} missed rewordings")
+    print(
+        f"\n{'entries':>7} {'inserts/s':>9} {'load s':>7} {'near p50':>7}"
+        f" {'p99':>7} {'far p50':>7} {'p99':>7} {'recall':>7} {'false':>6}"
+        f" {'differ':>6}  (latency in ms; false/differ = wrong matches)"
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        for entries in args.entries:
+            wrong += run(entries, args.queries, args.seed, directory, args.threshold)
+    if wrong or missed:
+        print("FAIL: the threshold reuses a different assignment or misses a rewording")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--threshold", type=float, default=LIBRARY_THRESHOLD or 0.9)
+    parser.add_argument("--seed", type=int, default=0)
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,109 @@
+"""Bytes on the wire and serialization time of ``/api/rubric`` responses.
+
+Generates one result in the default (markdown) mode and one in compact mode
+with the fake LLM, then serializes each response variant the way the API
+does: :func:`backend.src.payload.project` picks the fields and format,
+:func:`~backend.src.payload.encode` writes the JSON and
+:func:`~backend.src.payload.compress` applies gzip (and brotli when the
+package is installed). ``full`` is the response every client got before
+``fields`` existed: the whole state, including the parsed teacher input and
+the student submission echoed back twice (``raw_input`` and
+``teacher_input``).
+
+Usage::
+
+    python -m benchmarks.bench_payload --submission-chars 3000
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from benchmarks import fake_llm
+
+SECTIONS = ["rubric", "evaluation", "feedback", "report"]
+
+# (name, compact run, fields, format)
+VARIANTS = [
+    ("full", False, None, "markdown"),
+    ("sections", False, SECTIONS, "markdown"),
+    ("report only", False, ["report"], "markdown"),
+    ("json full", True, None, "json"),
+    ("json sections", True, SECTIONS, "json"),
+    ("json rubric", True, ["rubric"], "json"),
+]
+
+
+def teacher_input(submission_chars: int, rng: random.Random) -> str:
+    # 실제 학생 글 길이에 맞춰 답안을 늘림. 같은 문장을 반복하면 gzip 이 비현실적으로
+    # 잘 압축하므로 예시 답안/루브릭의 단어를 섞어서 씀
+    head, _, submission = fake_llm.SAMPLE_TEACHER_INPUT.partition(
+        "student_submission: "
+    )
+    words = (submission + " " + fake_llm.DETAILED_MARKDOWN).split()
+    while len(submission) < submission_chars:
+        submission += " " + rng.choice(words)
+    return head + "student_submission: " + submission
+
+
+def timed_ms(fn, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return result, statistics.median(samples)
+
+
+async def main(args):
+    fake_llm.install(latency=0, response=fake_llm.DETAILED_MARKDOWN, seed=args.seed)
+    from backend.src import payload
+    from backend.src.rubric import response
+
+    text = teacher_input(args.submission_chars, random.Random(args.seed))
+    results = {
+        compact: await response(
+            text, f"bench-payload-{compact}", use_cache=False, compact=compact
+        )
+        for compact in (False, True)
+    }
+    codings = ["gzip"] + (["br"] if payload.brotli is not None else [])
+
+    print(
+        f"student submission {args.submission_chars} chars, median of"
+        f" {args.repeat} runs; serialize = project + encode"
+    )
+    header = f"\n{'variant':<14} {'raw B':>7} {'serialize ms':>13}"
+    for coding in codings:
+        header += f" {coding + ' B':>8} {coding + ' ms':>8}"
+    print(header)
+    for name, compact, fields, format in VARIANTS:
+        body, serialize_ms = timed_ms(
+            lambda: payload.encode(
+                {
+                    "status": "success",
+                    "generated_results": payload.project(
+                        results[compact], fields, format
+                    ),
+                }
+            ),
+            args.repeat,
+        )
+        row = f"{name:<14} {len(body):>7} {serialize_ms:>13.3f}"
+        for coding in codings:
+            (compressed, used), compress_ms = timed_ms(
+                lambda: payload.compress(body, coding), args.repeat
+            )
+            size = len(compressed) if used else len(body)
+            row += f" {size:>8} {compress_ms:>8.3f}"
+        print(row)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--submission-chars", type=int, default=1500)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,56 @@
+"""End-to-end latency of the linear graph versus the "fast" pipeline.
+
+The fast pipeline generates the teacher report in parallel with the feedback
+and merges both locally, so with equal per-call latency it should save one
+LLM round-trip per request.
+
+Usage::
+
+    python -m benchmarks.bench_pipelines --latency 0.2 --runs 10
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from benchmarks import fake_llm
+
+
+async def measure(response, pipeline: str, runs: int) -> list[float]:
+    latencies = []
+    for i in range(runs):
+        start = time.perf_counter()
+        await response(
+            fake_llm.SAMPLE_TEACHER_INPUT,
+            f"bench-{pipeline}-{i}",
+            use_cache=False,
+            pipeline=pipeline,
+        )
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def main(args):
+    fake_llm.install(latency=args.latency)
+    from backend.src.rubric import PIPELINES, response
+
+    print(f"LLM latency: {args.latency * 1000:.0f} ms, runs per pipeline: {args.runs}")
+    print(f"{'pipeline':>10} {'mean ms':>10} {'min ms':>10}")
+    results = {}
+    for pipeline in PIPELINES:
+        latencies = await measure(response, pipeline, args.runs)
+        results[pipeline] = statistics.mean(latencies)
+        print(
+            f"{pipeline:>10} {results[pipeline] * 1000:>10.1f}"
+            f" {min(latencies) * 1000:>10.1f}"
+        )
+    saved = results["linear"] - results["fast"]
+    print(f"fast saves {saved * 1000:.1f} ms ({saved / results['linear']:.0%})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--runs", type=int, default=10)
+    asyncio.run(main(parser.parse_args()))
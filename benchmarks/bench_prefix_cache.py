@@ -0,0 +1,100 @@
+"""Provider prompt-cache hits when batch grading with a prefix-stable layout.
+
+Grades one class twice through ``rubric.batch_response``: once with the
+default prompt layout (rubric in the human message next to the student's
+submission) and once with ``prefix_cache`` (instructions and rubric first, in
+a byte-stable system message). The fake LLM simulates OpenAI-style automatic
+prefix caching, so cached prompt tokens skip prefill time and are billed at
+the cached-input price.
+
+OpenAI only caches prompts whose prefix is at least 1024 tokens. The sample
+rubric is shorter than a typical generated one (the system message plus
+rubric comes to roughly 900 tokens here), so the default threshold is scaled
+down to 512; pass ``--min-prefix-tokens 1024`` to see the short-rubric case.
+
+Usage::
+
+    python -m benchmarks.bench_prefix_cache --students 30
+"""
+
+import argparse
+import asyncio
+import time
+
+from benchmarks import fake_llm
+from benchmarks.bench_e2e import NodeTimer, _timer_var
+
+MODEL = "gpt-4.1-mini"
+
+
+async def grade_class(batch_response, prefix_cache: bool, args) -> tuple:
+    fake_llm.clear_prefix_cache()
+    submissions = [
+        {
+            "name": f"학생{i}",
+            "student_submission": f"{i}번 학생의 글: "
+            + "환경을 지키기 위해 분리수거와 에너지 절약을 실천해야 합니다. " * 3,
+        }
+        for i in range(args.students)
+    ]
+    timer = NodeTimer()
+    token = _timer_var.set(timer)
+    start = time.perf_counter()
+    try:
+        async for _ in batch_response(
+            fake_llm.SAMPLE_TEACHER_INPUT,
+            submissions,
+            f"bench-prefix-{prefix_cache}",
+            max_concurrency=args.concurrency,
+            use_cache=False,
+            prefix_cache=prefix_cache,
+        ):
+            pass
+    finally:
+        _timer_var.reset(token)
+    return timer, time.perf_counter() - start
+
+
+async def main(args):
+    fake_llm.install(
+        latency=args.latency,
+        response=fake_llm.DETAILED_MARKDOWN,
+        tokens_per_second=args.tokens_per_second,
+        prefill_tokens_per_second=args.prefill_tokens_per_second,
+        prefix_cache_min_tokens=args.min_prefix_tokens,
+        seed=args.seed,
+    )
+    from backend.src.metrics import cost_usd
+    from backend.src.rubric import batch_response
+
+    print(
+        f"{args.students} students, concurrency {args.concurrency}, prefill"
+        f" {args.prefill_tokens_per_second:.0f} tokens/s, cache threshold"
+        f" {args.min_prefix_tokens} tokens, prices of {MODEL}"
+    )
+    for prefix_cache in (False, True):
+        timer, elapsed = await grade_class(batch_response, prefix_cache, args)
+        print(f"\n[prefix_cache={prefix_cache}] batch {elapsed:.2f} s")
+        print(f"  {'node':<22} {'prompt tok':>11} {'cached':>8} {'wall ms':>9}")
+        total_cost = 0.0
+        for node, (prompt, completion, cached) in timer.node_tokens.items():
+            calls = len(timer.node_wall[node])
+            wall = sum(timer.node_wall[node]) / calls * 1000
+            print(
+                f"  {node:<22} {prompt / calls:>11.0f}"
+                f" {cached / max(prompt, 1):>8.0%} {wall:>9.1f}"
+            )
+            total_cost += cost_usd(MODEL, prompt, completion, cached)
+        print(f"  estimated cost: ${total_cost:.4f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=30)
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--tokens-per-second", type=float, default=500)
+    parser.add_argument("--prefill-tokens-per-second", type=float, default=2000)
+    parser.add_argument("--min-prefix-tokens", type=int, default=512)
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,128 @@
+"""Tail latency of an LLM stage when its provider degrades, with and without routing.
+
+Two local stub providers stand in for OpenAI and Gemini. The rubric chain is
+called ``--requests`` times at ``--concurrency`` in three scenarios:
+
+* ``healthy``: OpenAI only, behaving normally (the baseline).
+* ``degraded``: OpenAI only, with a heavy latency tail and ``--error-rate``
+  of 503s. Errors reach the caller.
+* ``routed``: the same degraded OpenAI first and a healthy Gemini second,
+  through ``RUBRIC_LLM_TARGETS``. The router hedges calls that run past
+  OpenAI's rolling p95 and fails over on 503.
+
+The router needs ``RUBRIC_ROUTER_HEDGE_MIN_SAMPLES`` calls before it trusts
+its p95, so the hedge delay before that is ``--hedge-default-delay``.
+
+Usage::
+
+    python -m benchmarks.bench_routing --requests 400
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from benchmarks import fake_llm
+from benchmarks.bench_e2e import percentile
+
+STAGE = "rubric"
+INPUT = {"topic": "환경 문제", "objective": "논설문 쓰기", "grade_level": 6}
+
+
+def install_providers(args, degraded: bool) -> None:
+    from backend.src import llm
+
+    profiles = {
+        "openai": {
+            "latency": args.latency,
+            "latency_sigma": args.degraded_sigma if degraded else args.sigma,
+            "error_rate": args.error_rate if degraded else 0,
+            "seed": args.seed,
+        },
+        "gemini": {
+            "latency": args.latency,
+            "latency_sigma": args.sigma,
+            "seed": args.seed + 1,
+        },
+    }
+
+    def factory(model_type: str, model_name: str, temperature: float):
+        return fake_llm.FakeChatModel(
+            model=model_name, temperature=temperature, **profiles[model_type]
+        )
+
+    llm.set_llm_factory(factory)
+
+
+async def run(args, targets: str) -> tuple[list[float], int]:
+    from backend.src.chains import create_rubric_chain
+
+    os.environ[f"RUBRIC_LLM_TARGETS_{STAGE.upper()}"] = targets
+    chain = create_rubric_chain()
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies, errors = [], 0
+
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await chain.ainvoke(INPUT)
+            except fake_llm.FakeProviderError:
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one() for _ in range(args.requests)))
+    return latencies, errors
+
+
+async def main(args):
+    os.environ.setdefault(
+        "RUBRIC_ROUTER_HEDGE_DEFAULT_DELAY", str(args.hedge_default_delay)
+    )
+    from backend.src.metrics import LLM_ROUTES
+
+    scenarios = {
+        "healthy": (False, "openai:gpt-4.1-mini"),
+        "degraded": (True, "openai:gpt-4.1-mini"),
+        "routed": (True, "openai:gpt-4.1-mini,gemini:gemini-2.5-flash"),
+    }
+    print(
+        f"{args.requests} requests, concurrency {args.concurrency}, median latency"
+        f" {args.latency * 1000:.0f} ms; degraded OpenAI: sigma"
+        f" {args.degraded_sigma}, {args.error_rate:.0%} 503s"
+    )
+    print(
+        f"\n{'scenario':<10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+        f" {'max ms':>8} {'errors':>7}"
+    )
+    for name, (degraded, targets) in scenarios.items():
+        install_providers(args, degraded)
+        latencies, errors = await run(args, targets)
+        print(
+            f"{name:<10} {statistics.median(latencies) * 1000:>8.0f}"
+            f" {percentile(latencies, 95) * 1000:>8.0f}"
+            f" {percentile(latencies, 99) * 1000:>8.0f}"
+            f" {max(latencies) * 1000:>8.0f} {errors:>7}"
+        )
+
+    print("\nrouted calls by target and outcome")
+    for line in LLM_ROUTES.render():
+        if not line.startswith("#"):
+            print(f"  {line}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--sigma", type=float, default=0.3)
+    parser.add_argument("--degraded-sigma", type=float, default=1.2)
+    parser.add_argument("--error-rate", type=float, default=0.1)
+    parser.add_argument("--hedge-default-delay", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(main(parser.parse_args()))
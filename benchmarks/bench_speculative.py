@@ -0,0 +1,96 @@
+"""End-to-end latency with and without speculative evaluation.
+
+With ``speculative`` the graph routes from the parsed input instead of asking
+the router LLM, and RubricNode starts the evaluation as soon as the criteria
+table of the streamed rubric is complete instead of after the sections that
+follow it. For a free-text teacher input this should take the router call
+and the rubric's tail off the critical path; a structured input is already
+routed locally, so only the tail is saved.
+
+The fake model answers every call with a rubric whose table is followed by a
+sample-answer section, streamed at ``--tokens-per-second``.
+
+Usage::
+
+    python -m benchmarks.bench_speculative --latency 0.3 --runs 3
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from benchmarks import fake_llm
+
+SAMPLE_ANSWERS = """
+### 수준별 예시 답안
+
+**상 (13~15점)**
+> 지구는 우리 모두의 집입니다. 그래서 저는 환경을 지키기 위해 작은 실천부터 시작해야 한다고 생각합니다. 첫째, 장을 볼 때 에코백을 사용하면 비닐 쓰레기를 줄일 수 있습니다. 우리 가족은 한 달 동안 비닐봉지를 한 장도 쓰지 않았습니다. 둘째, 쉬는 시간마다 교실 전등을 끄면 전기를 아낄 수 있습니다. 이렇게 작은 실천이 모이면 지구를 지킬 수 있습니다.
+
+**중 (9~12점)**
+> 환경 문제가 심각합니다. 우리는 쓰레기를 줄여야 합니다. 에코백을 쓰면 좋습니다. 전기도 아껴야 합니다. 모두 함께 노력하면 좋겠습니다.
+
+**하 (8점 이하)**
+> 환경은 중요하다. 쓰레기를 버리지 말자.
+
+### 지도 시 유의점
+- 주장과 근거가 연결되는지 학생 스스로 점검하도록 안내합니다.
+- 실천 방안은 학생이 실제로 할 수 있는 일인지 함께 이야기합니다.
+"""
+
+FREE_TEXT_INPUT = (
+    "초등학교 6학년 환경 논제 글쓰기 과제예요. 이철수 학생이 낸 글입니다: "
+    "요즘 뉴스나 학교에서 환경문제에 대해 많이 배우고 있습니다."
+)
+
+
+async def measure(response, teacher_input, speculative: bool, runs: int) -> list:
+    latencies = []
+    for i in range(runs):
+        start = time.perf_counter()
+        await response(
+            teacher_input,
+            f"bench-speculative-{speculative}-{i}-{hash(teacher_input)}",
+            use_cache=False,
+            speculative=speculative,
+        )
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def main(args):
+    fake_llm.install(
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        response=fake_llm.DETAILED_MARKDOWN + SAMPLE_ANSWERS,
+    )
+    from backend.src.rubric import response
+
+    print(
+        f"LLM latency {args.latency * 1000:.0f} ms,"
+        f" {args.tokens_per_second:.0f} tokens/s, runs {args.runs}"
+    )
+    print(f"{'input':>12} {'speculative':>12} {'mean s':>8} {'min s':>8}")
+    for label, teacher_input in (
+        ("free text", FREE_TEXT_INPUT),
+        ("structured", fake_llm.SAMPLE_TEACHER_INPUT),
+    ):
+        means = {}
+        for speculative in (False, True):
+            latencies = await measure(response, teacher_input, speculative, args.runs)
+            means[speculative] = statistics.mean(latencies)
+            print(
+                f"{label:>12} {str(speculative):>12} {means[speculative]:>8.2f}"
+                f" {min(latencies):>8.2f}"
+            )
+        saved = means[False] - means[True]
+        print(f"{'':>12} {'saved':>12} {saved:>8.2f} ({saved / means[False]:.0%})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--tokens-per-second", type=float, default=300)
+    parser.add_argument("--runs", type=int, default=3)
+    asyncio.run(main(parser.parse_args()))
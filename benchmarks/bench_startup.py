@@ -0,0 +1,126 @@
+"""Cold-start cost of the backend: import time and time to first response.
+
+Each measurement runs in a fresh interpreter so nothing is cached between
+runs. ``python -X importtime`` attributes import cost to the direct imports
+of ``backend.src.main``, and a second process imports the app with the fake
+LLM installed and serves one ``/api/rubric`` request in-process.
+
+Use ``--max-import-ms`` / ``--max-first-response-ms`` in CI to fail on
+regressions.
+
+Usage::
+
+    python -m benchmarks.bench_startup --runs 3
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+FIRST_RESPONSE_SCRIPT = """
+import asyncio, json, time
+start = time.perf_counter()
+from benchmarks import fake_llm
+fake_llm.install(latency=0.0)
+from backend.src.main import app
+imported = time.perf_counter()
+import httpx
+
+async def serve_one():
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        response = await client.post(
+            "/api/rubric",
+            json={"teacher_input": fake_llm.SAMPLE_TEACHER_INPUT, "thread_id": "startup"},
+        )
+        response.raise_for_status()
+
+asyncio.run(serve_one())
+done = time.perf_counter()
+print(json.dumps({"import_ms": (imported - start) * 1000, "first_response_ms": (done - start) * 1000}))
+"""
+
+
+def _env() -> dict:
+    env = dict(os.environ)
+    env.setdefault("OPENAI_API_KEY", "bench")
+    env["RUBRIC_CACHE_PATH"] = ":memory:"
+    return env
+
+
+def import_profile(module: str) -> tuple[float, list[tuple[float, str]]]:
+    """Return ``module``'s cumulative import ms and its heaviest direct imports."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env=_env(),
+        check=True,
+    )
+    total, children, pending = 0.0, [], []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or line.count("|") != 2:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        ms = int(cumulative) / 1000
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        # -X importtime 는 자식 모듈을 부모보다 먼저 출력함
+        if depth == 1:
+            pending.append((ms, name.strip()))
+        elif depth == 0:
+            if name.strip() == module:
+                total, children = ms, pending
+            pending = []
+    return total, sorted(children, reverse=True)
+
+
+def first_response() -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", FIRST_RESPONSE_SCRIPT],
+        capture_output=True,
+        text=True,
+        env=_env(),
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main(args) -> int:
+    import_totals = []
+    for _ in range(args.runs):
+        total, heaviest = import_profile(args.module)
+        import_totals.append(total)
+    import_ms = statistics.median(import_totals)
+    print(f"import {args.module}: {import_ms:.1f} ms (median)")
+    for ms, name in heaviest[: args.top]:
+        print(f"  {ms:>8.1f} ms  {name}")
+
+    runs = [first_response() for _ in range(args.runs)]
+    app_import = statistics.median(run["import_ms"] for run in runs)
+    first = statistics.median(run["first_response_ms"] for run in runs)
+    print(f"app import with fake LLM: {app_import:.1f} ms (median)")
+    print(f"time to first response:   {first:.1f} ms (median)")
+
+    failed = False
+    if args.max_import_ms and import_ms > args.max_import_ms:
+        print(f"FAIL: import time exceeds {args.max_import_ms} ms")
+        failed = True
+    if args.max_first_response_ms and first > args.max_first_response_ms:
+        print(f"FAIL: first response exceeds {args.max_first_response_ms} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="backend.src.main")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--max-import-ms", type=float, default=0)
+    parser.add_argument("--max-first-response-ms", type=float, default=0)
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,153 @@
+"""Graph state overhead per node transition and checkpoint bytes per thread.
+
+The first table runs a graph of no-op nodes that write realistically sized
+markdown sections through ``State`` and through a plain ``TypedDict`` with
+the same keys, so the difference is what the state schema itself costs on
+every transition. ``us/build`` isolates the part the schema controls:
+building the state object a node reads from the channel values. The second runs the real graph against the fake LLM with
+no latency and reports what the checkpointer stores per thread. Last, it
+checks that reading threads that do not exist (``GET /api/rubric/{id}``
+returning 404, the resume check of a new thread) does not make the bounded
+in-memory checkpointer evict real threads; the exit status is 1 if it does.
+
+Usage::
+
+    python -m benchmarks.bench_state --runs 100
+"""
+
+import argparse
+import asyncio
+import dataclasses
+import sys
+import time
+import timeit
+from typing import Any, TypedDict
+
+from benchmarks import fake_llm
+
+SECTIONS = ("rubric", "evaluation", "feedback", "report")
+
+
+def build_graph(schema: type, section_chars: int):
+    from langgraph.checkpoint.memory import InMemorySaver
+    from langgraph.graph import END, START, StateGraph
+
+    workflow = StateGraph(schema)
+    previous = START
+    for section in SECTIONS:
+        text = section[0] * section_chars
+
+        def write(state, text=text, section=section):
+            return {section: text}
+
+        workflow.add_node(section, write)
+        workflow.add_edge(previous, section)
+        previous = section
+    workflow.add_edge(previous, END)
+    return workflow.compile(checkpointer=InMemorySaver())
+
+
+def build_cost(schema: type, args) -> float:
+    """Microseconds to build the state object a node reads from the channels."""
+    values = {section: section[0] * args.section_chars for section in SECTIONS}
+    number = 20000
+    timings = timeit.repeat(
+        lambda: schema(**values), number=number, repeat=args.repeats
+    )
+    return min(timings) / number * 1e6
+
+
+async def transition_overhead(graph, args) -> float:
+    """Microseconds per node transition (best of ``--repeats``)."""
+    best = float("inf")
+    for repeat in range(args.repeats):
+        start = time.perf_counter()
+        for i in range(args.runs):
+            config = {"configurable": {"thread_id": f"{repeat}-{i}"}}
+            await graph.ainvoke({}, config)
+        best = min(best, time.perf_counter() - start)
+    return best / (args.runs * len(SECTIONS)) * 1e6
+
+
+async def checkpoint_bytes(kind: str, args) -> tuple[float, float]:
+    """Mean ms per request and checkpoint payload bytes per thread."""
+    from backend.src.checkpoint import BoundedMemorySaver, SQLiteSaver
+    from backend.src.rubric import build_workflow, make_config
+
+    saver = BoundedMemorySaver() if kind == "memory" else SQLiteSaver(":memory:")
+    graph = build_workflow("linear").compile(checkpointer=saver)
+    inputs = {"raw_input": fake_llm.SAMPLE_TEACHER_INPUT, "use_cache": False}
+    start = time.perf_counter()
+    for i in range(args.threads):
+        await graph.ainvoke(inputs, config=make_config(f"bench-state-{i}"))
+    elapsed = time.perf_counter() - start
+    stats = saver.stats()
+    return elapsed / args.threads * 1000, stats["payload_bytes"] / stats["threads"]
+
+
+async def unknown_reads(args) -> tuple[list[str], int]:
+    """Threads left after ``max_threads + 1`` runs with unknown reads between."""
+    from backend.src.checkpoint import BoundedMemorySaver
+    from backend.src.rubric import build_workflow, make_config, resume_point
+
+    max_threads = 3
+    saver = BoundedMemorySaver(max_threads=max_threads)
+    graph = build_workflow("linear").compile(checkpointer=saver)
+    inputs = {"raw_input": fake_llm.SAMPLE_TEACHER_INPUT, "use_cache": False}
+    for i in range(max_threads + 1):
+        if i == max_threads:
+            for j in range(args.unknown_reads):
+                await graph.aget_state(make_config(f"unknown-{j}"))
+                await resume_point(graph, make_config(f"unknown-{j}"))
+        await graph.ainvoke(inputs, config=make_config(f"real-{i}"))
+    return sorted(saver.storage), saver.evicted
+
+
+async def main(args) -> int:
+    fake_llm.install(latency=0, response=fake_llm.DETAILED_MARKDOWN, seed=args.seed)
+    from backend.src.state import State
+
+    baseline = TypedDict(
+        "PlainState", {field.name: Any for field in dataclasses.fields(State)}
+    )
+
+    print(
+        f"{len(SECTIONS)} no-op nodes writing {args.section_chars} chars each,"
+        f" best of {args.repeats} x {args.runs} runs"
+    )
+    print(f"\n{'schema':<12} {'us/build':>9} {'us/transition':>14}")
+    graphs = {
+        name: build_graph(schema, args.section_chars)
+        for name, schema in (("TypedDict", baseline), ("State", State))
+    }
+    for (name, graph), schema in zip(graphs.items(), (baseline, State)):
+        build = build_cost(schema, args)
+        overhead = await transition_overhead(graph, args)
+        print(f"{name:<12} {build:>9.2f} {overhead:>14.1f}")
+
+    print(f"\nreal graph, fake LLM without latency, {args.threads} threads")
+    print(f"{'checkpointer':<12} {'ms/request':>10} {'checkpoint bytes/thread':>24}")
+    for kind in ("memory", "sqlite"):
+        ms, payload = await checkpoint_bytes(kind, args)
+        print(f"{kind:<12} {ms:>10.1f} {payload:>24.0f}")
+
+    threads, evicted = await unknown_reads(args)
+    print(
+        f"\nmax_threads=3, 4 runs with {args.unknown_reads} unknown reads"
+        f" before the last: kept {threads}, {evicted} evicted"
+    )
+    if threads != ["real-1", "real-2", "real-3"]:
+        print("FAIL: reading unknown threads evicted real threads")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=100)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--section-chars", type=int, default=4000)
+    parser.add_argument("--threads", type=int, default=50)
+    parser.add_argument("--unknown-reads", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,391 @@
+"""Deterministic stand-in for the chat models used by ``backend/src/chains.py``.
+
+The benchmarks never talk to a real provider: :func:`install` registers a
+factory with ``backend.src.llm`` so every chain gets a :class:`FakeChatModel`.
+Each call waits for a sampled time-to-first-token, then "generates" the canned
+output at a sampled token rate, so latency distributions look like a real
+provider's while staying reproducible for a given ``seed``.
+"""
+
+import asyncio
+import math
+import random
+import time
+from typing import Any, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.messages.ai import UsageMetadata
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableLambda
+
+SAMPLE_TEACHER_INPUT = """topic: 지구 문제에 우리는 어떻게 대처하는가?(환경문제)
+objective: 환경 논제 글쓰기
+grade_level: 초등학교 6학년
+name: 이철수
+student_submission: 요즘 뉴스나 학교에서 환경문제에 대해 많이 배우고 있습니다. 우리 가족은 장을 볼 때 에코백을 가져가고, 집에서는 텀블러를 사용합니다."""
+
+CANNED_MARKDOWN = """| 평가 기준 | 상 (3점) | 중 (2점) | 하 (1점) |
+|---|---|---|---|
+| 주장의 명확성 | 주장이 분명하다 | 주장이 다소 모호하다 | 주장이 없다 |
+| 근거의 타당성 | 근거가 구체적이다 | 근거가 일부 부족하다 | 근거가 없다 |
+| 표현의 정확성 | 맞춤법 오류가 거의 없다 | 오류가 일부 있다 | 오류가 많다 |
+"""
+
+
+# 실제 모델이 만드는 분량에 가까운 루브릭 (예시 답안 포함) - 프롬프트 압축 벤치마크용
+DETAILED_MARKDOWN = """## 루브릭: 지구 문제에 우리는 어떻게 대처하는가? (환경 논제 글쓰기, 초등학교 6학년)
+
+| 평가 기준 | 상 (3점) | 중 (2점) | 하 (1점) | 관찰 포인트 | 예시 답안 |
+|---|---|---|---|---|---|
+| **주장의 명확성** | 환경 문제에 대한 자신의 주장이 글의 처음과 끝에 분명하게 드러나고 일관되게 유지된다. | 주장이 드러나지만 글의 중간에 흐려지거나 다른 내용과 섞인다. | 주장이 없거나 무엇을 말하려는지 알기 어렵다. | 첫 문단과 마지막 문단에 주장이 있는가<br>주장이 끝까지 유지되는가 | "우리는 작은 실천부터 시작해 지구를 지켜야 합니다." |
+| **근거의 타당성** | 주장을 뒷받침하는 근거가 두 가지 이상이고, 구체적인 사례나 경험이 함께 제시된다. | 근거가 한 가지이거나 사례 없이 일반적인 내용만 제시된다. | 근거가 없거나 주장과 관련이 없다. | 근거의 개수와 구체성<br>경험이나 사례가 포함되어 있는가 | "우리 가족은 장을 볼 때 에코백을 가져가 비닐 쓰레기를 줄였습니다." |
+| **실천 방안의 구체성** | 자신과 주변 사람이 실제로 할 수 있는 실천 방안을 구체적으로 두 가지 이상 제시한다. | 실천 방안이 있지만 막연하거나 한 가지뿐이다. | 실천 방안이 없다. | 실천 주체와 방법이 분명한가<br>실현 가능한가 | "분리수거를 잘하고, 교실 전등을 쉬는 시간마다 끕니다." |
+| **글의 구성** | 서론-본론-결론의 구조가 분명하고 문단 사이의 연결이 자연스럽다. | 구조는 있지만 문단 구분이나 연결이 어색한 부분이 있다. | 구조 없이 생각나는 대로 나열되어 있다. | 문단 구분<br>연결어 사용 | "첫째, 둘째, 마지막으로"와 같은 연결어를 사용해 근거를 순서대로 제시함 |
+| **표현의 정확성** | 맞춤법과 띄어쓰기 오류가 거의 없고 6학년 수준에 맞는 어휘를 사용한다. | 맞춤법이나 띄어쓰기 오류가 몇 군데 있지만 의미 전달에는 문제가 없다. | 오류가 많아 의미를 이해하기 어렵다. | 맞춤법, 띄어쓰기<br>문장 호응 | "대처하는가"를 "대쳐하는가"로 쓰지 않도록 주의 |
+
+### 채점 안내
+- 각 기준의 점수를 합산하여 총점(15점 만점)을 산출합니다.
+- 13~15점: 매우 잘함, 9~12점: 잘함, 5~8점: 보통, 4점 이하: 노력 필요
+- 관찰 포인트를 중심으로 학생 글에서 근거가 되는 문장을 찾아 기록합니다.
+"""
+
+LEVEL_LABELS = (("상", 3), ("중", 2), ("하", 1))
+
+CANNED_RUBRIC = {
+    "criteria": [
+        {
+            "name": name,
+            "levels": [
+                {"label": label, "score": score, "description": description}
+                for (label, score), description in zip(LEVEL_LABELS, descriptions)
+            ],
+            "evidence_anchors": anchors,
+        }
+        for name, descriptions, anchors in [
+            (
+                "주장의 명확성",
+                ("주장이 처음과 끝에 분명함", "주장이 중간에 흐려짐", "주장이 없음"),
+                ["첫·마지막 문단의 주장"],
+            ),
+            (
+                "근거의 타당성",
+                ("구체적 근거 2개 이상", "근거 1개 또는 일반적", "근거 없음"),
+                ["근거 개수", "경험·사례"],
+            ),
+            (
+                "실천 방안의 구체성",
+                ("구체적 방안 2개 이상", "막연하거나 1개", "방안 없음"),
+                ["실천 주체와 방법"],
+            ),
+            (
+                "글의 구성",
+                ("서론-본론-결론 분명", "연결이 어색함", "구조 없음"),
+                ["문단 구분", "연결어"],
+            ),
+            (
+                "표현의 정확성",
+                ("오류 거의 없음", "오류 몇 군데", "오류가 많음"),
+                ["맞춤법", "띄어쓰기"],
+            ),
+        ]
+    ]
+}
+
+CANNED_EVALUATION = {
+    "criteria": [
+        {
+            "criterion": "주장의 명확성",
+            "level": "중",
+            "score": 2,
+            "evidence": "결론에서만 주장이 드러남",
+        },
+        {
+            "criterion": "근거의 타당성",
+            "level": "상",
+            "score": 3,
+            "evidence": "에코백, 텀블러 사용 경험",
+        },
+        {
+            "criterion": "실천 방안의 구체성",
+            "level": "상",
+            "score": 3,
+            "evidence": "분리수거, 전기 절약 제시",
+        },
+        {
+            "criterion": "글의 구성",
+            "level": "중",
+            "score": 2,
+            "evidence": "문단 구분이 없음",
+        },
+        {
+            "criterion": "표현의 정확성",
+            "level": "상",
+            "score": 3,
+            "evidence": "오류 거의 없음",
+        },
+    ],
+    "comment": "경험을 근거로 든 점이 좋으며, 주장을 첫 문단에서 밝히면 더 좋아집니다.",
+}
+
+
+def _canned_structured(schema: Any) -> Any:
+    """Return a fixed instance for the structured-output schemas in ``chains.py``."""
+    name = getattr(schema, "__name__", "")
+    if name == "InputParser":
+        return schema(
+            grade_level=6,
+            topic="지구 문제에 우리는 어떻게 대처하는가?(환경문제)",
+            objective="환경 논제 글쓰기",
+            name="이철수",
+            student_submission="요즘 뉴스나 학교에서 환경문제에 대해 많이 배우고 있습니다.",
+        )
+    if name == "RouteQuery":
+        return schema(binary_score="yes")
+    if name == "Rubric":
+        return schema.model_validate(CANNED_RUBRIC)
+    if name == "Evaluation":
+        return schema.model_validate(CANNED_EVALUATION)
+    raise ValueError(f"No canned output for schema {schema!r}")
+
+
+# 프로바이더 측 프롬프트 캐시: 처리된 적 있는 system 메시지
+_prefix_cache: set[str] = set()
+
+
+def clear_prefix_cache() -> None:
+    _prefix_cache.clear()
+
+
+def count_tokens(text: str) -> int:
+    """Rough token count: about four ASCII characters or 1.5 other characters."""
+    ascii_chars = sum(1 for char in text if ord(char) < 128)
+    return max(1, math.ceil(ascii_chars / 4 + (len(text) - ascii_chars) / 1.5))
+
+
+class FakeProviderError(Exception):
+    """Provider error with an HTTP status, retryable like a real 429/5xx."""
+
+    def __init__(self, status_code: int, model: str):
+        super().__init__(f"fake provider returned {status_code} for {model}")
+        self.status_code = status_code
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model that answers with ``response`` after a simulated delay.
+
+    Parameters
+    ----------
+    latency : float
+        Median time to first token in seconds.
+    latency_sigma : float
+        Spread of the log-normal latency distribution. ``0`` makes every call
+        take exactly ``latency``.
+    tokens_per_second : float
+        Median generation speed. ``0`` returns the whole response at once.
+    tokens_per_second_sigma : float
+        Spread of the log-normal token-rate distribution.
+    prefill_tokens_per_second : float
+        Prompt processing speed added to the time to first token, so longer
+        prompts answer later. ``0`` ignores the prompt length.
+    prefix_cache_min_tokens : int
+        Minimum system message length that the simulated provider caches.
+    error_rate : float
+        Fraction of calls that fail with :class:`FakeProviderError` after
+        ``latency``, like an overloaded provider.
+    error_status : int
+        HTTP status of those failures, e.g. ``429`` or ``503``.
+    seed : int, optional
+        Seed for the latency and token-rate samples.
+    """
+
+    model: str = "fake"
+    temperature: float = 0
+    latency: float = 0.05
+    latency_sigma: float = 0
+    tokens_per_second: float = 0
+    tokens_per_second_sigma: float = 0
+    prefill_tokens_per_second: float = 0
+    prefix_cache_min_tokens: int = 1024
+    error_rate: float = 0
+    error_status: int = 503
+    response: str = CANNED_MARKDOWN
+    seed: Optional[int] = None
+
+    def model_post_init(self, __context: Any) -> None:
+        self._rng = random.Random(self.seed)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    def _sample(self, median: float, sigma: float) -> float:
+        if median <= 0 or sigma <= 0:
+            return median
+        return self._rng.lognormvariate(math.log(median), sigma)
+
+    def _cached_tokens(self, messages) -> int:
+        """Prompt tokens served from the simulated provider prefix cache.
+
+        Like OpenAI's automatic caching, a system message of at least
+        ``prefix_cache_min_tokens`` is cached once a call with the same
+        prefix has been processed, and later calls only pay for the rest.
+        """
+        if not messages or messages[0].type != "system":
+            return 0
+        prefix = str(messages[0].content)
+        tokens = count_tokens(prefix)
+        if tokens < self.prefix_cache_min_tokens or prefix not in _prefix_cache:
+            return 0
+        return tokens
+
+    def _remember_prefix(self, messages) -> None:
+        if messages and messages[0].type == "system":
+            _prefix_cache.add(str(messages[0].content))
+
+    def _plan(self, messages, chunks: list[str]) -> tuple[float, list[float], dict]:
+        """Time to first token, delay of every chunk and the usage metadata."""
+        input_tokens = count_tokens(
+            "".join(str(message.content) for message in messages)
+        )
+        cached_tokens = self._cached_tokens(messages)
+        first_token = self._sample(self.latency, self.latency_sigma)
+        if self.prefill_tokens_per_second > 0:
+            # 캐시된 접두사는 다시 처리하지 않으므로 첫 토큰이 빨라짐
+            first_token += (
+                input_tokens - cached_tokens
+            ) / self.prefill_tokens_per_second
+        rate = self._sample(self.tokens_per_second, self.tokens_per_second_sigma)
+        if rate <= 0:
+            delays = [0.0] * len(chunks)
+        else:
+            delays = [count_tokens(chunk) / rate for chunk in chunks]
+        output_tokens = count_tokens(self.response)
+        usage = UsageMetadata(
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            total_tokens=input_tokens + output_tokens,
+            input_token_details={"cache_read": cached_tokens},
+        )
+        return first_token, delays, usage
+
+    def _fails(self) -> bool:
+        return self.error_rate > 0 and self._rng.random() < self.error_rate
+
+    def _result(self, usage: dict) -> ChatResult:
+        message = AIMessage(
+            content=self.response,
+            usage_metadata=usage,
+            response_metadata={"model_name": self.model},
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _chunks(self) -> list[str]:
+        return self.response.splitlines(keepends=True)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self._fails():
+            time.sleep(self.latency)
+            raise FakeProviderError(self.error_status, self.model)
+        first_token, delays, usage = self._plan(messages, self._chunks())
+        time.sleep(first_token)
+        self._remember_prefix(messages)
+        time.sleep(sum(delays))
+        return self._result(usage)
+
+    async def _agenerate(
+        self, messages, stop=None, run_manager=None, **kwargs
+    ) -> ChatResult:
+        if self._fails():
+            await asyncio.sleep(self.latency)
+            raise FakeProviderError(self.error_status, self.model)
+        first_token, delays, usage = self._plan(messages, self._chunks())
+        await asyncio.sleep(first_token)
+        self._remember_prefix(messages)
+        await asyncio.sleep(sum(delays))
+        return self._result(usage)
+
+    def _chunk(self, text: str, usage: Optional[dict]) -> ChatGenerationChunk:
+        # 사용량은 실제 프로바이더처럼 마지막 청크에만 실어 보냄
+        message = AIMessageChunk(
+            content=text,
+            usage_metadata=usage,
+            response_metadata={"model_name": self.model} if usage else {},
+        )
+        return ChatGenerationChunk(message=message)
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        chunks = self._chunks()
+        if self._fails():
+            time.sleep(self.latency)
+            raise FakeProviderError(self.error_status, self.model)
+        first_token, delays, usage = self._plan(messages, chunks)
+        time.sleep(first_token)
+        self._remember_prefix(messages)
+        for i, (text, delay) in enumerate(zip(chunks, delays)):
+            time.sleep(delay)
+            chunk = self._chunk(text, usage if i == len(chunks) - 1 else None)
+            if run_manager:
+                run_manager.on_llm_new_token(text, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        chunks = self._chunks()
+        if self._fails():
+            await asyncio.sleep(self.latency)
+            raise FakeProviderError(self.error_status, self.model)
+        first_token, delays, usage = self._plan(messages, chunks)
+        await asyncio.sleep(first_token)
+        self._remember_prefix(messages)
+        for i, (text, delay) in enumerate(zip(chunks, delays)):
+            await asyncio.sleep(delay)
+            chunk = self._chunk(text, usage if i == len(chunks) - 1 else None)
+            if run_manager:
+                await run_manager.on_llm_new_token(text, chunk=chunk)
+            yield chunk
+
+    def with_structured_output(self, schema, **kwargs):
+        # 캔 응답을 JSON 으로 "생성"하는 모델 호출로 흉내 내어 지연/토큰 사용량도 기록
+        canned = _canned_structured(schema)
+        model = self.model_copy(update={"response": canned.model_dump_json()})
+        return model | RunnableLambda(
+            lambda message: schema.model_validate_json(message.content)
+        )
+
+
+def install(
+    latency: float = 0.05,
+    response: Optional[str] = None,
+    latency_sigma: float = 0,
+    tokens_per_second: float = 0,
+    tokens_per_second_sigma: float = 0,
+    prefill_tokens_per_second: float = 0,
+    prefix_cache_min_tokens: int = 1024,
+    seed: Optional[int] = None,
+) -> None:
+    """Make every chain factory build :class:`FakeChatModel` instances.
+
+    Keyword arguments are forwarded to :class:`FakeChatModel`. Each model gets
+    its own random stream derived from ``seed``, so runs are reproducible.
+    """
+    from backend.src import llm
+
+    seeds = random.Random(seed)
+
+    def factory(model_type: str, model_name: str, temperature: float):
+        kwargs = {
+            "model": model_name,
+            "temperature": temperature,
+            "latency": latency,
+            "latency_sigma": latency_sigma,
+            "tokens_per_second": tokens_per_second,
+            "tokens_per_second_sigma": tokens_per_second_sigma,
+            "prefill_tokens_per_second": prefill_tokens_per_second,
+            "prefix_cache_min_tokens": prefix_cache_min_tokens,
+            "seed": None if seed is None else seeds.randrange(2**32),
+        }
+        if response is not None:
+            kwargs["response"] = response
+        return FakeChatModel(**kwargs)
+
+    llm.set_llm_factory(factory)
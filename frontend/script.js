@@ -1,5 +1,7 @@
 // API 설정 - 설정 파일에서 가져오기
 const API_BASE_URL = window.RUBRIC_CONFIG ? window.RUBRIC_CONFIG.API_BASE_URL : '/api';
+// 화면에 표시하는 섹션만 받음 - 교사 입력과 학생 답안은 다시 받지 않음
+const RESULT_FIELDS = ['rubric', 'evaluation', 'feedback', 'report'];
 
 // DOM 요소들
 const form = document.getElementById('rubricForm');
@@ -25,6 +27,129 @@ const reportContent = document.getElementById('reportContent');
 let currentResults = null;
 let currentTeacherInput = null;
 
+// 결과 캐시 (IndexedDB) - 같은 입력은 새로고침 뒤에도 다시 생성하지 않음
+const RESULT_DB_NAME = 'rubric-agent';
+const RESULT_STORE = 'results';
+const RESULT_CACHE_LIMIT = 50;
+let resultDb = null;
+
+function idbRequest(request) {
+    return new Promise((resolve, reject) => {
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => reject(request.error);
+    });
+}
+
+function openResultDb() {
+    if (resultDb === null) {
+        if (!window.indexedDB) {
+            resultDb = Promise.reject(new Error('IndexedDB를 사용할 수 없습니다.'));
+        } else {
+            const request = indexedDB.open(RESULT_DB_NAME, 1);
+            request.onupgradeneeded = () => {
+                // 입력 해시로 찾고, 오래된 항목부터 정리
+                const store = request.result.createObjectStore(RESULT_STORE, { keyPath: 'inputHash' });
+                store.createIndex('savedAt', 'savedAt');
+            };
+            resultDb = idbRequest(request);
+        }
+    }
+    return resultDb;
+}
+
+async function resultStore(mode) {
+    const db = await openResultDb();
+    return db.transaction(RESULT_STORE, mode).objectStore(RESULT_STORE);
+}
+
+// 캐시는 보조 수단 - 사생활 보호 모드 등에서 실패하면 없는 것으로 처리
+async function getCachedResult(inputHash) {
+    try {
+        return (await idbRequest((await resultStore('readonly')).get(inputHash))) || null;
+    } catch (error) {
+        console.warn('결과 캐시 읽기 실패:', error);
+        return null;
+    }
+}
+
+async function getLatestCachedResult() {
+    try {
+        const index = (await resultStore('readonly')).index('savedAt');
+        const cursor = await idbRequest(index.openCursor(null, 'prev'));
+        return cursor ? cursor.value : null;
+    } catch (error) {
+        console.warn('결과 캐시 읽기 실패:', error);
+        return null;
+    }
+}
+
+async function putCachedResult(record) {
+    try {
+        const store = await resultStore('readwrite');
+        await idbRequest(store.put({ ...record, savedAt: Date.now() }));
+        // 가장 오래된 항목부터 지워 RESULT_CACHE_LIMIT 개만 유지
+        let excess = (await idbRequest(store.count())) - RESULT_CACHE_LIMIT;
+        if (excess <= 0) return;
+        const request = store.index('savedAt').openCursor();
+        request.onsuccess = () => {
+            const cursor = request.result;
+            if (cursor && excess-- > 0) {
+                cursor.delete();
+                cursor.continue();
+            }
+        };
+    } catch (error) {
+        console.warn('결과 캐시 저장 실패:', error);
+    }
+}
+
+// 교사 입력의 SHA-256 해시 (crypto.subtle 이 없는 http 환경에서는 FNV-1a)
+async function hashInput(value) {
+    const text = JSON.stringify(value);
+    if (window.crypto && crypto.subtle) {
+        const digest = await crypto.subtle.digest('SHA-256', new TextEncoder().encode(text));
+        return Array.from(new Uint8Array(digest), byte => byte.toString(16).padStart(2, '0')).join('');
+    }
+    let hash = 0x811c9dc5;
+    for (let i = 0; i < text.length; i++) {
+        hash = Math.imul(hash ^ text.charCodeAt(i), 0x01000193);
+    }
+    return (hash >>> 0).toString(16);
+}
+
+// 캐시된 결과를 서버의 최신 체크포인트와 비교 - 바뀌지 않았으면 304 라 본문을 받지 않음
+// 생성을 다시 해야 하면 null
+async function revalidateCachedResult(record) {
+    const headers = {};
+    if (record.complete && record.etag) {
+        headers['If-None-Match'] = record.etag;
+    }
+    let response;
+    try {
+        const url = `${API_BASE_URL}/rubric/${encodeURIComponent(record.threadId)}?fields=${RESULT_FIELDS.join(',')}`;
+        response = await fetch(url, { headers });
+    } catch (error) {
+        // 오프라인이어도 완료된 결과는 그대로 사용
+        return record.complete ? record.results : null;
+    }
+    if (response.status === 304) {
+        return record.results;
+    }
+    if (response.ok) {
+        const saved = await response.json();
+        if (!saved.complete) return null;
+        await putCachedResult({
+            ...record,
+            results: saved.generated_results,
+            etag: response.headers.get('ETag'),
+            complete: true
+        });
+        return saved.generated_results;
+    }
+    // 404: 서버가 재시작되어 체크포인트가 없음 - 같은 입력의 결과이므로 캐시를 그대로 사용
+    return record.complete ? record.results : null;
+}
+
 // 유틸리티 함수들
 function generateThreadId() {
     return Date.now().toString() + Math.random().toString(36).substr(2, 9);
@@ -100,99 +225,120 @@ function showSuccess(message) {
     }, 5000);
 }
 
-function formatMarkdownContent(content) {
-    // 마크다운 코드 블록 제거
-    let formatted = content.replace(/```markdown\n?/g, '').replace(/```\n?/g, '');
-    
-    // 테이블을 HTML로 변환
-    formatted = formatMarkdownTable(formatted);
-    
-    return formatted;
-}
+// 마크다운을 줄 단위로 DOM 에 추가하는 렌더러
+// 이미 그린 줄은 다시 파싱하지 않고, 한 프레임에 RENDER_BUDGET_MS 만큼만 처리해
+// 긴 표도 메인 스레드를 막지 않음
+const RENDER_BUDGET_MS = 8;
 
-function formatMarkdownTable(content) {
-    // 마크다운 테이블을 HTML 테이블로 변환
-    const lines = content.split('\n');
-    let htmlContent = '';
-    let inTable = false;
-    let tableRows = [];
-    
-    for (let i = 0; i < lines.length; i++) {
-        const line = lines[i].trim();
-        
-        if (line.includes('|') && line.split('|').length > 2) {
-            if (!inTable) {
-                inTable = true;
-                tableRows = [];
+class MarkdownRenderer {
+    constructor(container) {
+        this.container = container;
+        this.frame = null;
+        this.reset('');
+    }
+
+    // 내용을 비우고 text 부터 다시 그림
+    reset(text, placeholder = '') {
+        this.text = text;
+        this.position = 0;
+        this.finished = false;
+        this.tbody = null;
+        this.body = document.createElement('div');
+        this.tail = document.createElement('p');
+        this.tail.className = 'streaming-tail';
+        this.tail.innerHTML = placeholder;
+        this.container.replaceChildren(this.body, this.tail);
+        this.schedule();
+    }
+
+    // 스트리밍 토큰 추가
+    append(delta) {
+        this.text += delta;
+        this.schedule();
+    }
+
+    // 최종 텍스트 - 이미 스트리밍으로 받은 앞부분은 다시 그리지 않음
+    set(text) {
+        if (text.startsWith(this.text)) {
+            this.text = text;
+        } else {
+            this.reset(text);
+        }
+        this.finished = true;
+        this.schedule();
+    }
+
+    schedule() {
+        if (this.frame === null) {
+            this.frame = requestAnimationFrame(() => this.renderFrame());
+        }
+    }
+
+    renderFrame() {
+        this.frame = null;
+        const deadline = performance.now() + RENDER_BUDGET_MS;
+        while (this.position < this.text.length && performance.now() < deadline) {
+            let end = this.text.indexOf('\n', this.position);
+            if (end === -1) {
+                if (!this.finished) break;
+                end = this.text.length;
             }
-            
+            this.renderLine(this.text.slice(this.position, end));
+            this.position = end + 1;
+        }
+
+        const rest = this.text.slice(this.position);
+        if (rest.includes('\n') || (this.finished && rest)) {
+            // 시간 예산을 다 써서 남은 줄은 다음 프레임에
+            this.schedule();
+        } else if (rest || this.position > 0) {
+            this.tail.textContent = rest;
+        }
+    }
+
+    renderLine(rawLine) {
+        const line = rawLine.trim();
+        // 마크다운 코드 블록 표시 제거
+        if (line.startsWith('```')) return;
+
+        if (line.includes('|') && line.split('|').length > 2) {
             // 구분선 스킵 (---|---|--- 형태)
-            if (line.includes('---')) {
-                continue;
-            }
-            
+            if (line.includes('---')) return;
             const cells = line.split('|').map(cell => cell.trim()).filter(cell => cell !== '');
-            tableRows.push(cells);
-        } else {
-            if (inTable) {
-                // 테이블 종료, HTML 테이블 생성
-                htmlContent += createHtmlTable(tableRows);
-                tableRows = [];
-                inTable = false;
-            }
-            
-            if (line) {
-                // 일반 텍스트 처리
-                if (line.startsWith('#')) {
-                    const level = line.match(/^#+/)[0].length;
-                    const text = line.replace(/^#+\s*/, '');
-                    htmlContent += `<h${level}>${text}</h${level}>\n`;
-                } else {
-                    htmlContent += `<p>${line}</p>\n`;
-                }
+            if (this.tbody === null) {
+                // 첫 번째 행을 헤더로 처리
+                const table = document.createElement('table');
+                const header = table.createTHead().insertRow();
+                cells.forEach(cell => {
+                    const th = document.createElement('th');
+                    th.innerHTML = cell;
+                    header.appendChild(th);
+                });
+                this.tbody = table.createTBody();
+                this.body.appendChild(table);
             } else {
-                htmlContent += '\n';
+                const row = this.tbody.insertRow();
+                cells.forEach(cell => {
+                    row.insertCell().innerHTML = cell;
+                });
             }
+            return;
         }
-    }
-    
-    // 마지막에 테이블이 있는 경우 처리
-    if (inTable && tableRows.length > 0) {
-        htmlContent += createHtmlTable(tableRows);
-    }
-    
-    return htmlContent;
-}
 
-function createHtmlTable(rows) {
-    if (rows.length === 0) return '';
-    
-    let html = '<table>\n';
-    
-    // 첫 번째 행을 헤더로 처리
-    if (rows.length > 0) {
-        html += '<thead>\n<tr>\n';
-        rows[0].forEach(cell => {
-            html += `<th>${cell}</th>\n`;
-        });
-        html += '</tr>\n</thead>\n';
-    }
-    
-    // 나머지 행들을 바디로 처리
-    if (rows.length > 1) {
-        html += '<tbody>\n';
-        for (let i = 1; i < rows.length; i++) {
-            html += '<tr>\n';
-            rows[i].forEach(cell => {
-                html += `<td>${cell}</td>\n`;
-            });
-            html += '</tr>\n';
+        // 테이블 종료
+        this.tbody = null;
+        if (!line) return;
+        let element;
+        if (line.startsWith('#')) {
+            const level = Math.min(line.match(/^#+/)[0].length, 6);
+            element = document.createElement(`h${level}`);
+            element.innerHTML = line.replace(/^#+\s*/, '');
+        } else {
+            element = document.createElement('p');
+            element.innerHTML = line;
         }
-        html += '</tbody>\n';
+        this.body.appendChild(element);
     }
-    
-    html += '</table>\n';
-    return html;
 }
 
 // 탭 전환 기능
@@ -212,6 +358,128 @@ function initializeTabs() {
     });
 }
 
+// 스트리밍 섹션별 표시 영역
+const SECTION_CONTENT = {
+    rubric: rubricContent,
+    evaluation: evaluationContent,
+    feedback: feedbackContent,
+    report: reportContent
+};
+
+// 섹션별 마크다운 렌더러
+const renderers = Object.fromEntries(
+    Object.entries(SECTION_CONTENT).map(([section, container]) => [section, new MarkdownRenderer(container)])
+);
+
+function activateTab(section) {
+    tabBtns.forEach(btn => btn.classList.toggle('active', btn.getAttribute('data-tab') === section));
+    tabPanes.forEach(pane => pane.classList.toggle('active', pane.id === section));
+}
+
+function prepareStreamingResults(hasStudentInfo) {
+    Object.values(renderers).forEach(renderer => renderer.reset(''));
+    
+    const display = hasStudentInfo ? 'flex' : 'none';
+    document.querySelector('[data-tab="evaluation"]').style.display = display;
+    document.querySelector('[data-tab="feedback"]').style.display = display;
+    document.querySelector('[data-tab="report"]').style.display = display;
+    
+    resultsSection.style.display = 'block';
+    activateTab('rubric');
+}
+
+function handleStreamEvent(eventName, payload) {
+    const section = payload.section || sectionForNode(payload.node);
+    if (!section) return;
+    
+    if (eventName === 'node_start') {
+        renderers[section].reset('', '<span class="streaming-placeholder"><i class="fas fa-spinner fa-spin"></i> 생성 중...</span>');
+        activateTab(section);
+    } else if (eventName === 'token') {
+        renderers[section].append(payload.delta);
+    } else if (eventName === 'node_end' && payload.output) {
+        // 캐시 적중 등으로 토큰 없이 끝난 경우에도 최종 결과로 갱신
+        if (payload.output[section]) {
+            renderers[section].set(payload.output[section]);
+        }
+    }
+}
+
+function sectionForNode(node) {
+    return {
+        rubric_generator: 'rubric',
+        evaluation_generator: 'evaluation',
+        feedback_generator: 'feedback',
+        report_generator: 'report'
+    }[node];
+}
+
+// Server-Sent Events 응답을 읽어 섹션별로 표시하고 최종 결과를 반환
+async function streamRubric(data, hasStudentInfo) {
+    const response = await fetch(`${API_BASE_URL}/rubric/stream`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'Accept': 'text/event-stream'
+        },
+        body: JSON.stringify(data)
+    });
+    
+    if (!response.ok) {
+        const errorData = await response.json().catch(() => ({}));
+        // 429: 요청 한도 초과, 503: 서버 혼잡 - 대기열에 오래 묶어 두지 않고 바로 안내
+        if ((response.status === 429 || response.status === 503) && errorData.retry_after) {
+            throw new Error(`요청이 많아 처리하지 못했습니다. ${errorData.retry_after}초 후 다시 시도해 주세요.`);
+        }
+        throw new Error(errorData.detail || `HTTP ${response.status}: ${response.statusText}`);
+    }
+    
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let generatedResults = null;
+    let checkpointId = null;
+    let started = false;
+    
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        
+        const messages = buffer.split('\n\n');
+        buffer = messages.pop();
+        
+        for (const message of messages) {
+            let eventName = 'message';
+            let dataText = '';
+            message.split('\n').forEach(line => {
+                if (line.startsWith('event:')) eventName = line.slice(6).trim();
+                else if (line.startsWith('data:')) dataText += line.slice(5).trim();
+            });
+            if (!dataText) continue;
+            const payload = JSON.parse(dataText);
+            
+            // 첫 이벤트가 도착하면 오버레이를 걷고 결과 영역을 보여줌
+            if (!started) {
+                started = true;
+                loadingOverlay.style.display = 'none';
+                prepareStreamingResults(hasStudentInfo);
+            }
+            
+            if (eventName === 'error') {
+                throw new Error(payload.detail);
+            } else if (eventName === 'done') {
+                generatedResults = payload.generated_results;
+                checkpointId = payload.checkpoint_id;
+            } else {
+                handleStreamEvent(eventName, payload);
+            }
+        }
+    }
+    
+    return { generatedResults, checkpointId };
+}
+
 // 폼 제출 처리
 async function handleFormSubmit(event) {
     event.preventDefault();
@@ -222,12 +490,14 @@ async function handleFormSubmit(event) {
     const studentSubmission = formData.get('student_submission').trim();
     const hasStudentInfo = name || studentSubmission;
     
-    // teacher_input 구성
-    let teacherInput = `topic: ${formData.get('topic')}\nobjective: ${formData.get('objective')}\ngrade_level: ${formData.get('grade_level')}학년`;
-    
-    if (hasStudentInfo) {
-        teacherInput += `\nname: ${name || '익명'}\nstudent_submission: ${studentSubmission}`;
-    }
+    // teacher_input 구성 - 구조화된 JSON으로 보내면 서버에서 LLM 파싱 없이 바로 처리됨
+    const teacherInput = {
+        topic: formData.get('topic'),
+        objective: formData.get('objective'),
+        grade_level: formData.get('grade_level'),
+        name: hasStudentInfo ? (name || '익명') : null,
+        student_submission: hasStudentInfo ? studentSubmission : null
+    };
     
     // 현재 교사 입력 정보 저장
     currentTeacherInput = {
@@ -238,32 +508,37 @@ async function handleFormSubmit(event) {
         student_submission: studentSubmission
     };
     
-    const data = {
-        teacher_input: teacherInput,
-        thread_id: generateThreadId()
-    };
-    
     try {
         showLoading();
         
-        // API 호출
-        const response = await fetch(`${API_BASE_URL}/rubric`, {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-            },
-            body: JSON.stringify(data)
-        });
-        
-        if (!response.ok) {
-            const errorData = await response.json().catch(() => ({}));
-            throw new Error(errorData.detail || `HTTP ${response.status}: ${response.statusText}`);
+        // 같은 입력의 결과가 캐시에 있으면 생성 요청 없이 표시 (교사 입력도 다시 보내지 않음)
+        const inputHash = await hashInput(teacherInput);
+        const cached = await getCachedResult(inputHash);
+        const cachedResults = cached ? await revalidateCachedResult(cached) : null;
+        if (cachedResults) {
+            displayResults(cachedResults, hasStudentInfo);
+            showSuccess('저장된 결과를 불러왔습니다.');
+            resultsSection.scrollIntoView({ behavior: 'smooth' });
+            return;
         }
         
-        const result = await response.json();
+        // 끝나지 않은 요청이 있으면 thread_id 를 재사용해 완료된 단계부터 이어서 실행
+        const resume = cached !== null;
+        const data = {
+            teacher_input: teacherInput,
+            thread_id: resume ? cached.threadId : generateThreadId(),
+            resume: resume,
+            fields: RESULT_FIELDS
+        };
+        const record = { inputHash, threadId: data.thread_id, teacherInput: currentTeacherInput, hasStudentInfo };
+        await putCachedResult({ ...record, results: null, etag: null, complete: false });
         
-        if (result.status === 'success') {
-            displayResults(result.generated_results, hasStudentInfo);
+        // 스트리밍 API 호출 - 각 섹션을 생성되는 대로 표시
+        const { generatedResults, checkpointId } = await streamRubric(data, hasStudentInfo);
+        
+        if (generatedResults) {
+            await putCachedResult({ ...record, results: generatedResults, etag: `"${checkpointId}"`, complete: true });
+            displayResults(generatedResults, hasStudentInfo);
             const message = hasStudentInfo ? '루브릭 생성 및 평가가 완료되었습니다!' : '루브릭 생성이 완료되었습니다!';
             showSuccess(message);
             
@@ -281,6 +556,18 @@ async function handleFormSubmit(event) {
     }
 }
 
+// 새로고침 후 마지막 결과를 캐시에서 복원 (다시 생성하지 않음)
+async function restoreLatestResult() {
+    const record = await getLatestCachedResult();
+    if (!record || !record.complete) return;
+    ['topic', 'objective', 'grade_level', 'name', 'student_submission'].forEach(field => {
+        document.getElementById(field).value = record.teacherInput[field] || '';
+    });
+    updateSubmitButton();
+    currentTeacherInput = record.teacherInput;
+    displayResults(record.results, record.hasStudentInfo);
+}
+
 // 복사 기능
 function copyToClipboard(text, button) {
     navigator.clipboard.writeText(text).then(() => {
@@ -314,6 +601,7 @@ function copyToClipboard(text, button) {
 }
 
 function addCopyButton(container, content) {
+    container.querySelectorAll('.copy-button').forEach(button => button.remove());
     const copyButton = document.createElement('button');
     copyButton.className = 'copy-button';
     copyButton.innerHTML = '<i class="fas fa-copy"></i> 복사';
@@ -581,8 +869,7 @@ function displayResults(results, hasStudentInfo = true) {
     
     // 루브릭 표시 (항상 표시)
     if (results.rubric) {
-        const formattedRubric = formatMarkdownContent(results.rubric);
-        rubricContent.innerHTML = formattedRubric;
+        renderers.rubric.set(results.rubric);
         addCopyButton(rubricContent, results.rubric);
     }
     
@@ -594,22 +881,19 @@ function displayResults(results, hasStudentInfo = true) {
     if (hasStudentInfo) {
         // 평가 표시
         if (results.evaluation) {
-            const formattedEvaluation = formatMarkdownContent(results.evaluation);
-            evaluationContent.innerHTML = formattedEvaluation;
+            renderers.evaluation.set(results.evaluation);
             addCopyButton(evaluationContent, results.evaluation);
         }
         
         // 피드백 표시
         if (results.feedback) {
-            const formattedFeedback = formatMarkdownContent(results.feedback);
-            feedbackContent.innerHTML = formattedFeedback;
+            renderers.feedback.set(results.feedback);
             addCopyButton(feedbackContent, results.feedback);
         }
         
         // 리포트 표시
         if (results.report) {
-            const formattedReport = formatMarkdownContent(results.report);
-            reportContent.innerHTML = formattedReport;
+            renderers.report.set(results.report);
             addCopyButton(reportContent, results.report);
         }
         
@@ -659,6 +943,9 @@ document.addEventListener('DOMContentLoaded', () => {
     // 초기 버튼 텍스트 설정
     updateSubmitButton();
     
+    // 마지막 결과 복원
+    restoreLatestResult();
+    
     // 개발용 샘플 데이터 로드 버튼 추가 (콘솔에서 호출 가능)
     window.loadSampleData = loadSampleData;
     
@@ -1,6 +1,81 @@
-def main():
-    print("Hello from rubric-agent!")
+"""Grade a whole class roster from the command line.
+
+Usage::
+
+    python main.py roster.csv results.csv --teacher-input-file assignment.txt
+
+Run the same command again after an interruption to grade only the rows that
+are not in ``results.csv`` yet.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="CSV/XLSX 학생 명단을 한 번에 채점합니다. 중단되면 같은 명령으로 이어서 진행합니다."
+    )
+    parser.add_argument("roster", help="학생 명단 CSV/XLSX (이름, 답안 열)")
+    parser.add_argument("output", help="결과 CSV/XLSX - 이미 있으면 남은 행만 채점")
+    teacher_input = parser.add_mutually_exclusive_group(required=True)
+    teacher_input.add_argument(
+        "--teacher-input",
+        help="과제 정보: 'topic: ...', 'objective: ...', 'grade_level: ...' 줄 또는 JSON",
+    )
+    teacher_input.add_argument(
+        "--teacher-input-file", help="과제 정보가 담긴 텍스트/JSON 파일"
+    )
+    parser.add_argument("--max-concurrency", type=int, default=5)
+    parser.add_argument("--pipeline", choices=("linear", "fast"), default="linear")
+    parser.add_argument(
+        "--markdown",
+        action="store_true",
+        help="압축 모드 대신 마크다운 루브릭으로 평가 (기준별 점수 열 없음)",
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", help="캐시된 결과를 쓰지 않음"
+    )
+    parser.add_argument(
+        "--encoding",
+        default="utf-8-sig",
+        help="CSV 명단 인코딩 (한글 엑셀에서 저장한 CSV 는 cp949)",
+    )
+    args = parser.parse_args(argv)
+
+    if args.teacher_input_file:
+        with open(args.teacher_input_file, encoding="utf-8") as f:
+            assignment = f.read()
+    else:
+        assignment = args.teacher_input
+
+    from backend.src.bulk import run_bulk
+
+    def progress(result: dict) -> None:
+        name = result.get("name") or ""
+        detail = f" ({result['detail']})" if result["status"] == "error" else ""
+        print(
+            f"{result['index']}행 {name}: {result['status']}{detail}", file=sys.stderr
+        )
+
+    summary = asyncio.run(
+        run_bulk(
+            args.roster,
+            args.output,
+            assignment,
+            max_concurrency=args.max_concurrency,
+            use_cache=not args.no_cache,
+            pipeline=args.pipeline,
+            compact=not args.markdown,
+            encoding=args.encoding,
+            on_result=progress,
+        )
+    )
+    print(json.dumps(summary, ensure_ascii=False))
+    return 1 if summary["errors"] else 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -3,7 +3,7 @@ import json
 
 
 def test_rubric_api():
-    url = "http://localhost:8000/rubric"
+    url = "http://localhost:8000/api/rubric"
 
     # teacher_input을 문자열로 포맷팅
     teacher_input = """topic: 지구 문제에 우리는 어떻게 대쳐하는가?(환경문제)